@@ -0,0 +1,125 @@
+"""
+Fan out of engine events and entity changes to the streaming clients.
+
+The engine notifies the hub synchronously from whatever thread runs it; each subscription only
+records what happened and wakes its connection up, the snapshots are built when the connection is
+ready to send. Events are coalesced by lineage so a slow client only receives the latest phase of
+an event, and entity changes are coalesced to the latest version of each entity. When a client
+falls too far behind the oldest pending events are dropped and it is told how many so it can
+resync through `/entities/changes`.
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from dnd.core.change_tracker import ChangeTracker
+from dnd.core.events import Event, EventQueue, EventType
+from app.api.execution import DEFAULT_ENCOUNTER
+
+MAX_PENDING_EVENTS = 256
+
+
+class Subscription:
+    """ the pending events and entity changes of one streaming client"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 event_types: Optional[Set[EventType]] = None,
+                 entity_uuids: Optional[Set[UUID]] = None,
+                 max_pending: int = MAX_PENDING_EVENTS):
+        self.event_types = event_types or None
+        self.entity_uuids = entity_uuids or None
+        self.max_pending = max_pending
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._events: "OrderedDict[UUID, Event]" = OrderedDict()
+        self._entity_versions: Dict[UUID, int] = {}
+        self._dropped = 0
+        self._wakeup = asyncio.Event()
+        self._wakeup_pending = False
+
+    def accepts_event(self, event: Event) -> bool:
+        if self.event_types is not None and event.event_type not in self.event_types:
+            return False
+        if self.entity_uuids is not None:
+            return event.source_entity_uuid in self.entity_uuids or event.target_entity_uuid in self.entity_uuids
+        return True
+
+    def push_event(self, event: Event) -> None:
+        if not self.accepts_event(event):
+            return
+        with self._lock:
+            # a later phase replaces the pending one and moves to the back of the queue
+            self._events.pop(event.lineage_uuid, None)
+            self._events[event.lineage_uuid] = event
+            if len(self._events) > self.max_pending:
+                self._events.popitem(last=False)
+                self._dropped += 1
+            self._wake()
+
+    def push_entity_change(self, entity_uuid: UUID, version: int) -> None:
+        if self.entity_uuids is not None and entity_uuid not in self.entity_uuids:
+            return
+        with self._lock:
+            self._entity_versions[entity_uuid] = version
+            self._wake()
+
+    def _wake(self) -> None:
+        """ schedule a single wakeup of the connection until it drains, called with the lock held"""
+        if not self._wakeup_pending:
+            self._wakeup_pending = True
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def drain(self) -> Tuple[int, List[Event], Dict[UUID, int]]:
+        """ wait for something to send and return the dropped count, the pending events and entity versions"""
+        await self._wakeup.wait()
+        with self._lock:
+            self._wakeup.clear()
+            self._wakeup_pending = False
+            dropped, self._dropped = self._dropped, 0
+            events = list(self._events.values())
+            self._events.clear()
+            changes, self._entity_versions = self._entity_versions, {}
+        return dropped, events, changes
+
+
+class EventStreamHub:
+    """ the subscriptions of the streaming clients, listening to the engine only while there are any"""
+
+    def __init__(self):
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def has_encounter(encounter: str) -> bool:
+        """ the engine runs a single world per process, exposed as the default encounter"""
+        return encounter == DEFAULT_ENCOUNTER
+
+    def subscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if not self._subscriptions:
+                EventQueue.add_listener(self._on_event)
+                ChangeTracker.add_listener(self._on_entity_change)
+            self._subscriptions.add(subscription)
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            if not self._subscriptions:
+                EventQueue.remove_listener(self._on_event)
+                ChangeTracker.remove_listener(self._on_entity_change)
+
+    def subscription_count(self) -> int:
+        return len(self._subscriptions)
+
+    def _on_event(self, event: Event) -> None:
+        for subscription in list(self._subscriptions):
+            subscription.push_event(event)
+
+    def _on_entity_change(self, entity_uuid: UUID, version: int) -> None:
+        for subscription in list(self._subscriptions):
+            subscription.push_entity_change(entity_uuid, version)
+
+
+stream_hub = EventStreamHub()
@@ -0,0 +1,90 @@
+"""
+Execution layer running the engine work of the routes off the event loop.
+
+The engine is synchronous and its state lives in process wide registries, so the routes hand their
+engine work to a thread pool where each world, or encounter, is guarded by its own lock. Reads are
+serialized with the writes and with each other: reading the engine is not free of side effects, a
+bonus computation sets the target context of shared values, the tile and path caches reorder their
+entries and a chunk faulted in can evict another one to the store file. What the pool buys is an
+event loop that keeps serving the cached snapshots, the event streams and the other worlds while a
+slow attack runs.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# the encounter held by this process, set per worker by `run_server.py --encounters`
+DEFAULT_ENCOUNTER = os.environ.get("DND_ENCOUNTER", "default")
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+class WorldExecutor:
+    """ a thread pool running engine work under the lock of the world it touches"""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def lock(self, encounter: str = DEFAULT_ENCOUNTER) -> threading.Lock:
+        with self._guard:
+            lock = self._locks.get(encounter)
+            if lock is None:
+                lock = self._locks[encounter] = threading.Lock()
+            return lock
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._guard:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="engine")
+            return self._pool
+
+    def _run_locked(self, encounter: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self.lock(encounter):
+            return func(*args, **kwargs)
+
+    async def read(self, func: Callable[..., T], *args: Any, encounter: str = DEFAULT_ENCOUNTER, **kwargs: Any) -> T:
+        """ run a function reading the world in the pool, alone on its world since reads update caches"""
+        call = partial(self._run_locked, encounter, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), call)
+
+    async def write(self, func: Callable[..., T], *args: Any, encounter: str = DEFAULT_ENCOUNTER, **kwargs: Any) -> T:
+        """ run a function mutating the world in the pool, alone on its world"""
+        call = partial(self._run_locked, encounter, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._get_pool(), call)
+
+    def shutdown(self) -> None:
+        with self._guard:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+world_executor = WorldExecutor()
+
+
+def engine_reader(func: Callable[..., T]) -> Callable[..., Any]:
+    """ turn a synchronous route reading the world into an async one running in the executor
+
+    The route keeps its signature for FastAPI. A worker process holds a single world, the one of
+    `DND_ENCOUNTER`, so every route locks it and requests for other encounters go to other workers
+    through the router.
+    """
+    @wraps(func)
+    async def route(*args: Any, **kwargs: Any) -> Any:
+        return await world_executor.read(partial(func, *args, **kwargs))
+    return route
+
+
+def engine_writer(func: Callable[..., T]) -> Callable[..., Any]:
+    """ turn a synchronous route mutating the world into an async one running in the executor, see `engine_reader`"""
+    @wraps(func)
+    async def route(*args: Any, **kwargs: Any) -> Any:
+        return await world_executor.write(partial(func, *args, **kwargs))
+    return route
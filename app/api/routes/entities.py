@@ -1,13 +1,15 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List, Dict, Optional, Union, Literal, Tuple
+import json
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from typing import List, Dict, Optional, Union, Literal, Tuple, Any, Type
 from uuid import UUID
 from enum import Enum
 from pydantic import BaseModel, Field
 
 # Import entity and models
-from app.models.sensory import SensesSnapshot
+from app.models.sensory import SensesSnapshot, SensesDeltaSnapshot
 from dnd.entity import Entity
-from app.models.entity import EntitySnapshot, ConditionSnapshot, EntitySummary
+from dnd.core.change_tracker import ChangeTracker
+from app.models.entity import EntitySnapshot, ConditionSnapshot, EntitySummary, EntitySnapshotCache, EntityPatch, EntityBatch, parse_projection
 from app.models.health import HealthSnapshot
 from app.models.abilities import AbilityScoresSnapshot
 from app.models.skills import SkillSetSnapshot
@@ -23,6 +25,8 @@ from dnd.actions import Attack, Move, MovementEvent
 
 # Import dependencies
 from app.api.deps import get_entity
+from app.api.execution import engine_reader, engine_writer, world_executor
+from app.api.serialization import negotiate_media_type, render, encode, JSON_MEDIA_TYPE
 
 # Position-related models
 class Position(BaseModel):
@@ -32,11 +36,13 @@ class Position(BaseModel):
 class MoveRequest(BaseModel):
     position: Tuple[int, int]
     include_paths_senses: bool = False
+    include_paths_senses_deltas: bool = False
 
 class MovementResponse(BaseModel):
     event: EventSnapshot
     entity: EntitySummary
     path_senses: Dict[Tuple[int,int],SensesSnapshot] = Field(default_factory=dict)
+    path_senses_deltas: List[SensesDeltaSnapshot] = Field(default_factory=list)
 
 # NEW: Attack-related models to preserve metadata lost in event translation
 class AttackMetadata(BaseModel):
@@ -102,7 +108,8 @@ async def list_entities():
     return [EntityListItem(uuid=entity.uuid, name=entity.name) for entity in entities]
 
 @router.get("/summaries", response_model=List[EntitySummary])
-async def list_entity_summaries():
+@engine_reader
+def list_entity_summaries(media_type: str = Depends(negotiate_media_type)):
     """List all entities with their summary information (name, HP, AC, target)"""
     # Get all entities from the registry
     entities = Entity.get_all_entities()
@@ -113,63 +120,166 @@ async def list_entity_summaries():
         try:
             summary = EntitySummary.from_engine(entity)
             # print(f"Summary for entity {entity.uuid}: {summary} with target {entity.target_entity_uuid}")
-            summaries.append(summary)
+            summaries.append(summary.model_dump(mode="json"))
         except Exception as e:
             print(f"Error creating summary for entity {entity.uuid}: {str(e)}")
             continue
     
-    return summaries
+    return render(summaries, media_type)
 
-@router.get("/{entity_uuid}", response_model=EntitySnapshot)
+def batch_projection(model: Type[BaseModel], fields: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The projection of a batch request, always keeping the entity UUID"""
+    if fields is None:
+        return None
+    try:
+        include = parse_projection(model, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    include["uuid"] = True
+    return include
+
+@router.get("/summaries/batch", response_model=EntityBatch)
+@engine_reader
+def get_entity_summaries_batch(
+    uuids: List[UUID] = Query(..., description="The entities to fetch"),
+    fields: Optional[str] = Query(None, description="Comma separated summary fields to return, e.g. current_hp,position,senses.entities"),
+    media_type: str = Depends(negotiate_media_type)
+):
+    """Get the summaries of several entities in one call, only building the requested fields"""
+    return render(EntityBatch.from_engine(EntitySummary, uuids, batch_projection(EntitySummary, fields)), media_type)
+
+@router.get("/batch", response_model=EntityBatch)
+@engine_reader
+def get_entities_batch(
+    uuids: List[UUID] = Query(..., description="The entities to fetch"),
+    fields: Optional[str] = Query(None, description="Comma separated snapshot fields to return, e.g. health,senses.visible,action_economy"),
+    include_skill_calculations: bool = False,
+    include_attack_calculations: bool = False,
+    include_ac_calculation: bool = False,
+    include_saving_throw_calculations: bool = False,
+    media_type: str = Depends(negotiate_media_type)
+):
+    """Get the snapshots of several entities in one call
+
+    With `fields` only the requested sub-snapshots are built, calculations included, and the
+    include flags are ignored.
+    """
+    return render(EntityBatch.from_engine(
+        EntitySnapshot, uuids, batch_projection(EntitySnapshot, fields),
+        include_skill_calculations=include_skill_calculations,
+        include_attack_calculations=include_attack_calculations,
+        include_ac_calculation=include_ac_calculation,
+        include_saving_throw_calculations=include_saving_throw_calculations
+    ), media_type)
+
+@router.get("/changes", response_model=EntityPatch)
+@engine_reader
+def get_encounter_changes(
+    since: int = Query(0, ge=0, description="The version returned by the previous poll"),
+    media_type: str = Depends(negotiate_media_type)
+):
+    """Get the changes of every entity since a version as JSON-Patch operations
+
+    Paths are prefixed by the entity UUID. Only the snapshot fields that changed are rebuilt.
+    """
+    return render(EntityPatch.from_encounter(since), media_type)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the If-None-Match header of a request lists the given ETag"""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+@router.get("/{entity_uuid}", response_model=EntitySnapshot, responses={304: {"description": "Entity unchanged since the ETag given in If-None-Match"}})
 async def get_entity_by_uuid(
+    request: Request,
     entity: Entity = Depends(get_entity), 
     include_skill_calculations: bool = False,
     include_attack_calculations: bool = False,
     include_ac_calculation: bool = False,
-    include_saving_throw_calculations: bool = False
+    include_saving_throw_calculations: bool = False,
+    media_type: str = Depends(negotiate_media_type)
 ):
-    """Get an entity by UUID and convert to interface model"""
-    # Convert the entity to its interface counterpart and return directly
-    return EntitySnapshot.from_engine(
-        entity, 
+    """Get an entity by UUID and convert to interface model
+
+    The snapshot is cached until the entity or its target changes. The response carries an ETag,
+    and a request sending it back in If-None-Match gets an empty 304 while nothing changed. A cached
+    snapshot, JSON or msgpack, is served straight from the event loop, only a rebuild goes through the
+    engine executor.
+    """
+    options = dict(
         include_skill_calculations=include_skill_calculations,
         include_attack_calculations=include_attack_calculations,
         include_ac_calculation=include_ac_calculation,
         include_saving_throw_calculations=include_saving_throw_calculations
     )
+    stamp = EntitySnapshotCache.stamp(entity, **options)
+    etag = f'"{stamp}"' if media_type == JSON_MEDIA_TYPE else f'"{stamp}-msgpack"'
+    # the version to poll GET /entities/{entity_uuid}/changes from
+    headers = {"ETag": etag, "X-Change-Version": str(ChangeTracker.get_clock()), "Vary": "Accept"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    body = EntitySnapshotCache.get_cached(entity, media_type, **options)
+    if body is None:
+        body = EntitySnapshotCache.get_cached(entity, **options)
+        if body is None:
+            body, stamp = await world_executor.read(EntitySnapshotCache.get_json, entity, **options)
+        if media_type != JSON_MEDIA_TYPE:
+            body = encode(json.loads(body), media_type)
+            EntitySnapshotCache.add_encoding(entity, stamp, media_type, body, **options)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+@router.get("/{entity_uuid}/changes", response_model=EntityPatch)
+@engine_reader
+def get_entity_changes(
+    entity: Entity = Depends(get_entity),
+    since: int = Query(0, ge=0, description="The version returned by the previous poll"),
+    media_type: str = Depends(negotiate_media_type)
+):
+    """Get the changes of an entity snapshot since a version as JSON-Patch operations"""
+    return render(EntityPatch.from_engine(entity, since), media_type)
 
 @router.get("/{entity_uuid}/health", response_model=HealthSnapshot)
-async def get_entity_health(entity: Entity = Depends(get_entity)):
+@engine_reader
+def get_entity_health(entity: Entity = Depends(get_entity)):
     """Get entity health snapshot"""
     return HealthSnapshot.from_engine(entity.health, entity)
 
 @router.get("/{entity_uuid}/ability_scores", response_model=AbilityScoresSnapshot)
-async def get_entity_ability_scores(entity: Entity = Depends(get_entity)):
+@engine_reader
+def get_entity_ability_scores(entity: Entity = Depends(get_entity)):
     """Get entity ability scores snapshot"""
     return AbilityScoresSnapshot.from_engine(entity.ability_scores)
 
 @router.get("/{entity_uuid}/skill_set", response_model=SkillSetSnapshot)
-async def get_entity_skill_set(entity: Entity = Depends(get_entity)):
+@engine_reader
+def get_entity_skill_set(entity: Entity = Depends(get_entity)):
     """Get entity skill set snapshot"""
     return SkillSetSnapshot.from_engine(entity.skill_set, entity)
 
 @router.get("/{entity_uuid}/equipment", response_model=EquipmentSnapshot)
-async def get_entity_equipment(entity: Entity = Depends(get_entity)):
+@engine_reader
+def get_entity_equipment(entity: Entity = Depends(get_entity)):
     """Get entity equipment snapshot"""
     return EquipmentSnapshot.from_engine(entity.equipment, entity=entity)
 
 @router.get("/{entity_uuid}/saving_throws", response_model=SavingThrowSetSnapshot)
-async def get_entity_saving_throws(entity: Entity = Depends(get_entity)):
+@engine_reader
+def get_entity_saving_throws(entity: Entity = Depends(get_entity)):
     """Get entity saving throws snapshot"""
     return SavingThrowSetSnapshot.from_engine(entity.saving_throws, entity)
 
 @router.get("/{entity_uuid}/proficiency_bonus", response_model=ModifiableValueSnapshot)
-async def get_entity_proficiency_bonus(entity: Entity = Depends(get_entity)):
+@engine_reader
+def get_entity_proficiency_bonus(entity: Entity = Depends(get_entity)):
     """Get entity proficiency bonus snapshot"""
     return ModifiableValueSnapshot.from_engine(entity.proficiency_bonus)
 
 @router.post("/{entity_uuid}/equip", response_model=EntitySnapshot)
-async def equip_item(request: EquipRequest, entity: Entity = Depends(get_entity)):
+@engine_writer
+def equip_item(request: EquipRequest, entity: Entity = Depends(get_entity), media_type: str = Depends(negotiate_media_type)):
     """
     Equip an item to an entity. The slot can be automatically determined for most items
     except weapons and rings which require explicit slot specification.
@@ -192,18 +302,19 @@ async def equip_item(request: EquipRequest, entity: Entity = Depends(get_entity)
                 slot = BodyPart(request.slot.value)
 
         entity.equipment.equip(equipment, slot)
-        return EntitySnapshot.from_engine(
+        return render(EntitySnapshot.from_engine(
             entity,
             include_skill_calculations=True,
             include_attack_calculations=True,
             include_ac_calculation=True,
             include_saving_throw_calculations=True
-        )
+        ), media_type)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{entity_uuid}/unequip/{slot}", response_model=EntitySnapshot)
-async def unequip_item(slot: SlotType, entity: Entity = Depends(get_entity)):
+@engine_writer
+def unequip_item(slot: SlotType, entity: Entity = Depends(get_entity), media_type: str = Depends(negotiate_media_type)):
     """
     Unequip an item from a specific slot on an entity.
     """
@@ -285,13 +396,13 @@ async def unequip_item(slot: SlotType, entity: Entity = Depends(get_entity)):
             
         try:
             entity.equipment.unequip(slot_type)
-            return EntitySnapshot.from_engine(
+            return render(EntitySnapshot.from_engine(
                 entity,
                 include_skill_calculations=True,
                 include_attack_calculations=True,
                 include_ac_calculation=True,
                 include_saving_throw_calculations=True
-            )
+            ), media_type)
         except Exception as e:
             raise HTTPException(
                 status_code=400, 
@@ -325,9 +436,11 @@ class RemoveConditionRequest(BaseModel):
     condition_name: str
 
 @router.post("/{entity_uuid}/conditions", response_model=EntitySnapshot)
-async def add_condition(
+@engine_writer
+def add_condition(
     request: AddConditionRequest,
-    entity: Entity = Depends(get_entity)
+    entity: Entity = Depends(get_entity),
+    media_type: str = Depends(negotiate_media_type)
 ):
     """
     Add a condition to an entity.
@@ -358,13 +471,13 @@ async def add_condition(
             )
             
         # Return updated entity snapshot with all calculations
-        return EntitySnapshot.from_engine(
+        return render(EntitySnapshot.from_engine(
             entity,
             include_skill_calculations=True,
             include_attack_calculations=True,
             include_ac_calculation=True,
             include_saving_throw_calculations=True
-        )
+        ), media_type)
         
     except Exception as e:
         raise HTTPException(
@@ -377,9 +490,11 @@ async def add_condition(
         )
 
 @router.delete("/{entity_uuid}/conditions/{condition_name}", response_model=EntitySnapshot)
-async def remove_condition(
+@engine_writer
+def remove_condition(
     condition_name: str,
-    entity: Entity = Depends(get_entity)
+    entity: Entity = Depends(get_entity),
+    media_type: str = Depends(negotiate_media_type)
 ):
     """
     Remove a condition from an entity by its name.
@@ -399,13 +514,13 @@ async def remove_condition(
         entity.remove_condition(condition_name)
         
         # Return updated entity snapshot with all calculations
-        return EntitySnapshot.from_engine(
+        return render(EntitySnapshot.from_engine(
             entity,
             include_skill_calculations=True,
             include_attack_calculations=True,
             include_ac_calculation=True,
             include_saving_throw_calculations=True
-        )
+        ), media_type)
         
     except Exception as e:
         raise HTTPException(
@@ -418,7 +533,8 @@ async def remove_condition(
         )
 
 @router.get("/{entity_uuid}/conditions", response_model=Dict[str, ConditionSnapshot])
-async def get_conditions(entity: Entity = Depends(get_entity)):
+@engine_reader
+def get_conditions(entity: Entity = Depends(get_entity)):
     """
     Get all active conditions on an entity.
     For just the conditions list, use this endpoint.
@@ -427,31 +543,35 @@ async def get_conditions(entity: Entity = Depends(get_entity)):
     return entity.active_conditions 
 
 @router.post("/{entity_uuid}/action-economy/refresh", response_model=EntitySnapshot)
-async def refresh_action_economy(
+@engine_writer
+def refresh_action_economy(
     entity: Entity = Depends(get_entity),
     include_skill_calculations: bool = False,
     include_attack_calculations: bool = False,
     include_ac_calculation: bool = False,
-    include_saving_throw_calculations: bool = False
+    include_saving_throw_calculations: bool = False,
+    media_type: str = Depends(negotiate_media_type)
 ):
     """Reset all action economy costs for an entity"""
     entity.action_economy.reset_all_costs()
-    return EntitySnapshot.from_engine(
+    return render(EntitySnapshot.from_engine(
         entity,
         include_skill_calculations=include_skill_calculations,
         include_attack_calculations=include_attack_calculations,
         include_ac_calculation=include_ac_calculation,
         include_saving_throw_calculations=include_saving_throw_calculations
-    ) 
+    ), media_type) 
 
 @router.post("/{entity_uuid}/target/{target_uuid}", response_model=EntitySnapshot)
-async def set_entity_target(
+@engine_writer
+def set_entity_target(
     entity_uuid: UUID,
     target_uuid: UUID,
     include_skill_calculations: bool = False,
     include_attack_calculations: bool = False,
     include_ac_calculation: bool = False,
-    include_saving_throw_calculations: bool = False
+    include_saving_throw_calculations: bool = False,
+    media_type: str = Depends(negotiate_media_type)
 ):
     """Set an entity's target"""
     entity = Entity.get(entity_uuid)
@@ -463,16 +583,17 @@ async def set_entity_target(
         raise HTTPException(status_code=404, detail="Target entity not found")
         
     entity.set_target_entity(target_uuid)
-    return EntitySnapshot.from_engine(
+    return render(EntitySnapshot.from_engine(
         entity,
         include_skill_calculations=include_skill_calculations,
         include_attack_calculations=include_attack_calculations,
         include_ac_calculation=include_ac_calculation,
         include_saving_throw_calculations=include_saving_throw_calculations
-    ) 
+    ), media_type) 
 
 @router.post("/{entity_uuid}/attack/{target_uuid}", response_model=AttackResponse)
-async def execute_attack(
+@engine_writer
+def execute_attack(
     entity_uuid: UUID,
     target_uuid: UUID,
     weapon_slot: WeaponSlot = Query(WeaponSlot.MAIN_HAND, description="Which weapon slot to use for the attack"),
@@ -530,7 +651,8 @@ async def execute_attack(
     ) 
 
 @router.get("/position/{x}/{y}", response_model=List[EntitySummary])
-async def get_entities_at_position(x: int, y: int):
+@engine_reader
+def get_entities_at_position(x: int, y: int):
     """Get all entities at a specific position"""
     try:
         entities = Entity.get_all_entities_at_position((x, y))
@@ -546,7 +668,8 @@ async def get_entities_at_position(x: int, y: int):
         )
 
 @router.post("/{entity_uuid}/move", response_model=MovementResponse)
-async def move_entity(
+@engine_writer
+def move_entity(
     request: MoveRequest,
     entity: Entity = Depends(get_entity)
 ):
@@ -557,7 +680,7 @@ async def move_entity(
         movement_event = movement_action.apply()
         entity_summary = EntitySummary.from_engine(entity)
         assert isinstance(movement_event, MovementEvent)
-        if request.include_paths_senses and movement_event.path:
+        if (request.include_paths_senses or request.include_paths_senses_deltas) and movement_event.path:
             if movement_event.status_message:
                 movement_event.status_message += f"\n added senses info"
             else:
@@ -565,7 +688,8 @@ async def move_entity(
         return MovementResponse(
             event=EventSnapshot.from_engine(movement_event, include_children=True),
             entity=entity_summary,
-            path_senses= {pos: SensesSnapshot.from_engine(entity.create_senses_copy_at_position(pos)) for pos in movement_event.path} if request.include_paths_senses and movement_event.path else {}
+            path_senses= {pos: SensesSnapshot.from_engine(entity.create_senses_copy_at_position(pos)) for pos in movement_event.path} if request.include_paths_senses and movement_event.path else {},
+            path_senses_deltas=[SensesDeltaSnapshot.from_engine(delta) for delta in entity.compute_senses_along_path(movement_event.path)] if request.include_paths_senses_deltas and movement_event.path else []
         )
     except Exception as e:
         raise HTTPException(
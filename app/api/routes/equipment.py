@@ -9,11 +9,13 @@ from app.models.equipment import (
     ShieldSnapshot,
     EquipmentSnapshot
 )
+from app.api.execution import engine_reader
 
 router = APIRouter(prefix="/equipment", tags=["equipment"])
 
 @router.get("/", response_model=List[Union[WeaponSnapshot, ArmorSnapshot, ShieldSnapshot]])
-async def list_equipment(source_entity_uuid: Optional[UUID] = Query(None, description="Filter equipment by source entity UUID")):
+@engine_reader
+def list_equipment(source_entity_uuid: Optional[UUID] = Query(None, description="Filter equipment by source entity UUID")):
     """
     Get a list of all available equipment with their details.
     Returns a list of equipment snapshots, properly typed based on the equipment type.
@@ -37,7 +39,8 @@ async def list_equipment(source_entity_uuid: Optional[UUID] = Query(None, descri
     return equipment_list
 
 @router.get("/{equipment_uuid}", response_model=Union[WeaponSnapshot, ArmorSnapshot, ShieldSnapshot])
-async def get_equipment(equipment_uuid: UUID):
+@engine_reader
+def get_equipment(equipment_uuid: UUID):
     """
     Get detailed information about a specific piece of equipment.
     Returns a properly typed snapshot based on the equipment type.
@@ -2,12 +2,14 @@
 from fastapi import APIRouter, HTTPException, Query, Path
 from typing import List, Optional
 from uuid import UUID
+from datetime import datetime
 
-from dnd.core.events import EventQueue, WeaponSlot
+from dnd.core.events import EventQueue, EventPhase, EventType, WeaponSlot
 from dnd.actions import Attack
 from dnd.entity import Entity
-from app.models.events import EventSnapshot
+from app.models.events import EventPage, EventSnapshot
 from app.models.entity import EntitySnapshot, EntitySummary
+from app.api.execution import engine_reader
 
 router = APIRouter(
     prefix="/events",
@@ -15,8 +17,42 @@ router = APIRouter(
     responses={404: {"description": "Event not found"}},
 )
 
+MAX_PAGE_SIZE = 500
+
+@router.get("/", response_model=EventPage)
+@engine_reader
+def get_events_page(
+    after: int = Query(0, ge=0, description="Sequence number cursor, the `next_cursor` of the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of events in the page"),
+    event_type: Optional[List[EventType]] = Query(None, description="Only events of these types"),
+    phase: Optional[List[EventPhase]] = Query(None, description="Only events in these phases"),
+    source: Optional[UUID] = Query(None, description="Only events from this entity"),
+    target: Optional[UUID] = Query(None, description="Only events targeting this entity"),
+    lineage: Optional[UUID] = Query(None, description="Only the phases of this event lineage"),
+    since: Optional[datetime] = Query(None, description="Only events stamped at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only events stamped at or before this time"),
+    include_children: bool = Query(False, description="Whether to include child events in the response")
+):
+    """
+    Page through the stored events in store order, with all the filters combined.
+
+    Every store of an event, including each of its phases, gets the next sequence number, so the
+    cursor stays valid while events keep being stored and a page never repeats or skips one. The
+    filters are answered by `EventQueue.query`, which scans the most selective index.
+    """
+    stored, next_cursor, has_more = EventQueue.get_events_page(
+        after=after, limit=limit, event_types=event_type, phases=phase,
+        source_entity_uuid=source, target_entity_uuid=target, lineage_uuid=lineage, start_time=since, end_time=until,
+    )
+    return EventPage(
+        events=[EventSnapshot.from_engine(event, include_children=include_children) for _, event in stored],
+        next_cursor=next_cursor,
+        has_more=has_more,
+    )
+
 @router.get("/{event_uuid}", response_model=EventSnapshot)
-async def get_event_by_uuid(
+@engine_reader
+def get_event_by_uuid(
     event_uuid: UUID,
     include_children: bool = Query(False, description="Whether to include child events in the response")
 ):
@@ -28,7 +64,8 @@ async def get_event_by_uuid(
     return EventSnapshot.from_engine(event, include_children=include_children)
 
 @router.get("/lineage/{lineage_uuid}", response_model=List[EventSnapshot])
-async def get_events_by_lineage(
+@engine_reader
+def get_events_by_lineage(
     lineage_uuid: UUID,
     include_children: bool = Query(False, description="Whether to include child events in the response")
 ):
@@ -40,7 +77,8 @@ async def get_events_by_lineage(
     return [EventSnapshot.from_engine(event, include_children=include_children) for event in events]
 
 @router.get("/latest/{count}", response_model=List[EventSnapshot])
-async def get_latest_events(
+@engine_reader
+def get_latest_events(
     count: int = Path(..., description="Number of latest events to return", gt=0),
     include_children: bool = Query(False, description="Whether to include child events in the response")
 ):
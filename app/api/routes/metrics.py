@@ -0,0 +1,24 @@
+# app/api/routes/metrics.py
+from fastapi import APIRouter, Response
+
+from dnd.core import metrics
+from app.api.event_stream import stream_hub
+
+router = APIRouter(
+    tags=["metrics"],
+)
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics.gauge("dnd_metrics_enabled", "Whether the hot path metrics are collected, set DND_METRICS=1", function=lambda: metrics.enabled)
+metrics.gauge("dnd_stream_subscriptions", "Clients streaming events over the WebSocket", function=stream_hub.subscription_count)
+
+@router.get("/metrics", response_class=Response, responses={200: {"content": {PROMETHEUS_MEDIA_TYPE: {}}}})
+async def get_metrics():
+    """
+    The engine metrics in the Prometheus text format.
+
+    Served on the event loop without the world lock, the gauges only read registry sizes, so a
+    scrape is never held up by a long write.
+    """
+    return Response(content=metrics.render_prometheus(), media_type=PROMETHEUS_MEDIA_TYPE)
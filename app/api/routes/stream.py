@@ -0,0 +1,78 @@
+# app/api/routes/stream.py
+import asyncio
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import anyio
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
+
+from dnd.core.events import EventType
+from app.api.event_stream import Subscription, stream_hub
+from app.api.execution import DEFAULT_ENCOUNTER, world_executor
+from app.models.events import EventSnapshot
+
+router = APIRouter(
+    prefix="/stream",
+    tags=["stream"],
+)
+
+
+def dump_events(events: List[Any]) -> List[Dict[str, Any]]:
+    """Snapshot engine events, run under the world lock since writers keep updating them in place"""
+    return [EventSnapshot.from_engine(event).model_dump(mode="json") for event in events]
+
+
+async def send_pending(websocket: WebSocket, subscription: Subscription, encounter: str = DEFAULT_ENCOUNTER) -> None:
+    """Forward the pending events and entity changes of a subscription as they come"""
+    try:
+        while True:
+            dropped, events, changes = await subscription.drain()
+            if dropped:
+                await websocket.send_json({"type": "overflow", "dropped": dropped})
+            dumped = await world_executor.read(dump_events, events, encounter=encounter) if events else []
+            for event in dumped:
+                await websocket.send_json({"type": "event", "event": event})
+            if changes:
+                await websocket.send_json({
+                    "type": "entities",
+                    "changes": {str(entity_uuid): version for entity_uuid, version in changes.items()},
+                })
+    except (WebSocketDisconnect, RuntimeError):
+        # the client went away mid send, the receiving side ends the connection
+        return
+
+
+async def wait_for_disconnect(websocket: WebSocket) -> None:
+    """Consume the client messages until it goes away, the stream is one way"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/ws")
+async def stream_events(
+    websocket: WebSocket,
+    encounter: str = Query(DEFAULT_ENCOUNTER, description="The encounter to follow"),
+    event_types: Optional[List[EventType]] = Query(None, description="Only push events of these types"),
+    entities: Optional[List[UUID]] = Query(None, description="Only push events and changes of these entities"),
+):
+    """Push new events and entity change versions to the client as they happen"""
+    if not stream_hub.has_encounter(encounter):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=f"Unknown encounter {encounter}")
+        return
+
+    subscription = Subscription(
+        asyncio.get_running_loop(),
+        event_types=set(event_types) if event_types else None,
+        entity_uuids=set(entities) if entities else None,
+    )
+    stream_hub.subscribe(subscription)
+    try:
+        await websocket.accept()
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(send_pending, websocket, subscription, encounter)
+            await wait_for_disconnect(websocket)
+            task_group.cancel_scope.cancel()
+    finally:
+        stream_hub.unsubscribe(subscription)
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+import json
+import struct
+from fastapi import APIRouter, Body, HTTPException, Query, Depends, Response
 from typing import List, Dict, Optional, Union, Literal, Tuple
 from uuid import UUID
 from enum import Enum
 from pydantic import BaseModel
 
 from dnd.core.base_tiles import Tile, floor_factory, wall_factory, water_factory
-from app.models.tile import TileSnapshot, TileSummary, GridSnapshot
+from app.models.tile import TileSnapshot, TileSummary, GridSnapshot, GridRegionSnapshot, GridEncoding, TilePaletteEntry
 from dnd.entity import Entity
+from dnd.core.map_io import MapGrid
+from app.api.execution import engine_reader, engine_writer
+
 # Create router
 router = APIRouter(
     prefix="/tiles",
@@ -20,18 +25,98 @@ class TileType(str, Enum):
     WALL = "wall"
     WATER = "water"
 
+class GridTransport(str, Enum):
+    JSON = "json"
+    BINARY = "binary"
+
+# Largest region served at once, in cells
+MAX_REGION_CELLS = 512 * 512
+
 # Model for creating a new tile
 class CreateTileRequest(BaseModel):
     position: Tuple[int, int]
     tile_type: TileType
 
 @router.get("/", response_model=GridSnapshot)
-async def get_all_tiles():
+@engine_reader
+def get_all_tiles(response: Response):
     """Get a snapshot of the entire tile grid"""
+    response.headers["X-Map-Version"] = str(Tile.get_revision())
     return GridSnapshot.from_engine()
 
+@router.get("/region", response_model=GridRegionSnapshot, responses={304: {"description": "Region unchanged since the given revision"}})
+@engine_reader
+def get_tile_region(
+    response: Response,
+    x0: int,
+    y0: int,
+    x1: int,
+    y1: int,
+    encoding: GridEncoding = GridEncoding.RLE,
+    transport: GridTransport = GridTransport.JSON,
+    since: Optional[int] = Query(None, description="Revision the client already holds for this region")
+):
+    """Get the tiles of an inclusive rectangular region of the grid
+
+    The `X-Map-Version` header carries the revision of the region. When `since` is given and nothing
+    in the region changed after it, an empty 304 response is returned so the client keeps its copy.
+    """
+    if x1 < x0 or y1 < y0 or (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_REGION_CELLS:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "Invalid region",
+                "message": f"The region must be a non empty rectangle of at most {MAX_REGION_CELLS} cells",
+                "region": (x0, y0, x1, y1)
+            }
+        )
+    region = (x0, y0, x1, y1)
+    revision = Tile.get_revision(region)
+    headers = {"X-Map-Version": str(revision)}
+    if since is not None and revision <= since:
+        return Response(status_code=304, headers=headers)
+
+    if transport == GridTransport.BINARY:
+        if encoding == GridEncoding.TILES:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": "Invalid encoding",
+                    "message": "The binary transport needs the packed or rle encoding"
+                }
+            )
+        # body: palette length (uint32 little endian) | palette json | encoded cells
+        grid = Tile.export_grid(region).compacted()
+        palette = json.dumps([TilePaletteEntry.from_engine(cell_type).model_dump() for cell_type in grid.palette]).encode()
+        body = struct.pack("<I", len(palette)) + palette + GridRegionSnapshot.encode_cells(grid, encoding)
+        headers.update({"X-Grid-Region": f"{x0},{y0},{grid.width},{grid.height}", "X-Grid-Encoding": encoding.value})
+        return Response(content=body, media_type="application/octet-stream", headers=headers)
+
+    response.headers.update(headers)
+    return GridRegionSnapshot.from_engine(region, encoding)
+
+@router.get("/export", response_class=Response, responses={200: {"content": {"application/octet-stream": {}}}})
+@engine_reader
+def export_map():
+    """Export the whole map in the packed binary map format of `MapGrid.to_bytes`"""
+    body = Tile.export_grid().to_bytes()
+    return Response(content=body, media_type="application/octet-stream", headers={"X-Map-Version": str(Tile.get_revision())})
+
+@router.put("/import")
+@engine_writer
+def import_map(body: bytes = Body(..., media_type="application/octet-stream")):
+    """Replace the whole map with a body in the packed binary map format, e.g. from `GET /tiles/export`"""
+    try:
+        grid = MapGrid.from_bytes(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    Tile.load_grid(grid)
+    Entity.update_all_entities_senses()
+    return {"width": grid.width, "height": grid.height, "revision": Tile.get_revision()}
+
 @router.get("/position/{x}/{y}", response_model=TileSnapshot)
-async def get_tile_at_position(x: int, y: int):
+@engine_reader
+def get_tile_at_position(x: int, y: int):
     """Get tile at a specific position"""
     tile = Tile.get_tile_at_position((x, y))
     if not tile:
@@ -46,7 +131,8 @@ async def get_tile_at_position(x: int, y: int):
     return TileSnapshot.from_engine(tile)
 
 @router.get("/{tile_uuid}", response_model=TileSnapshot)
-async def get_tile_by_uuid(tile_uuid: UUID):
+@engine_reader
+def get_tile_by_uuid(tile_uuid: UUID):
     """Get tile by UUID"""
     tile = Tile.get(tile_uuid)
     if not tile:
@@ -61,7 +147,8 @@ async def get_tile_by_uuid(tile_uuid: UUID):
     return TileSnapshot.from_engine(tile)
 
 @router.post("/", response_model=TileSnapshot)
-async def create_tile(request: CreateTileRequest):
+@engine_writer
+def create_tile(request: CreateTileRequest):
     """Create a new tile at the specified position using the specified factory"""
     # Check if position is already occupied
     # existing_tile = Tile.get_tile_at_position(request.position)
@@ -85,7 +172,7 @@ async def create_tile(request: CreateTileRequest):
             tile = water_factory(request.position)
         else:
             raise ValueError(f"Invalid tile type: {request.tile_type}")
-        Entity.update_all_entities_senses()
+        Entity.update_entities_senses_around(tile.position)
         return TileSnapshot.from_engine(tile)
 
     except Exception as e:
@@ -99,7 +186,8 @@ async def create_tile(request: CreateTileRequest):
         )
 
 @router.delete("/position/{x}/{y}")
-async def delete_tile_at_position(x: int, y: int):
+@engine_writer
+def delete_tile_at_position(x: int, y: int):
     """Delete tile at a specific position"""
     tile = Tile.get_tile_at_position((x, y))
     if not tile:
@@ -113,13 +201,14 @@ async def delete_tile_at_position(x: int, y: int):
         )
     
     # Remove from registries
-    Tile._tile_registry.pop(tile.uuid, None)
-    Tile._tile_by_position.pop(tile.position, None)
+    Tile.remove_tile_at_position(tile.position)
+    Entity.update_entities_senses_around(tile.position)
     
     return {"message": f"Tile at position ({x}, {y}) deleted successfully"}
 
 @router.get("/walkable/{x}/{y}")
-async def is_position_walkable(x: int, y: int):
+@engine_reader
+def is_position_walkable(x: int, y: int):
     """Check if a position is walkable"""
     return {
         "position": (x, y),
@@ -127,7 +216,8 @@ async def is_position_walkable(x: int, y: int):
     }
 
 @router.get("/visible/{x}/{y}")
-async def is_position_visible(x: int, y: int):
+@engine_reader
+def is_position_visible(x: int, y: int):
     """Check if a position is visible"""
     return {
         "position": (x, y),
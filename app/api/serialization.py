@@ -0,0 +1,65 @@
+"""
+Response serialization of the engine snapshots.
+
+A route returning a pydantic model through its `response_model` has FastAPI validate the whole model
+a second time before encoding it, which for an `EntitySnapshot` means walking every nested value,
+channel and modifier again. The routes with large snapshots render them here instead: models are
+dumped once by pydantic and encoded directly, plain data is encoded with orjson when it is installed,
+and clients sending `Accept: application/msgpack` get msgpack when it is installed. The schema stays
+the one of the models in `app/models`.
+"""
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library encoder is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional, msgpack is then not acceptable
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+
+def negotiate_media_type(request: Request) -> str:
+    """
+    Dependency picking the media type of the response from the Accept header.
+
+    Raises:
+        HTTPException: 406 when only msgpack is acceptable and it is not installed
+    """
+    accept = request.headers.get("accept", "")
+    accepted = [part.split(";")[0].strip().lower() for part in accept.split(",")]
+    if any(media_type in MSGPACK_MEDIA_TYPES for media_type in accepted):
+        if msgpack is not None:
+            return MSGPACK_MEDIA_TYPE
+        if not any(media_type in (JSON_MEDIA_TYPE, "application/*", "*/*") for media_type in accepted):
+            raise HTTPException(status_code=406, detail="msgpack responses need the msgpack package")
+    return JSON_MEDIA_TYPE
+
+
+def encode(content: Any, media_type: str = JSON_MEDIA_TYPE) -> bytes:
+    """Encode a model or json ready data, e.g. from `model_dump(mode="json")`, in a media type"""
+    if media_type == MSGPACK_MEDIA_TYPE:
+        data = content.model_dump(mode="json") if isinstance(content, BaseModel) else content
+        return msgpack.packb(data, use_bin_type=True)
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode()
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+def render(content: Any, media_type: str = JSON_MEDIA_TYPE, status_code: int = 200,
+           headers: Optional[Dict[str, str]] = None) -> Response:
+    """A response holding the encoded content, skipping the response model validation of FastAPI"""
+    headers = {"Vary": "Accept", **(headers or {})}
+    return Response(content=encode(content, media_type), status_code=status_code, media_type=media_type, headers=headers)
@@ -19,6 +19,9 @@ from app.api.routes.entities import router as entities_router
 from app.api.routes.equipment import router as equipment_router
 from app.api.routes.events import router as events_router
 from app.api.routes.tiles import router as tiles_router
+from app.api.routes.stream import router as stream_router
+from app.api.routes.metrics import router as metrics_router
+from app.api.execution import world_executor
 
 # Create FastAPI application
 app = FastAPI(
@@ -41,11 +44,16 @@ app.include_router(entities_router, prefix="/api")
 app.include_router(equipment_router, prefix="/api")
 app.include_router(events_router, prefix="/api")
 app.include_router(tiles_router, prefix="/api")
+app.include_router(stream_router, prefix="/api")
+# at the root, where Prometheus scrapes by default
+app.include_router(metrics_router)
 
 # Initialize test entities
 @app.on_event("startup")
 def initialize_test_entities():
-    """Create test entities on startup"""
+    """Create test entities on startup, except in the workers of `run_server.py --encounters` which start empty"""
+    if "DND_ENCOUNTER" in os.environ:
+        return
     q=EventQueue()
     
     # Create a warrior from circus_fighter.py
@@ -73,6 +81,12 @@ def initialize_test_entities():
     floor_17_8 = floor_factory((17,8))
     wall_25_25 = wall_factory((32,32))
     Entity.update_all_entities_senses()
+
+@app.on_event("shutdown")
+def shutdown_engine_executor():
+    """Wait for the engine work in flight before exiting"""
+    world_executor.shutdown()
+
 # Run the app with uvicorn
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
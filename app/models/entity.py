@@ -1,7 +1,10 @@
 # dnd/interfaces/entity.py (updated for equipment)
-from pydantic import BaseModel, Field
-from typing import Dict, List, Optional, Union, Any, Tuple
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Dict, List, Optional, Union, Any, Tuple, ClassVar, Literal, Callable, Iterable, Type, get_args
 from uuid import UUID
+from collections import OrderedDict
+from functools import cache
+import threading
 
 from app.models.abilities import AbilityScoresSnapshot
 from app.models.skills import SkillSetSnapshot, SkillBonusCalculationSnapshot
@@ -13,7 +16,12 @@ from app.models.health import HealthSnapshot
 from app.models.action_economy import ActionEconomySnapshot
 from app.models.sensory import SensesSnapshot
 from dnd.core.base_conditions import DurationType
+from dnd.core.change_tracker import ChangeTracker
 from dnd.entity import Entity
+from dnd.core import metrics
+
+SNAPSHOT_SECONDS = metrics.histogram("dnd_snapshot_build_seconds", "Duration of the entity snapshot builds", ["model"])
+SNAPSHOT_CACHE_REQUESTS = metrics.counter("dnd_snapshot_cache_requests_total", "Serialized snapshot cache lookups", ["result"])
 
 class EntitySummary(BaseModel):
     """Lightweight summary of an entity's core stats"""
@@ -27,32 +35,55 @@ class EntitySummary(BaseModel):
     sprite_name: Optional[str] = None
     senses: SensesSnapshot
 
+    @staticmethod
+    def field_builders(entity) -> Dict[str, Callable[[], Any]]:
+        """The builder of each summary field, so a projection only pays for the fields it asks for"""
+        @cache
+        def hit_points() -> Tuple[int, int]:
+            con_modifier = entity.ability_scores.get_ability("constitution").get_combined_values()
+            current_hp = entity.health.get_total_hit_points(constitution_modifier=con_modifier.normalized_score)
+            max_hp = entity.health.get_max_hit_dices_points(constitution_modifier=con_modifier.normalized_score) + entity.health.max_hit_points_bonus.score
+            return current_hp, max_hp
+
+        def armor_class() -> Optional[int]:
+            # Get AC using the proper calculation method
+            try:
+                ac_value = entity.ac_bonus()
+                return ac_value.normalized_score if hasattr(ac_value, "normalized_score") else None
+            except Exception:
+                return None
+
+        return {
+            "uuid": lambda: entity.uuid,
+            "name": lambda: entity.name,
+            "current_hp": lambda: hit_points()[0],
+            "max_hp": lambda: hit_points()[1],
+            "armor_class": armor_class,
+            "target_entity_uuid": lambda: entity.target_entity_uuid,
+            "position": lambda: entity.position,
+            "sprite_name": lambda: entity.sprite_name,
+            "senses": lambda: SensesSnapshot.from_engine(entity.senses),
+        }
+
     @classmethod
-    def from_engine(cls, entity):
-        """Create a summary from an engine Entity object"""
-        # Get current and max HP
-        con_modifier = entity.ability_scores.get_ability("constitution").get_combined_values()
-        current_hp = entity.health.get_total_hit_points(constitution_modifier=con_modifier.normalized_score)
-        max_hp = entity.health.get_max_hit_dices_points(constitution_modifier=con_modifier.normalized_score) + entity.health.max_hit_points_bonus.score
-        
-        # Get AC using the proper calculation method
-        try:
-            ac_value = entity.ac_bonus()
-            ac = ac_value.normalized_score if hasattr(ac_value, "normalized_score") else None
-        except Exception:
-            ac = None
-        
-        return cls(
-            uuid=entity.uuid,
-            name=entity.name,
-            current_hp=current_hp,
-            max_hp=max_hp,
-            armor_class=ac,
-            target_entity_uuid=entity.target_entity_uuid,
-            position=entity.position,
-            sprite_name=entity.sprite_name,
-            senses=SensesSnapshot.from_engine(entity.senses)
-        )
+    def from_engine(cls, entity, fields: Optional[Iterable[str]] = None):
+        """
+        Create a summary from an engine Entity object
+
+        Args:
+            entity: The engine Entity object
+            fields: Only build these fields, the others are left unset and skipped by
+                `model_dump(exclude_unset=True)`
+        """
+        started = metrics.clock() if metrics.enabled else None
+        builders = cls.field_builders(entity)
+        if fields is not None:
+            summary = cls.model_construct(**{field: builders[field]() for field in fields})
+        else:
+            summary = cls(**{field: build() for field, build in builders.items()})
+        if started is not None:
+            SNAPSHOT_SECONDS.labels("EntitySummary").observe(metrics.clock() - started)
+        return summary
 
 # Add a ConditionSnapshot interface
 class ConditionSnapshot(BaseModel):
@@ -66,6 +97,25 @@ class ConditionSnapshot(BaseModel):
     source_entity_uuid: UUID
     applied: bool
 
+    @classmethod
+    def from_engine(cls, condition):
+        """Create a snapshot from an engine condition"""
+        duration_value = None
+        if condition.duration.duration_type == DurationType.ROUNDS:
+            duration_value = condition.duration.duration
+        elif condition.duration.duration_type == DurationType.ON_CONDITION:
+            duration_value = str(condition.duration.duration)
+        return cls(
+            uuid=condition.uuid,
+            name=condition.name,
+            description=condition.description,
+            duration_type=condition.duration.duration_type,
+            duration_value=duration_value,
+            source_entity_name=condition.source_entity_name,
+            source_entity_uuid=condition.source_entity_uuid,
+            applied=condition.applied
+        )
+
 class EntitySnapshot(BaseModel):
     """Interface model for an Entity snapshot"""
     uuid: UUID
@@ -98,10 +148,56 @@ class EntitySnapshot(BaseModel):
     # Active conditions
     active_conditions: Dict[str, ConditionSnapshot] = Field(default_factory=dict)
     
+    # built only when asked for through their include flag or a projection
+    on_demand_fields: ClassVar[Tuple[str, ...]] = (
+        "skill_calculations", "attack_calculations", "ac_calculation", "saving_throw_calculations", "target_summary"
+    )
+
+    @staticmethod
+    def field_builders(entity) -> Dict[str, Callable[[], Any]]:
+        """The builder of each sub-snapshot, so a projection only pays for the fields it asks for"""
+        def skill_calculations():
+            from dnd.blocks.skills import all_skills
+            return {skill_name: SkillBonusCalculationSnapshot.from_engine(entity, skill_name) for skill_name in all_skills}
+
+        def attack_calculations():
+            return {slot: AttackBonusCalculationSnapshot.from_engine(entity, slot) for slot in (WeaponSlot.MAIN_HAND, WeaponSlot.OFF_HAND)}
+
+        def saving_throw_calculations():
+            ability_names = ["strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma"]
+            return {ability_name: SavingThrowBonusCalculationSnapshot.from_engine(entity, ability_name) for ability_name in ability_names}
+
+        def target_summary():
+            target_entity = Entity.get(entity.target_entity_uuid) if entity.target_entity_uuid else None
+            return EntitySummary.from_engine(target_entity) if target_entity else None
+
+        return {
+            "uuid": lambda: entity.uuid,
+            "name": lambda: entity.name,
+            "description": lambda: entity.description,
+            "target_entity_uuid": lambda: entity.target_entity_uuid,
+            "target_summary": target_summary,
+            "position": lambda: entity.position,
+            "sprite_name": lambda: entity.sprite_name,
+            "ability_scores": lambda: AbilityScoresSnapshot.from_engine(entity.ability_scores),
+            "skill_set": lambda: SkillSetSnapshot.from_engine(entity.skill_set, entity),
+            "equipment": lambda: EquipmentSnapshot.from_engine(entity.equipment, entity=entity),
+            "senses": lambda: SensesSnapshot.from_engine(entity.senses),
+            "saving_throws": lambda: SavingThrowSetSnapshot.from_engine(entity.saving_throws, entity),
+            "health": lambda: HealthSnapshot.from_engine(entity.health, entity),
+            "action_economy": lambda: ActionEconomySnapshot.from_engine(entity.action_economy, entity),
+            "proficiency_bonus": lambda: ModifiableValueSnapshot.from_engine(entity.proficiency_bonus),
+            "skill_calculations": skill_calculations,
+            "attack_calculations": attack_calculations,
+            "ac_calculation": lambda: ACBonusCalculationSnapshot.from_engine(entity),
+            "saving_throw_calculations": saving_throw_calculations,
+            "active_conditions": lambda: {name: ConditionSnapshot.from_engine(condition) for name, condition in entity.active_conditions.items()},
+        }
+
     @classmethod
     def from_engine(cls, entity, include_skill_calculations=False, include_attack_calculations=False, 
                    include_ac_calculation=False, include_saving_throw_calculations=False,
-                   include_target_summary=False):
+                   include_target_summary=False, fields: Optional[Iterable[str]] = None):
         """
         Create a snapshot from an engine Entity object
         
@@ -112,81 +208,231 @@ class EntitySnapshot(BaseModel):
             include_ac_calculation: Whether to include detailed AC calculation
             include_saving_throw_calculations: Whether to include detailed saving throw calculations
             include_target_summary: Whether to include target entity summary
+            fields: Only build these fields, calculations included, the others are left unset and
+                skipped by `model_dump(exclude_unset=True)`
         """
-        # Create skill calculations if requested
-        skill_calculations = {}
-        if include_skill_calculations:
-            from dnd.blocks.skills import all_skills
-            for skill_name in all_skills:
-                skill_calculations[skill_name] = SkillBonusCalculationSnapshot.from_engine(entity, skill_name)
-        
-        # Create attack calculations if requested
-        attack_calculations = {}
-        if include_attack_calculations:
-            attack_calculations[WeaponSlot.MAIN_HAND] = AttackBonusCalculationSnapshot.from_engine(
-                entity, WeaponSlot.MAIN_HAND)
-            attack_calculations[WeaponSlot.OFF_HAND] = AttackBonusCalculationSnapshot.from_engine(
-                entity, WeaponSlot.OFF_HAND)
-        
-        # Create AC calculation if requested
-        ac_calculation = None
-        if include_ac_calculation:
-            ac_calculation = ACBonusCalculationSnapshot.from_engine(entity)
-        
-        # Create saving throw calculations if requested
-        saving_throw_calculations = {}
-        if include_saving_throw_calculations:
-            ability_names = ["strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma"]
-            from app.models.saving_throws import SavingThrowBonusCalculationSnapshot
-            for ability_name in ability_names:
-                saving_throw_calculations[ability_name] = SavingThrowBonusCalculationSnapshot.from_engine(entity, ability_name)
-
-        # Create condition snapshots
-        active_conditions = {}
-        for name, condition in entity.active_conditions.items():
-            duration_value = None
-            if condition.duration.duration_type == DurationType.ROUNDS:
-                duration_value = condition.duration.duration
-            elif condition.duration.duration_type == DurationType.ON_CONDITION:
-                duration_value = str(condition.duration.duration)
-            
-            active_conditions[name] = ConditionSnapshot(
-                uuid=condition.uuid,
-                name=condition.name,
-                description=condition.description,
-                duration_type=condition.duration.duration_type,
-                duration_value=duration_value,
-                source_entity_name=condition.source_entity_name,
-                source_entity_uuid=condition.source_entity_uuid,
-                applied=condition.applied
-            )
-
-        # Get target summary if requested
-        target_summary = None
-        if include_target_summary and entity.target_entity_uuid:
-            target_entity = Entity.get(entity.target_entity_uuid)
-            if target_entity:
-                target_summary = EntitySummary.from_engine(target_entity)
-        
-        return cls(
-            uuid=entity.uuid,
-            name=entity.name,
-            description=entity.description,
-            target_entity_uuid=entity.target_entity_uuid,
-            target_summary=target_summary,
-            ability_scores=AbilityScoresSnapshot.from_engine(entity.ability_scores),
-            skill_set=SkillSetSnapshot.from_engine(entity.skill_set, entity),
-            equipment=EquipmentSnapshot.from_engine(entity.equipment, entity=entity),
-            proficiency_bonus=ModifiableValueSnapshot.from_engine(entity.proficiency_bonus),
-            skill_calculations=skill_calculations,
-            attack_calculations=attack_calculations,
-            ac_calculation=ac_calculation,
-            saving_throws=SavingThrowSetSnapshot.from_engine(entity.saving_throws, entity),
-            health=HealthSnapshot.from_engine(entity.health, entity),
-            saving_throw_calculations=saving_throw_calculations,
-            action_economy=ActionEconomySnapshot.from_engine(entity.action_economy, entity),
-            active_conditions=active_conditions,
-            position=entity.position,
-            sprite_name=entity.sprite_name,
-            senses=SensesSnapshot.from_engine(entity.senses)
-        )
\ No newline at end of file
+        started = metrics.clock() if metrics.enabled else None
+        builders = cls.field_builders(entity)
+        if fields is not None:
+            snapshot = cls.model_construct(**{field: builders[field]() for field in fields})
+        else:
+            included = {
+                "skill_calculations": include_skill_calculations,
+                "attack_calculations": include_attack_calculations,
+                "ac_calculation": include_ac_calculation,
+                "saving_throw_calculations": include_saving_throw_calculations,
+                "target_summary": include_target_summary,
+            }
+            snapshot = cls(**{field: build() for field, build in builders.items() if included.get(field, True)})
+        if started is not None:
+            SNAPSHOT_SECONDS.labels("EntitySnapshot").observe(metrics.clock() - started)
+        return snapshot
+
+
+def projection_model(annotation: Any) -> Optional[Type[BaseModel]]:
+    """The model a field annotation holds, unwrapping Optional, or None for a plain value"""
+    if isinstance(annotation, type):
+        return annotation if issubclass(annotation, BaseModel) else None
+    models = [arg for arg in get_args(annotation) if isinstance(arg, type) and issubclass(arg, BaseModel)]
+    return models[0] if len(models) == 1 else None
+
+
+def parse_projection(model: Type[BaseModel], fields: str) -> Dict[str, Any]:
+    """
+    Turn a comma separated list of dotted field paths, like `health,senses.visible`, into the
+    include argument of `model_dump`.
+
+    Raises:
+        ValueError: If a path does not name a field of the model or of its nested models
+    """
+    include: Dict[str, Any] = {}
+    for path in filter(None, (path.strip() for path in fields.split(","))):
+        current, node = model, include
+        names = path.split(".")
+        for depth, name in enumerate(names):
+            if current is None or name not in current.model_fields:
+                raise ValueError(f"Unknown field {path}")
+            if depth == len(names) - 1:
+                node[name] = True
+            elif node.get(name) is True:
+                # the whole field is already included
+                break
+            else:
+                node = node.setdefault(name, {})
+                current = projection_model(current.model_fields[name].annotation)
+    return include
+
+
+class EntityBatch(BaseModel):
+    """Interface model for the snapshots or summaries of several entities, projected to the requested fields"""
+    entities: List[Dict[str, Any]] = Field(default_factory=list)
+    missing: List[UUID] = Field(default_factory=list)
+
+    @classmethod
+    def from_engine(cls, model: Type[BaseModel], entity_uuids: List[UUID], include: Optional[Dict[str, Any]] = None, **options: bool):
+        """
+        Create the batch of an `EntitySnapshot` or `EntitySummary` per entity, in the requested order
+
+        Args:
+            model: EntitySnapshot or EntitySummary
+            entity_uuids: The entities to fetch, the unknown ones are listed in `missing`
+            include: The parsed projection, see `parse_projection`, None for whole snapshots
+            **options: The include flags of `EntitySnapshot.from_engine` for whole snapshots
+        """
+        entities: List[Dict[str, Any]] = []
+        missing: List[UUID] = []
+        for entity_uuid in entity_uuids:
+            entity = Entity.get(entity_uuid)
+            if not isinstance(entity, Entity):
+                missing.append(entity_uuid)
+            elif include is None:
+                entities.append(model.from_engine(entity, **options).model_dump(mode="json"))
+            else:
+                snapshot = model.from_engine(entity, fields=include.keys())
+                entities.append(snapshot.model_dump(mode="json", include=include))
+        return cls(entities=entities, missing=missing)
+
+
+class EntitySnapshotCache:
+    """
+    Serialized entity snapshots cached against the change tracker versions.
+
+    A snapshot depends on the state of its entity and, through the calculations against the target,
+    on the state of the target, so it is stamped with both versions and rebuilt only once one of
+    them moves. The stamp also gives the ETag of the snapshot.
+    """
+    _cache: ClassVar[OrderedDict] = OrderedDict()
+    _cache_size: ClassVar[int] = 256
+    # the cached snapshots are read from the event loop while the executor builds new ones
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def stamp(cls, entity: Entity, **options: bool) -> str:
+        target_uuid = entity.target_entity_uuid
+        target_version = ChangeTracker.get_version(target_uuid) if target_uuid is not None else 0
+        flags = "".join("1" if options[name] else "0" for name in sorted(options))
+        return f"{entity.uuid.hex}-{ChangeTracker.get_version(entity.uuid)}-{target_version}-{flags}"
+
+    @classmethod
+    def get_cached(cls, entity: Entity, media_type: str = "application/json", **options: bool) -> Optional[bytes]:
+        """ the cached snapshot in a media type if it is still current, without touching the engine"""
+        stamp = cls.stamp(entity, **options)
+        key = (entity.uuid, tuple(sorted(options.items())))
+        with cls._lock:
+            cached = cls._cache.get(key)
+            if cached is None or cached[0] != stamp or media_type not in cached[1]:
+                return None
+            cls._cache.move_to_end(key)
+        if metrics.enabled:
+            SNAPSHOT_CACHE_REQUESTS.labels("hit").inc()
+        return cached[1][media_type]
+
+    @classmethod
+    def get_json(cls, entity: Entity, **options: bool) -> Tuple[bytes, str]:
+        """
+        Returns:
+            Tuple of (snapshot json, stamp), the json is only rebuilt when the stamp changed
+        """
+        stamp = cls.stamp(entity, **options)
+        body = cls.get_cached(entity, **options)
+        if body is not None:
+            return body, stamp
+        if metrics.enabled:
+            SNAPSHOT_CACHE_REQUESTS.labels("miss").inc()
+        body = EntitySnapshot.from_engine(entity, **options).model_dump_json().encode()
+        key = (entity.uuid, tuple(sorted(options.items())))
+        with cls._lock:
+            cls._cache[key] = (stamp, {"application/json": body})
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > cls._cache_size:
+                cls._cache.popitem(last=False)
+        return body, stamp
+
+    @classmethod
+    def add_encoding(cls, entity: Entity, stamp: str, media_type: str, body: bytes, **options: bool) -> None:
+        """ keep another encoding of the snapshot json of a stamp, dropped with it once the stamp moves"""
+        key = (entity.uuid, tuple(sorted(options.items())))
+        with cls._lock:
+            cached = cls._cache.get(key)
+            if cached is not None and cached[0] == stamp:
+                cached[1][media_type] = body
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._cache.clear()
+
+
+metrics.gauge("dnd_snapshot_cache_entries", "Serialized snapshots held by the cache", function=lambda: len(EntitySnapshotCache._cache))
+
+
+class PatchOperation(BaseModel):
+    """A JSON-Patch (RFC 6902) style operation on an entity snapshot"""
+    op: Literal["add", "remove", "replace"]
+    path: str
+    value: Any = None
+
+
+class EntityPatch(BaseModel):
+    """Interface model for the changes of one or more entity snapshots since a version
+
+    `version` is the change tracker clock when the patch was built, to send back as `since` on
+    the next poll. Paths point into the `EntitySnapshot`, prefixed by the entity UUID for an
+    encounter wide patch.
+    """
+    since: int
+    version: int
+    operations: List[PatchOperation] = Field(default_factory=list)
+
+    # blocks whose computed values read the ability scores, the proficiency bonus or the target
+    derived_blocks: ClassVar[Tuple[str, ...]] = ("skill_set", "saving_throws", "health", "equipment", "action_economy")
+    derived_from: ClassVar[Tuple[str, ...]] = ("ability_scores", "proficiency_bonus", "target_entity_uuid")
+    _adapters: ClassVar[Dict[str, TypeAdapter]] = {}
+
+    @staticmethod
+    def snapshot_field(entity: Entity, field: str) -> Any:
+        """The json value of one field of the entity snapshot, built without the rest of the snapshot"""
+        value = EntitySnapshot.field_builders(entity)[field]()
+        adapter = EntityPatch._adapters.get(field)
+        if adapter is None:
+            adapter = EntityPatch._adapters[field] = TypeAdapter(EntitySnapshot.model_fields[field].annotation)
+        return adapter.dump_python(value, mode="json")
+
+    @classmethod
+    def entity_operations(cls, entity: Entity, since: int, prefix: str = "") -> List[PatchOperation]:
+        """
+        The operations bringing a snapshot of the entity at version `since` up to date.
+
+        Only the snapshot fields whose change tracker version moved after `since` are rebuilt, with
+        the blocks deriving their values from a changed ability score, proficiency bonus or target.
+        An entity created after `since` is added whole.
+        """
+        block_versions = ChangeTracker.get_block_versions(entity.uuid)
+        if block_versions.get("entity", 0) > since:
+            snapshot = EntitySnapshot.from_engine(entity).model_dump(mode="json")
+            return [PatchOperation(op="add", path=prefix or "", value=snapshot)]
+        changed = {field for field, version in block_versions.items() if version > since and field in EntitySnapshot.model_fields}
+        target_uuid = entity.target_entity_uuid
+        if changed & set(cls.derived_from) or (target_uuid is not None and ChangeTracker.get_version(target_uuid) > since):
+            changed.update(cls.derived_blocks)
+        return [
+            PatchOperation(op="replace", path=f"{prefix}/{field}", value=cls.snapshot_field(entity, field))
+            for field in EntitySnapshot.model_fields if field in changed
+        ]
+
+    @classmethod
+    def from_engine(cls, entity: Entity, since: int):
+        """Create the patch of one entity"""
+        version = ChangeTracker.get_clock()
+        return cls(since=since, version=version, operations=cls.entity_operations(entity, since))
+
+    @classmethod
+    def from_encounter(cls, since: int):
+        """Create the patch of every entity, paths start with the entity UUID"""
+        version = ChangeTracker.get_clock()
+        operations: List[PatchOperation] = []
+        for entity in Entity.get_all_entities():
+            if ChangeTracker.get_version(entity.uuid) > since or entity.target_entity_uuid is not None:
+                operations.extend(cls.entity_operations(entity, since, prefix=f"/{entity.uuid}"))
+        return cls(since=since, version=version, operations=operations)
+
@@ -97,6 +97,12 @@ class EventSnapshot(BaseModel):
         
         return snapshot
 
+class EventPage(BaseModel):
+    """A page of stored events in store order, read after a sequence number cursor"""
+    events: List[EventSnapshot]
+    next_cursor: int = Field(description="Pass as `after` to read the next page, stable as events keep being stored")
+    has_more: bool = Field(description="Whether the page was cut at its limit, more events may match after the cursor")
+
 class D20EventSnapshot(EventSnapshot):
     """Interface model for D20Event"""
     dc: Optional[Union[int, ModifiableValueSnapshot]] = None
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Tuple
 from uuid import UUID
-from dnd.blocks.sensory import Senses, SensesType
+from dnd.blocks.sensory import Senses, SensesType, SensesDelta
 
 
 
@@ -25,4 +25,23 @@ class SensesSnapshot(BaseModel):
             extra_senses=getattr(senses, "extra_senses", []),
             position=getattr(senses, "position"),
             seen=list(getattr(senses, "seen", [])),
-        )
\ No newline at end of file
+        )
+
+
+class SensesDeltaSnapshot(BaseModel):
+    """Interface model for the change of senses at one step of a path"""
+    position: Tuple[int, int]
+    visible_added: List[Tuple[int, int]] = Field(default_factory=list)
+    visible_removed: List[Tuple[int, int]] = Field(default_factory=list)
+    entities_added: Dict[UUID, Tuple[int, int]] = Field(default_factory=dict)
+    entities_removed: List[UUID] = Field(default_factory=list)
+
+    @classmethod
+    def from_engine(cls, delta: SensesDelta):
+        return cls(
+            position=delta.position,
+            visible_added=delta.visible_added,
+            visible_removed=delta.visible_removed,
+            entities_added=delta.entities_added,
+            entities_removed=delta.entities_removed,
+        )
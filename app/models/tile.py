@@ -1,7 +1,11 @@
+import base64
+from enum import Enum
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Union, Any, Tuple
 from uuid import UUID
 from dnd.core.base_tiles import Tile
+from dnd.core.chunked_map import CellType
+from dnd.core.map_io import MapGrid
 
 class TileSummary(BaseModel):
     """Lightweight summary of a tile's core properties"""
@@ -24,6 +28,18 @@ class TileSummary(BaseModel):
             sprite_name=tile.sprite_name
         )
 
+    @classmethod
+    def from_cell(cls, uuid: UUID, position: Tuple[int, int], cell_type: CellType):
+        """Create a summary from a cell as yielded by `Tile.iter_cells`, without building the Tile"""
+        return cls(
+            uuid=uuid,
+            name=cell_type.name,
+            position=position,
+            walkable=not cell_type.blocks_movement,
+            visible=not cell_type.blocks_vision,
+            sprite_name=cell_type.sprite_name
+        )
+
 class TileSnapshot(BaseModel):
     """Interface model for a Tile snapshot with complete information"""
     uuid: UUID
@@ -67,18 +83,83 @@ class GridSnapshot(BaseModel):
     @classmethod
     def from_engine(cls):
         """Create a snapshot of the entire tile grid"""
-        tiles = {}
         width, height = Tile.grid_size()
-        
-        for x in range(width):
-            for y in range(height):
-                pos = (x, y)
-                tile = Tile.get_tile_at_position(pos)
-                if tile is not None:
-                    tiles[pos] = TileSummary.from_engine(tile)
+        # only the placed tiles are visited, sparse maps do not pay for their empty cells
+        placed = sorted(Tile.iter_cells(), key=lambda cell: cell[1])
+        tiles = {position: TileSummary.from_cell(uuid, position, cell_type) for uuid, position, cell_type in placed}
 
         return cls(
             width=width,
             height=height,
             tiles=tiles
-        ) 
\ No newline at end of file
+        )
+
+
+class GridEncoding(str, Enum):
+    TILES = "tiles"
+    PACKED = "packed"
+    RLE = "rle"
+
+
+class TilePaletteEntry(BaseModel):
+    """The shared properties of the tiles drawn with one palette index"""
+    name: str
+    sprite_name: Optional[str] = None
+    walkable: bool
+    visible: bool
+    movement_cost: int
+
+    @classmethod
+    def from_engine(cls, cell_type: CellType):
+        return cls(
+            name=cell_type.name,
+            sprite_name=cell_type.sprite_name,
+            walkable=not cell_type.blocks_movement,
+            visible=not cell_type.blocks_vision,
+            movement_cost=cell_type.movement_cost
+        )
+
+
+class GridRegionSnapshot(BaseModel):
+    """Interface model for a rectangular region of the grid
+
+    With the `tiles` encoding the region is described like a `GridSnapshot`. With `packed` and `rle`
+    the cells are palette indices (0 for no tile, i for palette[i - 1]) in row major order starting
+    at (x0, y0), base64 encoded in `data`: one byte per cell for `packed`, 3 byte records of
+    (count: uint16 little endian, index: uint8) for `rle`.
+    """
+    x0: int
+    y0: int
+    width: int
+    height: int
+    revision: int
+    encoding: GridEncoding
+    palette: List[TilePaletteEntry] = Field(default_factory=list)
+    data: Optional[str] = None
+    tiles: Dict[Tuple[int, int], TileSummary] = Field(default_factory=dict)
+
+    @staticmethod
+    def encode_cells(grid: MapGrid, encoding: GridEncoding) -> bytes:
+        return grid.run_lengths() if encoding == GridEncoding.RLE else grid.cells.tobytes()
+
+    @classmethod
+    def from_engine(cls, region: Tuple[int, int, int, int], encoding: GridEncoding = GridEncoding.RLE):
+        """Create a snapshot of the tiles inside an inclusive (x0, y0, x1, y1) region"""
+        x0, y0, x1, y1 = region
+        snapshot = cls(
+            x0=x0,
+            y0=y0,
+            width=x1 - x0 + 1,
+            height=y1 - y0 + 1,
+            revision=Tile.get_revision(region),
+            encoding=encoding
+        )
+        if encoding == GridEncoding.TILES:
+            placed = sorted(Tile.iter_cells(region), key=lambda cell: cell[1])
+            snapshot.tiles = {position: TileSummary.from_cell(uuid, position, cell_type) for uuid, position, cell_type in placed}
+            return snapshot
+        grid = Tile.export_grid(region).compacted()
+        snapshot.palette = [TilePaletteEntry.from_engine(cell_type) for cell_type in grid.palette]
+        snapshot.data = base64.b64encode(cls.encode_cells(grid, encoding)).decode()
+        return snapshot
+
@@ -1,3 +1,6 @@
+import argparse
+import json
+import subprocess
 import uvicorn
 import sys
 import os
@@ -5,10 +8,50 @@ import os
 # Add the parent directory to sys.path to allow importing from dnd package
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_workers(encounters, host, port):
+    """Start one worker process per encounter on the ports following the router port"""
+    workers = {}
+    processes = []
+    for index, encounter in enumerate(encounters):
+        worker_port = port + 1 + index
+        env = dict(os.environ, DND_ENCOUNTER=encounter)
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", APP_DIR, "--host", host, "--port", str(worker_port)],
+            env=env,
+        ))
+        workers[encounter] = f"http://{host}:{worker_port}"
+    return workers, processes
+
+
 if __name__ == "__main__":
-    print("Starting DnD Engine API server...")
-    print("API Documentation available at:")
-    print("  - Swagger UI: http://localhost:8000/docs")
-    print("  - ReDoc: http://localhost:8000/redoc")
-    print("\nPress Ctrl+C to stop the server")
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True, app_dir=os.path.dirname(os.path.abspath(__file__))) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the DnD Engine API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--encounters", default=None,
+                        help="Comma separated encounter ids, each served by its own worker process behind a local router")
+    args = parser.parse_args()
+
+    if args.encounters is None:
+        print("Starting DnD Engine API server...")
+        print("API Documentation available at:")
+        print(f"  - Swagger UI: http://localhost:{args.port}/docs")
+        print(f"  - ReDoc: http://localhost:{args.port}/redoc")
+        print("\nPress Ctrl+C to stop the server")
+        uvicorn.run("main:app", host=args.host, port=args.port, reload=True, app_dir=APP_DIR)
+    else:
+        encounters = [encounter.strip() for encounter in args.encounters.split(",") if encounter.strip()]
+        workers, processes = start_workers(encounters, "127.0.0.1", args.port)
+        os.environ["DND_SHARDS"] = json.dumps(workers)
+        print(f"Starting DnD Engine router on port {args.port} with {len(workers)} workers:")
+        for encounter, worker in workers.items():
+            print(f"  - {encounter}: {worker}")
+        try:
+            uvicorn.run("shard_router:app", host=args.host, port=args.port, app_dir=APP_DIR)
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
@@ -0,0 +1,140 @@
+"""
+Local router of the sharded deployment started by `run_server.py --encounters`.
+
+The engine keeps its state in process wide registries, so each worker process holds the world of a
+single encounter. The router owns the table from encounter id to worker and forwards every `/api`
+request to the worker of its encounter, given by the `X-Encounter` header or the `encounter` query
+parameter. WebSockets are not forwarded: `GET /router/encounters/{encounter}` gives the worker to
+open the event stream on.
+"""
+import json
+import os
+import sys
+from typing import Dict, Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request, Response
+from pydantic import BaseModel
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.execution import DEFAULT_ENCOUNTER
+
+ENCOUNTER_HEADER = "X-Encounter"
+# headers describing a single hop, not forwarded either way
+HOP_HEADERS = {"host", "connection", "keep-alive", "transfer-encoding", "content-length", "content-encoding", "upgrade"}
+
+
+class ShardTable:
+    """ the worker url of each encounter"""
+
+    def __init__(self, assignments: Dict[str, str]):
+        self._assignments = dict(assignments)
+
+    def owner(self, encounter: str) -> str:
+        worker = self._assignments.get(encounter)
+        if worker is None:
+            raise HTTPException(status_code=404, detail=f"Unknown encounter {encounter}")
+        return worker
+
+    def move(self, encounter: str, worker: str) -> None:
+        self.owner(encounter)
+        self._assignments[encounter] = worker
+
+    def as_dict(self) -> Dict[str, str]:
+        return dict(self._assignments)
+
+
+class HandoffRequest(BaseModel):
+    target: str
+
+
+def encounter_of(request: Request) -> str:
+    return request.headers.get(ENCOUNTER_HEADER) or request.query_params.get("encounter") or DEFAULT_ENCOUNTER
+
+
+def create_router(assignments: Dict[str, str], client: Optional[httpx.AsyncClient] = None) -> FastAPI:
+    """
+    Create the router app.
+
+    Args:
+        assignments: The worker base url of each encounter
+        client: The client reaching the workers, e.g. with an ASGI transport in tests
+    """
+    table = ShardTable(assignments)
+    client = client or httpx.AsyncClient(timeout=30.0)
+    router_app = FastAPI(title="DnD Engine router", description="Forwards the API requests to the worker of their encounter")
+    router_app.state.shards = table
+
+    @router_app.on_event("shutdown")
+    async def close_client():
+        await client.aclose()
+
+    async def call_worker(method: str, url: str, **kwargs) -> httpx.Response:
+        try:
+            return await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail=f"Worker {url} unreachable: {e}")
+
+    async def ensure_map_only(worker: str) -> None:
+        """ refuse a handoff involving a worker holding entities or events, they cannot be moved"""
+        entities = await call_worker("GET", f"{worker}/api/entities/")
+        events = await call_worker("GET", f"{worker}/api/events/", params={"limit": 1})
+        if entities.status_code != 200 or events.status_code != 200:
+            raise HTTPException(status_code=502, detail=f"Worker {worker} could not list its entities and events")
+        if entities.json() or events.json()["events"]:
+            raise HTTPException(status_code=409, detail=f"Worker {worker} holds entities or events, only a map can be handed off")
+
+    @router_app.get("/router/encounters")
+    async def list_encounters():
+        """The worker of every encounter"""
+        return table.as_dict()
+
+    @router_app.get("/router/encounters/{encounter}")
+    async def get_encounter_worker(encounter: str):
+        """The worker of an encounter, to open its event stream on"""
+        return {"encounter": encounter, "worker": table.owner(encounter)}
+
+    @router_app.post("/router/encounters/{encounter}/handoff")
+    async def handoff_encounter(encounter: str, request: HandoffRequest):
+        """
+        Move an encounter to another worker, e.g. a fresh process replacing its owner.
+
+        The map goes through the packed binary map format of `GET /api/tiles/export`. Entities hold
+        their modifiers as callables and have no serialized form, so only a map can be handed off:
+        the handoff is refused with a 409 while the owner holds entities or events, they would stay
+        in a worker nobody reaches anymore, and when the target holds some, they would appear in
+        the encounter.
+        """
+        source = table.owner(encounter)
+        if any(worker == request.target and other != encounter for other, worker in table.as_dict().items()):
+            raise HTTPException(status_code=409, detail=f"Worker {request.target} already holds another encounter")
+        for worker in (source, request.target):
+            await ensure_map_only(worker)
+        exported = await call_worker("GET", f"{source}/api/tiles/export")
+        if exported.status_code != 200:
+            raise HTTPException(status_code=502, detail=f"Export from {source} failed with {exported.status_code}")
+        imported = await call_worker("PUT", f"{request.target}/api/tiles/import", content=exported.content,
+                                     headers={"Content-Type": "application/octet-stream"})
+        if imported.status_code != 200:
+            raise HTTPException(status_code=502, detail=f"Import into {request.target} failed with {imported.status_code}")
+        table.move(encounter, request.target)
+        return {"encounter": encounter, "worker": request.target, "map": imported.json()}
+
+    @router_app.api_route("/api/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    async def forward(path: str, request: Request):
+        """Forward a request to the worker of its encounter"""
+        encounter = encounter_of(request)
+        worker = table.owner(encounter)
+        headers = {name: value for name, value in request.headers.items() if name.lower() not in HOP_HEADERS}
+        headers[ENCOUNTER_HEADER] = encounter
+        upstream = await call_worker(request.method, f"{worker}/api/{path}", params=request.query_params,
+                                     content=await request.body(), headers=headers)
+        response_headers = {name: value for name, value in upstream.headers.items() if name.lower() not in HOP_HEADERS}
+        return Response(content=upstream.content, status_code=upstream.status_code, headers=response_headers)
+
+    return router_app
+
+
+# `run_server.py` passes the table through the environment, {"encounter": "http://host:port"}
+app = create_router(json.loads(os.environ.get("DND_SHARDS", "{}")))
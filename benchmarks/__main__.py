@@ -0,0 +1,60 @@
+"""
+Run the benchmark suite, save its results as a baseline or compare them with one.
+
+    python -m benchmarks                          # run and print every case
+    python -m benchmarks --save                   # store the results as the local baseline
+    python -m benchmarks --compare                # fail when a case is slower than the baseline
+    python -m benchmarks map. --min-time 0.5      # only the cases containing "map."
+"""
+import argparse
+import os
+import sys
+
+from benchmarks import harness, suite  # noqa: F401, registers the benchmarks
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "local.json")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Time the engine hot paths")
+    parser.add_argument("cases", nargs="*", help="Only run the cases containing one of these substrings")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file to save or compare with")
+    parser.add_argument("--save", action="store_true", help="Store the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare the results with the baseline")
+    parser.add_argument("--tolerance", type=float, default=harness.DEFAULT_TOLERANCE,
+                        help="Allowed slowdown before a case counts as regressed, 0.25 for 25%%")
+    parser.add_argument("--min-time", type=float, default=harness.DEFAULT_MIN_TIME, help="Seconds per repeat")
+    parser.add_argument("--repeats", type=int, default=harness.DEFAULT_REPEATS)
+    parser.add_argument("--list", action="store_true", help="List the cases without running them")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (_, params) in harness.BENCHMARKS.items():
+            for param in params:
+                print(harness.case_name(name, param))
+        return 0
+
+    def report(case, result):
+        print(f"{case:<45} {result['seconds'] * 1e6:>12.1f} us  {result['ops_per_second']:>12.1f} ops/s")
+
+    document = harness.run(args.cases, min_time=args.min_time, repeats=args.repeats, report=report)
+    status = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}, run with --save first")
+            return 2
+        rows = harness.compare(document, harness.load(args.baseline), tolerance=args.tolerance)
+        print()
+        for row in rows:
+            print(f"{row['case']:<45} {row['ratio']:>6.2f}x  {row['status']}")
+        if any(row["status"] == "regressed" for row in rows):
+            status = 1
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        harness.save(document, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Timing, baselines and comparison of the benchmark suite.
+
+A benchmark is a setup function taking one parameter, e.g. a map size, and returning the callable
+to time, or a `Stateful` case when each call changes the state the next one runs on. Each callable is
+run in loops long enough to time reliably, the best of several repeats is kept, and the results are
+stored as JSON so later runs on the same machine can be compared with it.
+"""
+import json
+import platform
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+DEFAULT_MIN_TIME = 0.1
+DEFAULT_REPEATS = 5
+DEFAULT_TOLERANCE = 0.25
+
+
+
+class Stateful(NamedTuple):
+    """ a callable whose calls change the world, e.g. damage a creature and log events, and the untimed
+    `before` step restoring the state before each call so every call does the same work"""
+    func: Callable[[], Any]
+    before: Callable[[], Any]
+
+
+Setup = Callable[[Any], Union[Callable[[], Any], Stateful]]
+
+BENCHMARKS: Dict[str, Tuple[Setup, List[Any]]] = {}
+
+
+def benchmark(name: str, params: Iterable[Any] = (None,)) -> Callable[[Setup], Setup]:
+    """ register a setup function as the benchmark `name`, run once per parameter"""
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = (setup, list(params))
+        return setup
+    return register
+
+
+def case_name(name: str, param: Any) -> str:
+    return name if param is None else f"{name}[{param}]"
+
+
+def _time_loops(func: Callable[[], Any], loops: int, before: Optional[Callable[[], Any]] = None) -> float:
+    if before is None:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        return time.perf_counter() - start
+    elapsed = 0.0
+    for _ in range(loops):
+        before()
+        start = time.perf_counter()
+        func()
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def time_callable(func: Callable[[], Any], min_time: float = DEFAULT_MIN_TIME, repeats: int = DEFAULT_REPEATS,
+                  before: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """
+    Time a callable, doubling the loop count until one repeat takes `min_time`. With `before`, it is
+    called ahead of every call and only the calls themselves are timed.
+
+    Returns:
+        The best seconds per call, the operations per second it gives and the loop count
+    """
+    loops = 1
+    while True:
+        elapsed = _time_loops(func, loops, before)
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    best = elapsed
+    for _ in range(repeats - 1):
+        best = min(best, _time_loops(func, loops, before))
+    seconds = best / loops
+    return {"seconds": seconds, "ops_per_second": 1.0 / seconds if seconds else float("inf"), "loops": loops}
+
+
+def run(selected: Optional[Iterable[str]] = None, min_time: float = DEFAULT_MIN_TIME, repeats: int = DEFAULT_REPEATS,
+        report: Optional[Callable[[str, Dict[str, float]], None]] = None) -> Dict[str, Any]:
+    """
+    Run the registered benchmarks whose case name contains one of the `selected` substrings, all by default.
+
+    Returns:
+        The results document, with the machine description and the timing of every case
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    for name, (setup, params) in BENCHMARKS.items():
+        for param in params:
+            case = case_name(name, param)
+            if selected and not any(pattern in case for pattern in selected):
+                continue
+            target = setup(param)
+            if isinstance(target, Stateful):
+                results[case] = time_callable(target.func, min_time=min_time, repeats=repeats, before=target.before)
+            else:
+                results[case] = time_callable(target, min_time=min_time, repeats=repeats)
+            if report is not None:
+                report(case, results[case])
+    return {
+        "machine": {"platform": platform.platform(), "processor": platform.processor(), "python": platform.python_version()},
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def save(document: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as handle:
+        json.dump(document, handle, indent=2, sort_keys=True)
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    Compare the cases present in both documents.
+
+    A case regresses when it takes more than (1 + tolerance) times its baseline time and improves
+    when it takes less than 1 / (1 + tolerance) times it.
+
+    Returns:
+        One row per common case with its ratio to the baseline and a status of regressed, improved or ok
+    """
+    rows = []
+    for case, result in current["results"].items():
+        reference = baseline["results"].get(case)
+        if reference is None:
+            continue
+        ratio = result["seconds"] / reference["seconds"]
+        status = "regressed" if ratio > 1 + tolerance else "improved" if ratio < 1 / (1 + tolerance) else "ok"
+        rows.append({"case": case, "baseline": reference["seconds"], "current": result["seconds"], "ratio": ratio, "status": status})
+    return rows
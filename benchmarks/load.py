@@ -0,0 +1,162 @@
+"""
+Encounter scale load generator for the FastAPI app.
+
+Drives `app.main:app` in process through an ASGI transport, so nothing listens on a port and the
+startup demo entities are not created: each run generates an encounter with one pair of warriors
+per session instead. Every session plays turns like a client would, refreshing its action economy,
+stepping around its target, attacking it and polling the summaries and the new events, and the
+latency of every request is recorded per route.
+
+    python -m benchmarks.load --sessions 1,8,32 --turns 10
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks.scenarios import generate_encounter, reset_world
+from dnd.core.base_tiles import Tile
+from dnd.entity import Entity
+
+NEIGHBORS = ((1, 0), (0, 1), (-1, 0), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class LatencyRecorder:
+    """ the latency samples and error counts of every route"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    async def call(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.samples[route].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+    def report(self, wall_time: float) -> Dict[str, Dict[str, float]]:
+        """ count, errors, requests per second and p50, p95, p99 latency in milliseconds of every route and of all of them"""
+        routes = dict(self.samples)
+        routes["all"] = [sample for samples in self.samples.values() for sample in samples]
+        report = {}
+        for route, samples in routes.items():
+            if not samples:
+                continue
+            p50, p95, p99 = np.percentile(np.array(samples) * 1000.0, [50, 95, 99])
+            errors = sum(self.errors.values()) if route == "all" else self.errors[route]
+            report[route] = {
+                "count": len(samples),
+                "errors": errors,
+                "requests_per_second": len(samples) / wall_time if wall_time else 0.0,
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+            }
+        return report
+
+
+def _free_cell_next_to(position: Tuple[int, int], exclude: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+    for dx, dy in NEIGHBORS:
+        cell = (position[0] + dx, position[1] + dy)
+        if cell != exclude and Tile.is_walkable(cell) and not Entity.get_all_entities_at_position(cell):
+            return cell
+    return None
+
+
+def prepare_sessions(sessions: int, seed: int = 0) -> List[Tuple[str, str, List[Tuple[int, int]]]]:
+    """
+    Generate the encounter of a run, sized for the sessions, and plan each session.
+
+    Returns:
+        One (attacker uuid, defender uuid, cells the attacker alternates between) per session
+    """
+    side = max(16, math.ceil(math.sqrt(sessions * 2 * 12)))
+    entities = generate_encounter(sessions * 2, width=side, height=side, seed=seed)
+    plans = []
+    for attacker, defender in zip(entities[::2], entities[1::2]):
+        cells = [attacker.position]
+        step = _free_cell_next_to(defender.position, attacker.position)
+        if step is not None:
+            cells.append(step)
+        plans.append((str(attacker.uuid), str(defender.uuid), cells))
+    return plans
+
+
+async def play_session(client: httpx.AsyncClient, recorder: LatencyRecorder, attacker: str, defender: str,
+                       cells: List[Tuple[int, int]], turns: int, think: float = 0.0) -> None:
+    """ play the turns of one game, `think` seconds pass between the requests"""
+    cursor = 0
+    for turn in range(turns):
+        await recorder.call(client, "POST /entities/{uuid}/action-economy/refresh", "POST",
+                            f"/api/entities/{attacker}/action-economy/refresh")
+        if len(cells) > 1:
+            await recorder.call(client, "POST /entities/{uuid}/move", "POST", f"/api/entities/{attacker}/move",
+                                json={"position": list(cells[(turn + 1) % len(cells)])})
+        await recorder.call(client, "POST /entities/{uuid}/attack/{target}", "POST", f"/api/entities/{attacker}/attack/{defender}")
+        await recorder.call(client, "GET /entities/summaries", "GET", "/api/entities/summaries")
+        page = await recorder.call(client, "GET /events/", "GET", "/api/events/", params={"after": cursor, "limit": 100})
+        if page.status_code == 200:
+            cursor = page.json()["next_cursor"]
+        if think:
+            await asyncio.sleep(think)
+
+
+async def run_load(sessions: int, turns: int, think: float = 0.0, seed: int = 0) -> Dict[str, Any]:
+    """
+    Play `sessions` concurrent games of `turns` turns against a freshly generated encounter.
+
+    Returns:
+        The run settings, its wall time and the per route report of `LatencyRecorder.report`
+    """
+    from app.main import app
+
+    plans = prepare_sessions(sessions, seed=seed)
+    recorder = LatencyRecorder()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(play_session(client, recorder, attacker, defender, cells, turns, think)
+                               for attacker, defender, cells in plans))
+        wall_time = time.perf_counter() - start
+    reset_world()
+    return {"sessions": sessions, "turns": turns, "think": think, "wall_time": wall_time, "routes": recorder.report(wall_time)}
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"\n{result['sessions']} sessions x {result['turns']} turns in {result['wall_time']:.2f}s")
+    print(f"{'route':<48} {'count':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, row in result["routes"].items():
+        print(f"{route:<48} {row['count']:>6} {row['errors']:>6} {row['requests_per_second']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description="Load the API with concurrent generated games")
+    parser.add_argument("--sessions", default="1,4,16", help="Comma separated concurrency levels, one run each")
+    parser.add_argument("--turns", type=int, default=10, help="Turns played by every session")
+    parser.add_argument("--think", type=float, default=0.0, help="Seconds between the turns of a session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for sessions in (int(level) for level in args.sessions.split(",") if level.strip()):
+        result = asyncio.run(run_load(sessions, args.turns, think=args.think, seed=args.seed))
+        print_report(result)
+        results.append(result)
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(results, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,93 @@
+"""
+Generated worlds for the benchmarks and the load generator.
+
+The engine keeps its state in process wide registries, so a scenario starts by clearing them and
+then loads a random map and spawns warriors on its floor, paired up as each other's targets.
+"""
+import os
+import sys
+from typing import List, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dnd.core.base_block import BaseBlock
+from dnd.core.base_object import BaseObject
+from dnd.core.base_tiles import Tile
+from dnd.core.change_tracker import ChangeTracker
+from dnd.core.dice import Dice, DiceRoll
+from dnd.core.events import EventQueue
+from dnd.core.map_io import DEFAULT_LEGEND, MapGrid
+from dnd.core.threat_map import ThreatMap
+from dnd.core.values import BaseValue
+from dnd.entity import Entity
+from dnd.monsters.circus_fighter import create_warrior
+
+
+def reset_world() -> None:
+    """ clear the engine registries, like a fresh worker process"""
+    EventQueue.clear()
+    Entity._entity_registry.clear()
+    Entity._entity_by_position.clear()
+    ThreatMap.clear()
+    ChangeTracker.clear()
+    Tile.detach_store()
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._hierarchical_pathfinder = None
+    Tile._path_trees.clear()
+    # the blocks, values, modifiers and dice of the previous world are only reachable from here
+    BaseBlock._registry.clear()
+    BaseValue._registry.clear()
+    BaseObject._registry.clear()
+    Dice._registry.clear()
+    DiceRoll._registry.clear()
+
+
+def generate_map(width: int, height: int, wall_ratio: float = 0.15, seed: int = 0) -> MapGrid:
+    """ a random map of floor with scattered walls, surrounded by a wall border"""
+    rng = np.random.default_rng(seed)
+    cells = np.where(rng.random((height, width)) < wall_ratio, 2, 1).astype(np.uint8)
+    cells[[0, -1], :] = 2
+    cells[:, [0, -1]] = 2
+    return MapGrid(cells, [DEFAULT_LEGEND["."], DEFAULT_LEGEND["#"]])
+
+
+def floor_positions(grid: MapGrid) -> List[Tuple[int, int]]:
+    ys, xs = np.nonzero(grid.cells == 1)
+    return [(int(x) + grid.x0, int(y) + grid.y0) for x, y in zip(xs, ys)]
+
+
+def generate_encounter(entity_count: int, width: int = 32, height: int = 32, seed: int = 0,
+                       update_senses: bool = True) -> List[Entity]:
+    """
+    Reset the world and fill it with a random map and `entity_count` warriors on distinct floor cells.
+    Warriors are paired in spawn order and placed side by side when possible, so each pair can fight.
+    """
+    reset_world()
+    grid = generate_map(width, height, seed=seed)
+    Tile.load_grid(grid)
+    free = set(floor_positions(grid))
+    rng = np.random.default_rng(seed)
+    candidates = sorted(free)
+    rng.shuffle(candidates)
+
+    entities: List[Entity] = []
+    for index in range(entity_count):
+        position = None
+        if index % 2 and entities:
+            x, y = entities[-1].position
+            position = next(((x + dx, y + dy) for dx, dy in ((1, 0), (0, 1), (-1, 0), (0, -1), (1, 1), (-1, -1))
+                             if (x + dx, y + dy) in free), None)
+        if position is None:
+            position = next(candidate for candidate in candidates if candidate in free)
+        free.discard(position)
+        entities.append(create_warrior(source_id=uuid4(), proficiency_bonus=2, name=f"Warrior {index}", position=position))
+    for first, second in zip(entities[::2], entities[1::2]):
+        first.set_target_entity(second.uuid)
+        second.set_target_entity(first.uuid)
+    if update_senses:
+        Entity.update_all_entities_senses()
+    return entities
@@ -0,0 +1,109 @@
+"""
+The engine hot paths timed by `python -m benchmarks`.
+
+Importing this module registers the benchmarks. Setup work, e.g. generating the encounter, happens
+when a case runs and is not timed.
+"""
+from uuid import uuid4
+
+from benchmarks.harness import Stateful, benchmark
+from benchmarks.scenarios import generate_encounter, generate_map
+from dnd.actions import Attack
+from dnd.core.dijkstra import dijkstra
+from dnd.core.events import WeaponSlot
+from dnd.core.modifiers import NumericalModifier
+from dnd.core.shadowcast import compute_fov
+from dnd.core.values import ModifiableValue
+from dnd.entity import Entity
+
+MAP_SIZES = (32, 64, 128)
+
+
+def _value_with_modifiers(source_uuid, count: int) -> ModifiableValue:
+    value = ModifiableValue.create(source_entity_uuid=source_uuid, base_value=10, value_name="Benchmark")
+    for index in range(count):
+        value.self_static.add_value_modifier(NumericalModifier(source_entity_uuid=source_uuid, target_entity_uuid=source_uuid,
+                                                               name=f"Modifier {index}", value=index % 5 - 2))
+    return value
+
+
+@benchmark("values.score", params=(0, 10, 100))
+def value_score(modifiers: int):
+    value = _value_with_modifiers(uuid4(), modifiers)
+    return lambda: value.score
+
+
+@benchmark("values.combine_values", params=(2, 8))
+def combine_values(count: int):
+    source_uuid = uuid4()
+    values = [_value_with_modifiers(source_uuid, 5) for _ in range(count)]
+    return lambda: values[0].combine_values(values[1:])
+
+
+@benchmark("entity.attack_bonus")
+def attack_bonus(_):
+    attacker, defender = generate_encounter(2)
+    return lambda: attacker.attack_bonus(WeaponSlot.MAIN_HAND, defender.uuid)
+
+
+@benchmark("entity.ac_bonus")
+def ac_bonus(_):
+    attacker, defender = generate_encounter(2)
+    return lambda: defender.ac_bonus(attacker.uuid)
+
+
+@benchmark("actions.attack_apply")
+def attack_apply(_):
+    # an attack logs events and damages its target, every call gets a fresh encounter so the
+    # event log and the hit points are the same for each one
+    encounter = []
+
+    def fresh_encounter():
+        encounter[:] = generate_encounter(2)
+
+    def attack():
+        attacker, defender = encounter
+        return Attack(source_entity_uuid=attacker.uuid, target_entity_uuid=defender.uuid, weapon_slot=WeaponSlot.MAIN_HAND).apply()
+    return Stateful(attack, fresh_encounter)
+
+
+@benchmark("map.compute_fov", params=MAP_SIZES)
+def field_of_view(size: int):
+    grid = generate_map(size, size)
+    walls = grid.cells == 2
+    origin = (size // 2, size // 2)
+    walls[origin[1], origin[0]] = False
+
+    def is_blocking(x: int, y: int) -> bool:
+        return not (0 <= x < size and 0 <= y < size) or bool(walls[y, x])
+
+    def fov():
+        visible = set()
+        compute_fov(origin, is_blocking, lambda x, y: visible.add((x, y)))
+        return visible
+    return fov
+
+
+@benchmark("map.dijkstra", params=MAP_SIZES)
+def shortest_paths(size: int):
+    grid = generate_map(size, size)
+    floor = grid.cells == 1
+    start = (size // 2, size // 2)
+    floor[start[1], start[0]] = True
+
+    def is_walkable(x: int, y: int) -> bool:
+        return bool(floor[y, x])
+    return lambda: dijkstra(start, is_walkable, size, size)
+
+
+@benchmark("entity.update_all_entities_senses", params=(4, 16, 64))
+def update_senses(count: int):
+    generate_encounter(count, width=64, height=64, update_senses=False)
+    return Entity.update_all_entities_senses
+
+
+@benchmark("api.entity_snapshot")
+def entity_snapshot(_):
+    from app.models.entity import EntitySnapshot
+    attacker, _defender = generate_encounter(2)
+    return lambda: EntitySnapshot.from_engine(attacker, include_attack_calculations=True, include_ac_calculation=True)
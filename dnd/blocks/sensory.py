@@ -10,8 +10,14 @@ from functools import cached_property
 from typing import Literal as TypeLiteral
 import math
 from collections import defaultdict
+from collections.abc import MutableMapping, MutableSet
+from typing import Iterator, Iterable
+
+import numpy as np
+from pydantic import PrivateAttr, TypeAdapter, model_serializer, SerializationInfo, SerializerFunctionWrapHandler, ValidatorFunctionWrapHandler
 
 from dnd.core.base_block import BaseBlock
+from dnd.core.grid_mask import GridWindow, reframe, crop, chains_all_set
 
 class SensesType(str, Enum):
     BLINDSIGHT = "Blindsight"
@@ -19,16 +25,315 @@ class SensesType(str, Enum):
     TREMORSENSE = "Tremorsense"
     TRUESIGHT = "Truesight"
 
+class SensesDelta(BaseModel):
+    """ What changes in the senses of an entity when it steps on a position, relative to the previous step"""
+    position: Tuple[int,int] = Field(description="The position of the step")
+    visible_added: List[Tuple[int,int]] = Field(default_factory=list, description="Positions that became visible")
+    visible_removed: List[Tuple[int,int]] = Field(default_factory=list, description="Positions that are no longer visible")
+    entities_added: Dict[UUID,Tuple[int,int]] = Field(default_factory=dict, description="Entities that became visible with their position")
+    entities_removed: List[UUID] = Field(default_factory=list, description="Entities that are no longer visible")
+
+class CellFlags(MutableMapping):
+    """ A dict like view of a tri-state array of the senses (-1 unknown, 0 False, 1 True)"""
+
+    def __init__(self, senses: 'Senses', name: str):
+        self._senses = senses
+        self._name = name
+
+    def _array(self) -> np.ndarray:
+        return getattr(self._senses, self._name)
+
+    def __getitem__(self, position: Tuple[int,int]) -> bool:
+        index = self._senses._window.flat_index(position)
+        value = self._array().flat[index] if index >= 0 else -1
+        if value < 0:
+            raise KeyError(position)
+        return bool(value)
+
+    def __setitem__(self, position: Tuple[int,int], value: bool) -> None:
+        self._senses._ensure_window([position])
+        self._array().flat[self._senses._window.flat_index(position)] = 1 if value else 0
+
+    def __delitem__(self, position: Tuple[int,int]) -> None:
+        index = self._senses._window.flat_index(position)
+        if index < 0 or self._array().flat[index] < 0:
+            raise KeyError(position)
+        self._array().flat[index] = -1
+
+    def __contains__(self, position: object) -> bool:
+        if not isinstance(position, tuple):
+            return False
+        index = self._senses._window.flat_index(position)
+        return index >= 0 and self._array().flat[index] >= 0
+
+    def __iter__(self) -> Iterator[Tuple[int,int]]:
+        for x, y in self._senses._window.positions(self._array() >= 0):
+            yield (int(x), int(y))
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._array() >= 0))
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class PathTree(MutableMapping):
+    """
+    A dict like view of the paths of the senses. Paths are stored as a predecessor array over the
+    senses window and rebuilt on access, paths that do not fit in the tree are kept as lists.
+    Missing positions read as an empty path, as with a defaultdict, without being inserted.
+    """
+
+    def __init__(self, senses: 'Senses'):
+        self._senses = senses
+
+    def __getitem__(self, position: Tuple[int,int]) -> List[Tuple[int,int]]:
+        senses = self._senses
+        if position in senses._extra_paths:
+            return senses._extra_paths[position]
+        window = senses._window
+        index = window.flat_index(position)
+        if index < 0 or not senses._has_path.flat[index]:
+            return []
+        predecessors = senses._predecessors.ravel()
+        path = [position]
+        while predecessors[index] != index and len(path) <= predecessors.size:
+            index = int(predecessors[index])
+            path.append(window.position(index))
+        path.reverse()
+        return path
+
+    def get(self, position: Tuple[int,int], default: Any = None) -> Any:
+        return self[position] if position in self else default
+
+    def __setitem__(self, position: Tuple[int,int], path: List[Tuple[int,int]]) -> None:
+        senses = self._senses
+        self._remove(position)
+        if not path or path[-1] != position or len(set(path)) != len(path):
+            senses._extra_paths[position] = list(path)
+            return
+        senses._ensure_window(path)
+        window = senses._window
+        predecessors = senses._predecessors.ravel()
+        indices = [window.flat_index(cell) for cell in path]
+        wanted = [indices[0]] + indices[:-1]
+        if any(predecessors[index] not in (-1, parent) for index, parent in zip(indices, wanted)):
+            senses._extra_paths[position] = list(path)
+            return
+        predecessors[indices] = wanted
+        senses._has_path.flat[indices[-1]] = True
+
+    def _remove(self, position: Tuple[int,int]) -> bool:
+        senses = self._senses
+        removed = senses._extra_paths.pop(position, None) is not None
+        index = senses._window.flat_index(position)
+        if index >= 0 and senses._has_path.flat[index]:
+            senses._has_path.flat[index] = False
+            removed = True
+        return removed
+
+    def __delitem__(self, position: Tuple[int,int]) -> None:
+        if not self._remove(position):
+            raise KeyError(position)
+
+    def __contains__(self, position: object) -> bool:
+        if not isinstance(position, tuple):
+            return False
+        senses = self._senses
+        if position in senses._extra_paths:
+            return True
+        index = senses._window.flat_index(position)
+        return index >= 0 and bool(senses._has_path.flat[index])
+
+    def __iter__(self) -> Iterator[Tuple[int,int]]:
+        for x, y in self._senses._window.positions(self._senses._has_path):
+            yield (int(x), int(y))
+        yield from list(self._senses._extra_paths)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._senses._has_path)) + len(self._senses._extra_paths)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class SeenCells(MutableSet):
+    """ A set like view of the boolean mask of the positions seen by the senses"""
+
+    def __init__(self, senses: 'Senses'):
+        self._senses = senses
+
+    def __contains__(self, position: object) -> bool:
+        if not isinstance(position, tuple):
+            return False
+        index = self._senses._seen_window.flat_index(position)
+        return index >= 0 and bool(self._senses._seen.flat[index])
+
+    def __iter__(self) -> Iterator[Tuple[int,int]]:
+        for x, y in self._senses._seen_window.positions(self._senses._seen):
+            yield (int(x), int(y))
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._senses._seen))
+
+    def add(self, position: Tuple[int,int]) -> None:
+        self.update([position])
+
+    def discard(self, position: Tuple[int,int]) -> None:
+        index = self._senses._seen_window.flat_index(position)
+        if index >= 0:
+            self._senses._seen.flat[index] = False
+
+    def update(self, positions: Iterable[Tuple[int,int]]) -> None:
+        positions = list(positions)
+        window = GridWindow.enclosing(positions)
+        mask = np.zeros(window.shape, dtype=bool)
+        if positions:
+            points = np.asarray(positions, dtype=np.int64)
+            mask[points[:, 0] - window.x0, points[:, 1] - window.y0] = True
+        self._senses._mark_seen(window, mask)
+
+    def __repr__(self) -> str:
+        return repr(set(self))
+
+
 class Senses(BaseBlock):
-    """ A block that contains the senses of a creature"""
+    """ A block that contains the senses of a creature
+
+    The visible, walkable, paths and seen attributes behave like the dicts and set they used to be but
+    are backed by compact arrays aligned on a window of the grid: tri-state masks for visibility and
+    walkability, a predecessor array for the paths and a boolean mask for the seen positions, so
+    combining them is done with vectorized boolean operations. They are still accepted by the
+    constructor and part of the dump with their dict and set types."""
     entities : Dict[UUID,Tuple[int,int]] = Field(default_factory=dict)
-    visible: Dict[Tuple[int,int],bool] = Field(default_factory=dict)
-    walkable: Dict[Tuple[int,int],bool] = Field(default_factory=dict)
-    paths: DefaultDict[Tuple[int,int],List[Tuple[int,int]]] = Field(default_factory=lambda: defaultdict(list))
     extra_senses: List[SensesType] = Field(default_factory=list)
-    seen: Set[Tuple[int,int]] = Field(default_factory=set, description="A list of positions that the entity has seen")
+    _array_fields: ClassVar[Dict[str, TypeAdapter]] = {
+        "visible": TypeAdapter(Dict[Tuple[int,int],bool]),
+        "walkable": TypeAdapter(Dict[Tuple[int,int],bool]),
+        "paths": TypeAdapter(Dict[Tuple[int,int],List[Tuple[int,int]]]),
+        "seen": TypeAdapter(Set[Tuple[int,int]]),
+    }
+    _window: GridWindow = PrivateAttr(default_factory=GridWindow)
+    _visible: np.ndarray = PrivateAttr(default_factory=lambda: np.zeros((0, 0), dtype=np.int8))
+    _walkable: np.ndarray = PrivateAttr(default_factory=lambda: np.zeros((0, 0), dtype=np.int8))
+    _predecessors: np.ndarray = PrivateAttr(default_factory=lambda: np.zeros((0, 0), dtype=np.int32))
+    _has_path: np.ndarray = PrivateAttr(default_factory=lambda: np.zeros((0, 0), dtype=bool))
+    _extra_paths: Dict[Tuple[int,int],List[Tuple[int,int]]] = PrivateAttr(default_factory=dict)
+    _seen_window: GridWindow = PrivateAttr(default_factory=GridWindow)
+    _seen: np.ndarray = PrivateAttr(default_factory=lambda: np.zeros((0, 0), dtype=bool))
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _route_array_fields(cls, data: Any, handler: ValidatorFunctionWrapHandler) -> 'Senses':
+        """ build the model without the array backed fields, then set them through their setters"""
+        if not isinstance(data, dict) or not any(name in data for name in cls._array_fields):
+            return handler(data)
+        data = dict(data)
+        values = {name: data.pop(name) for name in list(cls._array_fields) if name in data}
+        senses = handler(data)
+        for name, value in values.items():
+            if isinstance(value, dict):
+                # JSON dumps write the position keys as "x,y"
+                value = {tuple(int(part) for part in key.strip("()").split(",")) if isinstance(key, str) else key: item
+                         for key, item in value.items()}
+            setattr(senses, name, cls._array_fields[name].validate_python(value))
+        return senses
+
+    @model_serializer(mode="wrap")
+    def _serialize_array_fields(self, handler: SerializerFunctionWrapHandler, info: SerializationInfo) -> Dict[str, Any]:
+        data = handler(self)
+        data["visible"] = self._array_fields["visible"].dump_python(dict(self.visible), mode=info.mode)
+        data["walkable"] = self._array_fields["walkable"].dump_python(dict(self.walkable), mode=info.mode)
+        data["paths"] = self._array_fields["paths"].dump_python(dict(self.paths), mode=info.mode)
+        data["seen"] = self._array_fields["seen"].dump_python(set(self.seen), mode=info.mode)
+        return data
+
+    @property
+    def visible(self) -> CellFlags:
+        return CellFlags(self, "_visible")
 
+    @visible.setter
+    def visible(self, visible: Dict[Tuple[int,int],bool]) -> None:
+        self._set_flags("_visible", visible)
 
+    @property
+    def walkable(self) -> CellFlags:
+        return CellFlags(self, "_walkable")
+
+    @walkable.setter
+    def walkable(self, walkable: Dict[Tuple[int,int],bool]) -> None:
+        self._set_flags("_walkable", walkable)
+
+    @property
+    def paths(self) -> PathTree:
+        return PathTree(self)
+
+    @paths.setter
+    def paths(self, paths: Dict[Tuple[int,int],List[Tuple[int,int]]]) -> None:
+        self._predecessors.fill(-1)
+        self._has_path.fill(False)
+        self._extra_paths = {}
+        tree = PathTree(self)
+        for position, path in paths.items():
+            tree[position] = path
+
+    @property
+    def seen(self) -> SeenCells:
+        """ the positions that the entity has seen"""
+        return SeenCells(self)
+
+    @seen.setter
+    def seen(self, seen: Iterable[Tuple[int,int]]) -> None:
+        self._seen_window = GridWindow()
+        self._seen = np.zeros((0, 0), dtype=bool)
+        SeenCells(self).update(seen)
+
+    def _ensure_window(self, positions: Iterable[Tuple[int,int]]) -> None:
+        """ grow the window, and every array aligned on it, to contain the positions"""
+        positions = list(positions)
+        if all(self._window.contains(position) for position in positions):
+            return
+        new_window = self._window.union(GridWindow.enclosing(positions))
+        old_window = self._window
+        old_predecessors = self._predecessors
+        self._visible = reframe(self._visible, old_window, new_window, -1)
+        self._walkable = reframe(self._walkable, old_window, new_window, -1)
+        self._has_path = reframe(self._has_path, old_window, new_window, False)
+        # flat indices have to be translated to the new window
+        predecessors = reframe(old_predecessors, old_window, new_window, -1)
+        valid = predecessors >= 0
+        if valid.any():
+            old_indices = predecessors[valid]
+            xs = old_indices // max(old_window.height, 1) + old_window.x0 - new_window.x0
+            ys = old_indices % max(old_window.height, 1) + old_window.y0 - new_window.y0
+            predecessors[valid] = xs * new_window.height + ys
+        self._predecessors = predecessors
+        self._window = new_window
+
+    def _reset_window(self, window: GridWindow) -> None:
+        self._window = window
+        self._visible = np.full(window.shape, -1, dtype=np.int8)
+        self._walkable = np.full(window.shape, -1, dtype=np.int8)
+        self._predecessors = np.full(window.shape, -1, dtype=np.int32)
+        self._has_path = np.zeros(window.shape, dtype=bool)
+        self._extra_paths = {}
+
+    def _set_flags(self, name: str, flags: Dict[Tuple[int,int],bool]) -> None:
+        getattr(self, name).fill(-1)
+        self._ensure_window(flags.keys())
+        array = getattr(self, name)
+        for position, value in flags.items():
+            array.flat[self._window.flat_index(position)] = 1 if value else 0
+
+    def _mark_seen(self, window: GridWindow, mask: np.ndarray) -> None:
+        """ union of a mask over a window into the seen mask"""
+        if window.is_empty:
+            return
+        new_window = self._seen_window.union(window)
+        self._seen = reframe(self._seen, self._seen_window, new_window, False)
+        self._seen_window = new_window
+        dx, dy = window.x0 - new_window.x0, window.y0 - new_window.y0
+        self._seen[dx:dx + window.width, dy:dy + window.height] |= mask
 
     def add_entity(self,entity_uuid: UUID,position: Tuple[int,int]):
         """ add an entity to the senses"""
@@ -54,35 +359,72 @@ class Senses(BaseBlock):
     
     def update_seen(self, visible: Dict[Tuple[int,int],bool]):
         """ update the seen list"""
-        visible_positions = set([key for key,value in visible.items() if value])
-        self.seen.update(visible_positions)
+        if isinstance(visible, CellFlags) and visible._senses is self:
+            self._mark_seen(self._window, self._visible == 1)
+            return
+        self.seen.update(key for key, value in visible.items() if value)
 
     
     def update_senses(self,  entities: Dict[UUID,Tuple[int,int]], visible: Dict[Tuple[int,int],bool], walkable: Dict[Tuple[int,int],bool],paths: DefaultDict[Tuple[int,int],List[Tuple[int,int]]]):
-        #sets all to empty dicts
-        self.entities = {}
-        self.visible = {}
-        self.walkable = {}
-        self.paths = defaultdict(list)
+        #sets all to empty arrays over a window holding the new values
+        cells = list(visible.keys()) + list(walkable.keys()) + [cell for path in paths.values() for cell in path] + list(paths.keys())
+        self._reset_window(GridWindow.enclosing(cells))
         #sets all to the new values
         self.entities = entities
         self.visible = visible
-        self.update_seen(visible)
+        self.update_seen(self.visible)
         self.walkable = walkable
         self.paths = paths
 
+    def update_from_path_tree(self, entities: Dict[UUID,Tuple[int,int]], visible: List[Tuple[int,int]], walkable: List[bool], predecessors: Dict[Tuple[int,int],Tuple[int,int]]):
+        """
+        Update the senses from a field of view and a shortest path tree without building any path.
+
+        A position keeps its path only if it is visible and every position of the path was already
+        seen, which is computed for all the positions at once on the predecessor array.
+
+        Args:
+            entities: The visible entities and their positions
+            visible: The visible positions
+            walkable: Whether each visible position is walkable
+            predecessors: The shortest path tree, each position mapped to the previous position of its path
+                and the root mapped to itself
+        """
+        window = GridWindow.enclosing(list(visible) + list(predecessors))
+        self._reset_window(window)
+        self.entities = entities
+        if visible:
+            points = np.asarray(visible, dtype=np.int64) - np.array([window.x0, window.y0])
+            self._visible[points[:, 0], points[:, 1]] = 1
+            self._walkable[points[:, 0], points[:, 1]] = np.asarray(walkable, dtype=np.int8)
+        if predecessors:
+            nodes = np.asarray(list(predecessors.keys()), dtype=np.int64) - np.array([window.x0, window.y0])
+            parents = np.asarray(list(predecessors.values()), dtype=np.int64) - np.array([window.x0, window.y0])
+            flat = self._predecessors.ravel()
+            flat[nodes[:, 0] * window.height + nodes[:, 1]] = parents[:, 0] * window.height + parents[:, 1]
+            seen = crop(self._seen, self._seen_window, window, False).ravel()
+            reachable = chains_all_set(seen, flat)
+            flat[~reachable] = -1
+            self._has_path = (reachable.reshape(window.shape)) & (self._visible == 1)
+        self.update_seen(self.visible)
+
     def get_threathened_positions(self) -> List[Tuple[int,int]]:
-        """ given a position we get all neighbors (also diagonals), we use sets to do quickly and check they are in both visible dict and a path exist"""
+        """ given a position we get all neighbors (also diagonals) that are both visible and reachable by a path"""
         position = self.position
-        neighbors = set([(position[0]+1,position[1]),
-                        (position[0]-1,position[1]),
-                        (position[0],position[1]+1),
-                        (position[0],position[1]-1),
-                        (position[0]+1,position[1]+1),
-                        (position[0]-1,position[1]-1)])
-        visible_set = set(self.visible.keys())
-        path_set = set(self.paths.keys())
-        return list(neighbors & visible_set & path_set)
+        neighbors = [(position[0]+1,position[1]),
+                     (position[0]-1,position[1]),
+                     (position[0],position[1]+1),
+                     (position[0],position[1]-1),
+                     (position[0]+1,position[1]+1),
+                     (position[0]-1,position[1]-1)]
+        indices = np.array([self._window.flat_index(neighbor) for neighbor in neighbors])
+        inside = indices >= 0
+        threatened = np.zeros(len(neighbors), dtype=bool)
+        threatened[inside] = (self._visible.ravel()[indices[inside]] >= 0) & self._has_path.ravel()[indices[inside]]
+        for i, neighbor in enumerate(neighbors):
+            if neighbor in self._extra_paths and neighbor in self.visible:
+                threatened[i] = True
+        return [neighbor for neighbor, flag in zip(neighbors, threatened) if flag]
         
 
     @classmethod
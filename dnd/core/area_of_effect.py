@@ -0,0 +1,101 @@
+import math
+from enum import Enum
+from functools import lru_cache
+from typing import Tuple, List, Callable, Iterable
+
+import numpy as np
+
+FEET_PER_CELL = 5
+# a 5e cone is as wide as it is long at its far end
+CONE_HALF_ANGLE = math.atan(0.5)
+
+
+class AreaShape(str, Enum):
+    CONE = "cone"
+    SPHERE = "sphere"
+    CUBE = "cube"
+    LINE = "line"
+
+
+def orientation_towards(origin: Tuple[int, int], target: Tuple[int, int]) -> int:
+    """ the orientation in whole degrees (0 along +x, 90 along +y) from the origin towards the target"""
+    if origin == target:
+        return 0
+    return round(math.degrees(math.atan2(target[1] - origin[1], target[0] - origin[0]))) % 360
+
+
+@lru_cache(maxsize=256)
+def template_mask(shape: AreaShape, size: int, orientation: int = 0) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Rasterize an area template relative to its point of origin.
+
+    Args:
+        shape: The template shape
+        size: The size in feet, the radius of a sphere, the length of a cone or a line and the side of a cube
+        orientation: The direction of cones, lines and cubes in whole degrees, ignored for spheres
+
+    Returns:
+        Tuple of (mask, offset) where mask[i, j] tells whether the cell at origin + offset + (i, j)
+        is covered. The mask is cached and read only.
+    """
+    cells = max(size // FEET_PER_CELL, 1)
+    extent = cells + 1
+    dx, dy = np.meshgrid(np.arange(-extent, extent + 1), np.arange(-extent, extent + 1), indexing="ij")
+    angle = math.radians(orientation)
+    ux, uy = math.cos(angle), math.sin(angle)
+    # coordinates of the cell centers along and across the orientation
+    along = dx * ux + dy * uy
+    across = -dx * uy + dy * ux
+    distance = np.hypot(dx, dy)
+
+    if shape == AreaShape.SPHERE:
+        mask = distance <= cells
+    elif shape == AreaShape.CONE:
+        mask = (along > 0) & (along <= cells) & (np.abs(across) <= along * math.tan(CONE_HALF_ANGLE) + 1e-9)
+    elif shape == AreaShape.LINE:
+        mask = (along > 0) & (along <= cells) & (np.abs(across) <= 0.5)
+    elif shape == AreaShape.CUBE:
+        # the point of origin lies on the middle of the face nearest to the caster
+        mask = (along > 0) & (along <= cells + 0.5) & (np.abs(across) <= cells / 2)
+    else:
+        raise ValueError(f"Unknown area shape {shape}")
+    mask.flags.writeable = False
+    return mask, (-extent, -extent)
+
+
+def area_cells(shape: AreaShape, size: int, origin: Tuple[int, int], orientation: int = 0) -> np.ndarray:
+    """ the (N, 2) array of positions covered by a template placed at the origin, ignoring the map"""
+    mask, (ox, oy) = template_mask(shape, size, orientation)
+    offsets = np.argwhere(mask)
+    return offsets + np.array([origin[0] + ox, origin[1] + oy])
+
+
+def filter_spread(cells: np.ndarray, origin: Tuple[int, int], exists: Callable[[int, int], bool],
+                  has_line_of_sight: Callable[[Tuple[int, int], List[Tuple[int, int]]], dict]) -> List[Tuple[int, int]]:
+    """ keep the cells that exist on the map and that the effect can reach from its origin without
+    crossing a vision blocking cell"""
+    positions = [(int(x), int(y)) for x, y in cells if exists(int(x), int(y))]
+    reachable = has_line_of_sight(origin, positions)
+    return [position for position in positions if reachable[position]]
+
+
+def positions_in_mask(positions: Iterable[Tuple[int, int]], cells: List[Tuple[int, int]]) -> np.ndarray:
+    """
+    Vectorized membership of many positions in a set of cells.
+
+    Returns:
+        Boolean array, True for the positions that fall on one of the cells
+    """
+    points = np.asarray(list(positions), dtype=np.int64).reshape(-1, 2)
+    if len(cells) == 0 or len(points) == 0:
+        return np.zeros(len(points), dtype=bool)
+    covered = np.asarray(cells, dtype=np.int64)
+    low = covered.min(axis=0)
+    high = covered.max(axis=0)
+    grid = np.zeros(high - low + 1, dtype=bool)
+    grid[covered[:, 0] - low[0], covered[:, 1] - low[1]] = True
+    inside = np.all((points >= low) & (points <= high), axis=1)
+    hits = np.zeros(len(points), dtype=bool)
+    local = points[inside] - low
+    hits[inside] = grid[local[:, 0], local[:, 1]]
+    return hits
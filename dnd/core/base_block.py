@@ -5,6 +5,7 @@ from dnd.core.values import ModifiableValue, StaticValue
 from dnd.core.modifiers import NumericalModifier, DamageType , ResistanceStatus, ContextAwareCondition, saving_throws, ResistanceModifier
 from dnd.core.base_conditions import BaseCondition
 from dnd.core.events import EventHandler, EventQueue, Trigger, Event
+from dnd.core.change_tracker import ChangeTracker
 from enum import Enum
 from random import randint
 from functools import cached_property
@@ -243,6 +244,20 @@ class BaseBlock(BaseModel):
         super().__init__(**data)
         self.__class__._registry[self.uuid] = self
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        # copies share the uuid of the registered block, only the registered one is tracked
+        if self.__class__._registry.get(self.uuid) is self:
+            ChangeTracker.mark_owned(self.uuid, name)
+
+    def register_change_owners(self, entity_uuid: UUID, block_name: Optional[str]) -> None:
+        """ register this block, its values and its sub blocks as owned by a block of an entity in the change tracker"""
+        ChangeTracker.register(self.uuid, entity_uuid, block_name)
+        for value in self.get_values():
+            value.register_change_owner(entity_uuid, block_name)
+        for block in self.get_blocks():
+            block.register_change_owners(entity_uuid, block_name)
+
     @classmethod
     def get(cls, uuid: UUID) -> Optional['BaseBlock']:
         """
@@ -547,6 +562,7 @@ class BaseBlock(BaseModel):
                 self.active_conditions.pop(sub_condition.name)
         condition.remove()
         self._remove_condition_from_dicts(condition)
+        ChangeTracker.mark_owned(self.uuid, "active_conditions")
     
     def add_condition(self, condition: BaseCondition, context: Optional[Dict[str, Any]] = None, check_save_throw: bool = True, event: Optional[Event] = None)  -> Optional[Event]:
         if not self.allow_events_conditions:
@@ -566,6 +582,7 @@ class BaseBlock(BaseModel):
             self.active_conditions[condition.name] = condition
             self.active_conditions_by_uuid[condition.uuid] = condition
             self.active_conditions_by_source[condition.source_entity_uuid].append(condition.name)
+            ChangeTracker.mark_owned(self.uuid, "active_conditions")
     
         return condition_applied
     
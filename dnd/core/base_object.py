@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List, TypeVar, Generic, Union, Tuple, ClassVar, Dict, Any
 from uuid import UUID, uuid4
+from dnd.core import metrics
 
 
 class BaseObject(BaseModel):
@@ -233,3 +234,5 @@ class BaseObject(BaseModel):
         """
         self.context = None
 
+
+metrics.gauge("dnd_base_objects", "Objects in the base object registry", function=lambda: len(BaseObject._registry))
@@ -1,4 +1,4 @@
-from typing import Dict, Optional, Any, List, Self, Literal,ClassVar, Union, Callable, Tuple, DefaultDict
+from typing import Dict, Optional, Any, List, Self, Literal,ClassVar, Union, Callable, Tuple, DefaultDict, Set, Iterator
 from uuid import UUID, uuid4
 from pydantic import BaseModel, Field, model_validator, computed_field,field_validator
 from dnd.core.values import ModifiableValue, StaticValue
@@ -8,11 +8,36 @@ from dnd.core.base_conditions import BaseCondition
 from dnd.core.events import EventHandler, Trigger, Event
 from enum import Enum
 from random import randint
+import struct
 from functools import cached_property
 from typing import Literal as TypeLiteral
-from collections import defaultdict
-from dnd.core.shadowcast import compute_fov
+from collections import defaultdict, OrderedDict
+from weakref import WeakSet
+from dnd.core.shadowcast import compute_fov, compute_fov_along_path
+from dnd.core import metrics
 from dnd.core.dijkstra import dijkstra, get_neighbors
+from dnd.core.distance_field import DistanceField, compute_distance_field
+from dnd.core.dstar_lite import DStarLite, IncrementalPathTree
+from dnd.core.hierarchical import HierarchicalPathfinder
+from dnd.core.jump_point import jump_point_search
+from dnd.core.chunked_map import ChunkedTileStore, CellType
+from dnd.core.map_io import MapGrid
+from dnd.core.line_of_sight import has_line_of_sight as line_is_clear
+from dnd.core.area_of_effect import AreaShape, area_cells, filter_spread
+
+LINE_OF_SIGHT_CACHE_REQUESTS = metrics.counter("dnd_line_of_sight_cache_requests_total", "Line of sight cache lookups", ["result"])
+DISTANCE_FIELD_CACHE_REQUESTS = metrics.counter("dnd_distance_field_cache_requests_total", "Distance field cache lookups", ["result"])
+PATH_TREE_CACHE_REQUESTS = metrics.counter("dnd_path_tree_cache_requests_total", "Live shortest path tree lookups", ["result"])
+
+
+# tiles read from a chunked store get a uuid encoding their position, so it survives eviction
+_STORE_UUID_PREFIX = b"dndstore"
+
+
+class PathStrategy(str, Enum):
+    DIJKSTRA = "dijkstra"
+    HIERARCHICAL = "hierarchical"
+    JUMP_POINT = "jump_point"
 
 
 
@@ -25,6 +50,27 @@ class Tile(BaseObject):
     sprite_name: Optional[str] = Field(default=None, description="The name of the sprite to use for the tile")
     _tile_registry: ClassVar[Dict[UUID, 'Tile']] = {}
     _tile_by_position: ClassVar[Dict[Tuple[int, int], 'Tile']] = {}
+    _map_version: ClassVar[int] = 0
+    _distance_field_cache: ClassVar[OrderedDict] = OrderedDict()
+    _distance_field_cache_size: ClassVar[int] = 64
+    _path_queries: ClassVar[WeakSet] = WeakSet()
+    _path_trees: ClassVar[OrderedDict] = OrderedDict()
+    _path_tree_cache_size: ClassVar[int] = 256
+    # total cells searched by the live trees, a tree holds its g, rhs and parent of each of them
+    _path_tree_cache_cells: ClassVar[int] = 200_000
+    _hierarchical_pathfinder: ClassVar[Optional[HierarchicalPathfinder]] = None
+    _hierarchical_cluster_size: ClassVar[int] = 16
+    _grid_fields: ClassVar[Tuple[str, ...]] = ("position", "movement_cost", "blocks_movement", "blocks_vision")
+    _store: ClassVar[Optional[ChunkedTileStore]] = None
+    _materialized_tiles: ClassVar[OrderedDict] = OrderedDict()
+    _materialized_cache_size: ClassVar[int] = 1024
+    _line_of_sight_cache: ClassVar[OrderedDict] = OrderedDict()
+    _line_of_sight_cache_size: ClassVar[int] = 4096
+    _grid_size_cache: ClassVar[Optional[Tuple[Any, Tuple[int, int]]]] = None
+    _revision: ClassVar[int] = 0
+    _region_revisions: ClassVar[Dict[Tuple[int, int], int]] = {}
+    _revision_floor: ClassVar[int] = 0
+    _revision_region_size: ClassVar[int] = 16
 
     def __init__(self, **data):
         """
@@ -36,6 +82,192 @@ class Tile(BaseObject):
         super().__init__(**data)
         self.__class__._tile_registry[self.uuid] = self
         self.__class__._tile_by_position[self.position] = self
+        Tile._materialized_tiles.pop(self.position, None)
+        if Tile._store is not None:
+            # the tile notifies the change itself, the store callback is for writes made behind its back
+            Tile._store.set_cell(self.position, self.cell_type(), notify=False)
+        Tile._map_changed(self.position)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in Tile._grid_fields or name in ("name", "sprite_name"):
+            if Tile._store is not None and self._is_stored():
+                Tile._store.set_cell(self.position, self.cell_type(), notify=False)
+        if name in Tile._grid_fields:
+            Tile._map_changed(self.position)
+        elif name in ("name", "sprite_name"):
+            Tile._touch(self.position)
+
+    def _is_stored(self) -> bool:
+        """ whether the tile is the one placed at its position, or a view of a cell of the store"""
+        if self.__class__._tile_by_position.get(self.position) is self:
+            return True
+        return self.uuid == Tile._store_uuid(self.position) and Tile._store.get_cell(self.position) is not None
+
+    def cell_type(self) -> CellType:
+        """ the palette entry describing this tile in a chunked store"""
+        return CellType(name=self.name, sprite_name=self.sprite_name, movement_cost=self.movement_cost,
+                        blocks_movement=self.blocks_movement, blocks_vision=self.blocks_vision)
+
+    @classmethod
+    def _map_changed(cls, position: Tuple[int, int]) -> None:
+        """ bump the map version, every cache derived from the grid is keyed on it, and let the
+        active path queries know which cell has to be repaired"""
+        Tile._map_version += 1
+        Tile._touch(position)
+        for query in list(Tile._path_queries):
+            query.notify_cell_changed(position)
+        if Tile._hierarchical_pathfinder is not None:
+            Tile._hierarchical_pathfinder.notify_cell_changed(position)
+
+    @classmethod
+    def _map_replaced(cls) -> None:
+        """ the whole map may have changed: invalidate every region, drop the hierarchical
+        abstraction and let the live path queries and trees search again from scratch"""
+        Tile._map_version += 1
+        Tile._touch()
+        Tile._hierarchical_pathfinder = None
+        for query in list(Tile._path_queries):
+            query.reset()
+
+    @classmethod
+    def get_map_version(cls) -> int:
+        return Tile._map_version
+
+    @classmethod
+    def _touch(cls, position: Optional[Tuple[int, int]] = None) -> None:
+        """ bump the revision for any change visible on the map, appearance included, and record it
+        for the region of the position, or for every region when no position is given"""
+        Tile._revision += 1
+        if position is None:
+            Tile._region_revisions = {}
+            Tile._revision_floor = Tile._revision
+        else:
+            size = Tile._revision_region_size
+            Tile._region_revisions[(position[0] // size, position[1] // size)] = Tile._revision
+
+    @classmethod
+    def get_revision(cls, region: Optional[Tuple[int, int, int, int]] = None) -> int:
+        """
+        The revision of the map as drawn, or of the last change inside an inclusive (x0, y0, x1, y1)
+        region. Unlike the map version it also follows the name and sprite of the tiles, so a client
+        holding a region at some revision only needs to fetch it again once this value is higher.
+        """
+        if region is None:
+            return Tile._revision
+        size = Tile._revision_region_size
+        x0, y0, x1, y1 = (region[0] // size, region[1] // size, region[2] // size, region[3] // size)
+        revisions = Tile._region_revisions
+        if (x1 - x0 + 1) * (y1 - y0 + 1) < len(revisions):
+            touched = [revisions.get((x, y), 0) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+        else:
+            touched = [revision for key, revision in revisions.items() if x0 <= key[0] <= x1 and y0 <= key[1] <= y1]
+        return max(touched, default=Tile._revision_floor)
+
+    @classmethod
+    def remove_tile_at_position(cls, position: Tuple[int, int]) -> Optional['Tile']:
+        """ remove the tile at the position from the registries and return it"""
+        tile = cls.get_tile_at_position(position)
+        if tile is None:
+            return None
+        cls._tile_by_position.pop(position, None)
+        cls._tile_registry.pop(tile.uuid, None)
+        Tile._materialized_tiles.pop(position, None)
+        if Tile._store is not None:
+            Tile._store.set_cell(position, None, notify=False)
+        Tile._map_changed(position)
+        return tile
+
+    @classmethod
+    def attach_store(cls, store: ChunkedTileStore) -> None:
+        """
+        Back the grid with a chunked store. Tiles already registered are written to the store, the
+        walkability, vision and cost lookups used by pathfinding and FOV read the store directly,
+        faulting chunks in as needed, and so does `iter_cells`. Tile objects for the cells only present
+        in the store are built on demand and kept in a bounded cache, see `get_tile_at_position`.
+        Writes made directly to the store are notified like tile changes.
+        """
+        for position, tile in cls._tile_by_position.items():
+            store.set_cell(position, tile.cell_type(), notify=False)
+        store.on_change = Tile._store_changed
+        Tile._materialized_tiles = OrderedDict()
+        Tile._store = store
+        Tile._map_replaced()
+
+    @classmethod
+    def detach_store(cls) -> Optional[ChunkedTileStore]:
+        """ stop reading from the chunked store, only the tiles registered by their creation stay on the map"""
+        store = Tile._store
+        if store is not None:
+            store.on_change = None
+            Tile._store = None
+            Tile._materialized_tiles = OrderedDict()
+            Tile._map_replaced()
+        return store
+
+    @classmethod
+    def get_store(cls) -> Optional[ChunkedTileStore]:
+        return Tile._store
+
+    @classmethod
+    def _store_changed(cls, position: Tuple[int, int]) -> None:
+        """ a cell was written directly to the store, the cached tile for it is stale"""
+        Tile._materialized_tiles.pop(position, None)
+        Tile._map_changed(position)
+
+    @classmethod
+    def load_grid(cls, grid: MapGrid, chunk_size: int = 32) -> ChunkedTileStore:
+        """
+        Replace the whole map with a packed grid, e.g. from `MapGrid.load` or `MapGrid.from_ascii`.
+
+        The grid is copied into a new chunked store chunk by chunk and no Tile object is built:
+        lookups read the chunks, `iter_cells` walks them, and a Tile object is only materialized
+        when one is asked for, like for any store backed map. The previous tiles are unregistered
+        and every region revision and cache keyed on the map version is invalidated. The
+        hierarchical pathfinder is discarded and built again for the new map on its next query,
+        and the live path queries keep their start and goal but plan from scratch on their next
+        `get_path`, their search state described the previous map.
+        """
+        cls.detach_store()
+        for tile in cls._tile_by_position.values():
+            cls._tile_registry.pop(tile.uuid, None)
+        cls._tile_by_position.clear()
+        store = grid.to_store(chunk_size=chunk_size)
+        cls.attach_store(store)
+        return store
+
+    @classmethod
+    def export_grid(cls, region: Optional[Tuple[int, int, int, int]] = None) -> MapGrid:
+        """
+        Pack the current map, from the store when one is attached, in a grid that can be saved.
+        With an inclusive (x0, y0, x1, y1) region the grid covers exactly that rectangle.
+        """
+        if Tile._store is not None:
+            return MapGrid.from_store(Tile._store, region)
+        tiles = cls._tile_by_position.values() if region is None else cls.iter_tiles(region)
+        grid = MapGrid.from_cells((tile.position, tile.cell_type()) for tile in tiles)
+        return grid if region is None else grid.reframe(*region)
+
+    @staticmethod
+    def _store_uuid(position: Tuple[int, int]) -> UUID:
+        return UUID(bytes=_STORE_UUID_PREFIX + struct.pack(">ii", *position))
+
+    @classmethod
+    def _materialize(cls, position: Tuple[int, int], cell: CellType) -> 'Tile':
+        """ build the Tile object viewing a cell of the store and cache it, the map itself does not change"""
+        tile_uuid = cls._store_uuid(position)
+        tile = cls.model_construct(
+            uuid=tile_uuid,
+            source_entity_uuid=tile_uuid,
+            target_entity_uuid=tile_uuid,
+            position=position,
+            **cell.model_dump()
+        )
+        cache = Tile._materialized_tiles
+        cache[position] = tile
+        while len(cache) > Tile._materialized_cache_size:
+            cache.popitem(last=False)
+        return tile
 
     @classmethod
     def get_all_tiles(cls) -> List['Tile']:
@@ -43,18 +275,81 @@ class Tile(BaseObject):
     
     @classmethod
     def get_tile_at_position(cls, position: Tuple[int,int]) -> Optional['Tile']:
-        return cls._tile_by_position.get(position)
+        """
+        The tile at a position. Cells only present in the store are served by a tile built on demand,
+        whose uuid encodes the position and whose changes are written back to the store. Only the
+        last `_materialized_cache_size` of them are kept, so the same cell can come back as another
+        object after many lookups elsewhere.
+        """
+        tile = cls._tile_by_position.get(position)
+        if tile is None and Tile._store is not None:
+            tile = Tile._materialized_tiles.get(position)
+            if tile is not None:
+                Tile._materialized_tiles.move_to_end(position)
+                return tile
+            cell = Tile._store.get_cell(position)
+            if cell is not None:
+                tile = cls._materialize(position, cell)
+        return tile
+
+    @classmethod
+    def has_tile(cls, position: Tuple[int, int]) -> bool:
+        """ whether a tile is placed at a position, without building it"""
+        if position in cls._tile_by_position:
+            return True
+        return Tile._store is not None and Tile._store.get_cell(position) is not None
+
+    @classmethod
+    def iter_cells(cls, region: Optional[Tuple[int, int, int, int]] = None) -> Iterator[Tuple[UUID, Tuple[int, int], CellType]]:
+        """ the (uuid, position, cell type) of the tiles placed on the grid, optionally restricted to an
+        inclusive (x0, y0, x1, y1) region, read from the store chunks without building Tile objects"""
+        if Tile._store is None:
+            for tile in cls.iter_tiles(region):
+                yield tile.uuid, tile.position, tile.cell_type()
+            return
+        registered = cls._tile_by_position
+        for position, cell in Tile._store.iter_cells(region):
+            tile = registered.get(position)
+            yield (tile.uuid if tile is not None else cls._store_uuid(position)), position, cell
+
+    @classmethod
+    def iter_tiles(cls, region: Optional[Tuple[int, int, int, int]] = None) -> List['Tile']:
+        """ the tiles placed on the grid, optionally restricted to an inclusive (x0, y0, x1, y1) region,
+        only the occupied cells are visited. Over a store every cell is built as a Tile, prefer
+        `iter_cells` for large regions"""
+        if Tile._store is not None:
+            tiles = [cls.get_tile_at_position(position) for position, _ in Tile._store.iter_cells(region)]
+            return [tile for tile in tiles if tile is not None]
+        tiles = list(cls._tile_by_position.values())
+        if region is None:
+            return tiles
+        x0, y0, x1, y1 = region
+        return [tile for tile in tiles if x0 <= tile.position[0] <= x1 and y0 <= tile.position[1] <= y1]
     
     @classmethod
     def get(cls, uuid: UUID) -> Optional['Tile']:
-        return cls._tile_registry.get(uuid)
+        tile = cls._tile_registry.get(uuid)
+        if tile is None and Tile._store is not None and uuid.bytes[:8] == _STORE_UUID_PREFIX:
+            tile = cls.get_tile_at_position(struct.unpack(">ii", uuid.bytes[8:]))
+            if tile is not None and tile.uuid != uuid:
+                return None
+        return tile
     
     @classmethod
     def grid_size(cls) -> Tuple[int,int]:
-        tiles = cls.get_all_tiles()
-        if len(tiles) == 0:
-            return (0,0)
-        return max(tile.position[0] for tile in tiles) + 1, max(tile.position[1] for tile in tiles) + 1
+        # the registry dict is part of the key because it can be swapped out without touching the map version
+        key = (Tile._map_version, id(cls._tile_by_position), Tile._store)
+        if Tile._grid_size_cache is not None and Tile._grid_size_cache[0] == key:
+            return Tile._grid_size_cache[1]
+        if Tile._store is not None:
+            size = Tile._store.extent()
+        elif len(cls._tile_by_position) == 0:
+            size = (0, 0)
+        else:
+            size = (max(position[0] for position in cls._tile_by_position) + 1,
+                    max(position[1] for position in cls._tile_by_position) + 1)
+        Tile._grid_size_cache = (key, size)
+        return size
     
     @computed_field(return_type=bool)
     def walkable(self) -> bool:
@@ -89,17 +384,35 @@ class Tile(BaseObject):
 
     @classmethod
     def is_visible(cls, position: Tuple[int,int]) -> bool:
-        tile = cls.get_tile_at_position(position)
+        tile = cls._tile_by_position.get(position)
         if tile is None:
-            return False
+            return Tile._store is not None and Tile._store.is_visible(position)
         return tile.visible
     
     @classmethod
     def is_walkable(cls, position: Tuple[int,int]) -> bool:
-        tile = cls.get_tile_at_position(position)
+        tile = cls._tile_by_position.get(position)
         if tile is None:
-            return False
+            return Tile._store is not None and Tile._store.is_walkable(position)
         return tile.walkable
+
+    @classmethod
+    def get_movement_cost(cls, position: Tuple[int,int]) -> int:
+        tile = cls._tile_by_position.get(position)
+        if tile is None:
+            return Tile._store.get_movement_cost(position) if Tile._store is not None else 1
+        return tile.movement_cost
+
+    @classmethod
+    def _grid_callbacks(cls) -> Tuple[Callable[[int, int], bool], Callable[[int, int], int]]:
+        """ the (is_walkable, cost) callables expected by the search algorithms, reading the grid
+        without materializing tiles"""
+        def is_walkable(x: int, y: int) -> bool:
+            return cls.is_walkable((x, y))
+
+        def cost(x: int, y: int) -> int:
+            return cls.get_movement_cost((x, y))
+        return is_walkable, cost
     
     @classmethod
     def get_fov(cls, source_pos: Tuple[int, int], max_distance: Optional[float] = None) -> List[Tuple[int, int]]:
@@ -114,10 +427,7 @@ class Tile(BaseObject):
             List of visible positions
         """
         visible_positions: List[Tuple[int, int]] = []
-        
-        def is_blocking(x: int, y: int) -> bool:
-            tile = cls.get_tile_at_position((x, y))
-            return tile is None or tile.blocks_vision
+        is_blocking = cls._vision_blocker()
             
         def mark_visible(x: int, y: int) -> None:
             visible_positions.append((x, y))
@@ -125,6 +435,113 @@ class Tile(BaseObject):
         compute_fov(source_pos, is_blocking, mark_visible, max_distance)
         return visible_positions
 
+    @classmethod
+    def get_fov_along_path(cls, path: List[Tuple[int, int]], max_distance: Optional[float] = None) -> List[Set[Tuple[int, int]]]:
+        """
+        Compute the field of view from every position of a path.
+
+        The opacity of the cells is read from the grid once for the whole path, and neighboring
+        positions share their shadowcasts: a quadrant whose cells look the same from the next
+        position is reused instead of scanned again, see `compute_fov_along_path`.
+
+        Returns:
+            List with the set of visible positions for each position of the path
+        """
+        opacity: Dict[Tuple[int, int], bool] = {}
+        is_visible = cls.is_visible
+
+        def is_blocking(x: int, y: int) -> bool:
+            blocking = opacity.get((x, y))
+            if blocking is None:
+                blocking = opacity[(x, y)] = not is_visible((x, y))
+            return blocking
+
+        return compute_fov_along_path(path, is_blocking, max_distance)
+
+    @classmethod
+    def has_line_of_sight(cls, source_pos: Tuple[int, int], target_pos: Tuple[int, int]) -> bool:
+        """
+        Check whether a target cell can be seen from a source cell, independently of any senses.
+
+        The check walks the supercover line between the two cells over the vision blocking grid
+        and is symmetric. Results are cached per pair of cells and map version.
+
+        Args:
+            source_pos: The position looking
+            target_pos: The position looked at
+
+        Returns:
+            bool: True if no vision blocking tile lies between the two positions
+        """
+        return cls._cached_line_of_sight(source_pos, target_pos, cls._vision_blocker())
+
+    @classmethod
+    def has_line_of_sight_many(cls, source_pos: Tuple[int, int], target_positions: List[Tuple[int, int]]) -> Dict[Tuple[int, int], bool]:
+        """
+        Check the line of sight from one source to many targets, sharing the cache and the
+        opacity lookups of the cells crossed by several lines.
+
+        Returns:
+            Dict mapping each target position to whether it can be seen from the source
+        """
+        opacity: Dict[Tuple[int, int], bool] = {}
+        is_blocking = cls._vision_blocker()
+
+        def cached_is_blocking(x: int, y: int) -> bool:
+            blocking = opacity.get((x, y))
+            if blocking is None:
+                blocking = opacity[(x, y)] = is_blocking(x, y)
+            return blocking
+
+        return {target: cls._cached_line_of_sight(source_pos, target, cached_is_blocking) for target in target_positions}
+
+    @classmethod
+    def get_area(cls, shape: AreaShape, size: int, origin: Tuple[int, int], orientation: int = 0) -> List[Tuple[int, int]]:
+        """
+        Get the cells covered by an area of effect.
+
+        The template is rasterized once per (shape, size, orientation) and placed at the origin, then
+        the cells without a tile and the cells behind a vision blocking tile are removed since an
+        effect does not spread through total cover.
+
+        Args:
+            shape: cone, sphere, cube or line
+            size: The size of the template in feet
+            origin: The point of origin of the effect
+            orientation: The direction in whole degrees, see `orientation_towards`
+
+        Returns:
+            List of the affected positions
+        """
+        cells = area_cells(shape, size, origin, orientation)
+        return filter_spread(cells, origin, lambda x, y: cls.has_tile((x, y)), cls.has_line_of_sight_many)
+
+    @classmethod
+    def _vision_blocker(cls) -> Callable[[int, int], bool]:
+        def is_blocking(x: int, y: int) -> bool:
+            return not cls.is_visible((x, y))
+        return is_blocking
+
+    @classmethod
+    def _cached_line_of_sight(cls, source_pos: Tuple[int, int], target_pos: Tuple[int, int], is_blocking: Callable[[int, int], bool]) -> bool:
+        # the line is symmetric so both directions share one entry
+        a, b = (source_pos, target_pos) if source_pos <= target_pos else (target_pos, source_pos)
+        key = (a, b, Tile._map_version)
+        cache = Tile._line_of_sight_cache
+        result = cache.get(key)
+        if result is not None:
+            cache.move_to_end(key)
+            if metrics.enabled:
+                LINE_OF_SIGHT_CACHE_REQUESTS.labels("hit").inc()
+            return result
+        if metrics.enabled:
+            LINE_OF_SIGHT_CACHE_REQUESTS.labels("miss").inc()
+        result = line_is_clear(a, b, is_blocking)
+        cache[key] = result
+        while len(cache) > Tile._line_of_sight_cache_size:
+            cache.popitem(last=False)
+        return result
+
     @classmethod
     def get_paths(cls, start_pos: Tuple[int, int], max_distance: Optional[int] = None) -> Tuple[Dict[Tuple[int, int], int], Dict[Tuple[int, int], List[Tuple[int, int]]]]:
         """
@@ -140,26 +557,179 @@ class Tile(BaseObject):
             - paths_dict maps positions to the path list to reach them
         """
         width, height = cls.grid_size()
-        
-        def is_walkable(x: int, y: int) -> bool:
-            tile = cls.get_tile_at_position((x, y))
-            return tile is not None and tile.walkable
-
-        def cost(x: int, y: int) -> int:
-            tile = cls.get_tile_at_position((x, y))
-            return tile.movement_cost if tile else 1
+        is_walkable, cost = cls._grid_callbacks()
 
         return dijkstra(start_pos, is_walkable, width, height, diagonal=True, max_distance=max_distance, cost=cost)
 
+    @classmethod
+    def get_path_tree(cls, start_pos: Tuple[int, int], max_distance: Optional[int] = None) -> Tuple[Dict[Tuple[int, int], int], Dict[Tuple[int, int], Tuple[int, int]]]:
+        """
+        Compute the shortest path tree from a starting position, the compact form of `get_paths`.
+
+        Served by a live `IncrementalPathTree` per start position, the last `_path_tree_cache_size`
+        of them are kept as long as they search no more than `_path_tree_cache_cells` cells in
+        total. Tile changes only repair the part of a tree going through the changed cells,
+        so refreshing the senses of the creatures around an opened door does not search again from
+        scratch, and neither does a start position queried before, e.g. by a movement preview.
+
+        Returns:
+            Tuple of (distances_dict, predecessors_dict) where predecessors_dict maps each reached
+            position to the previous position of its path, the start being its own predecessor
+        """
+        trees = Tile._path_trees
+        tree = trees.get(start_pos)
+        if metrics.enabled:
+            PATH_TREE_CACHE_REQUESTS.labels("miss" if tree is None else "hit").inc()
+        if tree is None:
+            tree = trees[start_pos] = cls.create_path_tree(start_pos)
+        else:
+            trees.move_to_end(start_pos)
+        result = tree.get_tree(max_distance)
+        cls._evict_path_trees()
+        return result
+
+    @classmethod
+    def _evict_path_trees(cls) -> None:
+        """ drop the least recently used trees beyond the cache size or the cell budget, never the newest"""
+        trees = Tile._path_trees
+        cells = sum(tree.cell_count() for tree in trees.values())
+        while len(trees) > 1 and (len(trees) > Tile._path_tree_cache_size or cells > Tile._path_tree_cache_cells):
+            _, evicted = trees.popitem(last=False)
+            cells -= evicted.cell_count()
+            cls.release_path_query(evicted)
+
+    @classmethod
+    def get_distance_field(cls, goals: Union[Tuple[int, int], List[Tuple[int, int]]], max_distance: Optional[int] = None) -> DistanceField:
+        """
+        Get the shared distance field towards one goal or a set of goals.
+
+        The field is computed once with a reverse Dijkstra and cached per goal set and map version,
+        so every entity heading to the same goals reads its next step from the same field.
+
+        Args:
+            goals: A goal position or a list of goal positions
+            max_distance: Maximum path distance (optional)
+
+        Returns:
+            DistanceField: the cached or freshly computed field
+        """
+        goal_set = frozenset([goals]) if isinstance(goals, tuple) else frozenset(goals)
+        key = (goal_set, max_distance, Tile._map_version)
+        cache = Tile._distance_field_cache
+        field = cache.get(key)
+        if field is not None:
+            cache.move_to_end(key)
+            if metrics.enabled:
+                DISTANCE_FIELD_CACHE_REQUESTS.labels("hit").inc()
+            return field
+        if metrics.enabled:
+            DISTANCE_FIELD_CACHE_REQUESTS.labels("miss").inc()
+
+        width, height = cls.grid_size()
+        is_walkable, cost = cls._grid_callbacks()
+
+        distances, next_steps = compute_distance_field(goal_set, is_walkable, width, height, diagonal=True, max_distance=max_distance, cost=cost)
+        field = DistanceField(goal_set, distances, next_steps, map_version=Tile._map_version)
+        cache[key] = field
+        while len(cache) > Tile._distance_field_cache_size:
+            cache.popitem(last=False)
+        return field
+
+    @classmethod
+    def get_hierarchical_pathfinder(cls) -> HierarchicalPathfinder:
+        """ the shared hierarchical pathfinder, its abstraction is kept up to date on tile changes"""
+        if Tile._hierarchical_pathfinder is None:
+            is_walkable, cost = cls._grid_callbacks()
+            Tile._hierarchical_pathfinder = HierarchicalPathfinder(is_walkable, cost=cost, cluster_size=Tile._hierarchical_cluster_size,
+                                                                  grid_size=cls.grid_size)
+        return Tile._hierarchical_pathfinder
+
+    @classmethod
+    def find_path(cls, start_pos: Tuple[int, int], goal_pos: Tuple[int, int], strategy: PathStrategy = PathStrategy.DIJKSTRA) -> Tuple[Optional[int], List[Tuple[int, int]]]:
+        """
+        Find a single path between two positions.
+
+        Args:
+            start_pos: Starting position
+            goal_pos: Goal position
+            strategy: DIJKSTRA for the exact flat search that stops once the goal is settled,
+                HIERARCHICAL for the clustered search suited to long distance travel on large maps,
+                whose paths can be longer than the shortest one,
+                JUMP_POINT for the exact search that jumps over uniform cost floor and falls back to
+                a weighted expansion around difficult terrain
+
+        Returns:
+            Tuple of (cost, path) where the path includes both ends, or (None, []) if the goal is unreachable
+        """
+        if strategy == PathStrategy.HIERARCHICAL:
+            return cls.get_hierarchical_pathfinder().find_path(start_pos, goal_pos)
+
+        is_walkable, cost = cls._grid_callbacks()
+        if strategy == PathStrategy.JUMP_POINT:
+            return jump_point_search(start_pos, goal_pos, is_walkable, cost=cost)
+        width, height = cls.grid_size()
+
+        distances, paths = dijkstra(start_pos, is_walkable, width, height, diagonal=True, cost=cost, goal=goal_pos)
+        if goal_pos not in distances:
+            return None, []
+        return distances[goal_pos], paths[goal_pos]
+
+    @classmethod
+    def create_path_query(cls, start_pos: Tuple[int, int], goal_pos: Tuple[int, int]) -> DStarLite:
+        """
+        Create an incremental path query between two positions.
+
+        The query keeps its search state and is notified of every tile change, so calling
+        `get_path` after a door opens or a wall collapses only repairs the affected part of the
+        search instead of replanning from scratch. The query stops being tracked once it is
+        garbage collected or released with `release_path_query`.
+
+        Args:
+            start_pos: Starting position
+            goal_pos: Goal position
+
+        Returns:
+            DStarLite: the live path query
+        """
+        is_walkable, cost = cls._grid_callbacks()
+
+        query = DStarLite(start_pos, goal_pos, is_walkable, cost=cost, diagonal=True)
+        Tile._path_queries.add(query)
+        return query
+
+    @classmethod
+    def create_path_tree(cls, root: Tuple[int, int]) -> IncrementalPathTree:
+        """
+        Create an incremental shortest path tree from a position, notified of every tile change
+        like the queries of `create_path_query` and released the same way.
+        """
+        is_walkable, cost = cls._grid_callbacks()
+
+        def is_walkable_on_grid(x: int, y: int) -> bool:
+            # the grid starts at the origin, as for `get_path_tree`
+            return x >= 0 and y >= 0 and is_walkable(x, y)
+
+        tree = IncrementalPathTree(root, is_walkable_on_grid, cost=cost, diagonal=True)
+        Tile._path_queries.add(tree)
+        return tree
+
+    @classmethod
+    def release_path_query(cls, query: Union[DStarLite, IncrementalPathTree]) -> None:
+        """ stop notifying a path query of tile changes"""
+        Tile._path_queries.discard(query)
+
     @classmethod
     def get_adjacent_positions(cls, position: Tuple[int, int], diagonal: bool = True) -> List[Tuple[int, int]]:
-        tile = cls.get_tile_at_position(position)
-        if tile is None:
+        if not cls.has_tile(position):
             return []
         width, height = cls.grid_size()
         return get_neighbors(position, diagonal, width, height)
 
 
+metrics.gauge("dnd_tiles", "Tile objects in the tile registry and the cache of tiles built from the store",
+              function=lambda: len(Tile._tile_registry) + len(Tile._materialized_tiles))
+
+
 def floor_factory(position: Tuple[int,int]) -> Tile:
     return Tile.create(position, sprite_name="floor.png", can_walk=True, can_see=True)
 
@@ -0,0 +1,75 @@
+from collections import defaultdict
+from typing import Dict, Tuple, ClassVar, Optional, DefaultDict, List, Callable
+from uuid import UUID
+
+
+class ChangeTracker:
+    """
+    Static record of when the state of each entity last changed.
+
+    Every change bumps a global clock and stamps the entity and the block it happened in with the new
+    clock value, so an entity or block version only moves when its own state does. Blocks and values
+    are registered with the entity and top level block owning them; changes made to objects that are
+    not registered, like the temporary values built while computing a bonus, are ignored.
+    """
+    _clock: ClassVar[int] = 0
+    _entity_versions: ClassVar[Dict[UUID, int]] = {}
+    _block_versions: ClassVar[DefaultDict[UUID, Dict[str, int]]] = defaultdict(dict)
+    _owners: ClassVar[Dict[UUID, Tuple[UUID, Optional[str]]]] = {}
+    _listeners: ClassVar[List[Callable[[UUID, int], None]]] = []
+
+    @classmethod
+    def register(cls, object_uuid: UUID, entity_uuid: UUID, block_name: Optional[str] = None) -> None:
+        """ record which entity and block an object belongs to, None for the entity itself"""
+        cls._owners[object_uuid] = (entity_uuid, block_name)
+
+    @classmethod
+    def mark(cls, entity_uuid: UUID, block_name: str) -> int:
+        """ stamp a change of a block of an entity and return the new version"""
+        cls._clock += 1
+        cls._entity_versions[entity_uuid] = cls._clock
+        cls._block_versions[entity_uuid][block_name] = cls._clock
+        for listener in cls._listeners:
+            listener(entity_uuid, cls._clock)
+        return cls._clock
+
+    @classmethod
+    def mark_owned(cls, object_uuid: UUID, field_name: Optional[str] = None) -> None:
+        """ stamp a change of a registered object, a field of the entity itself counts as its own block"""
+        owner = cls._owners.get(object_uuid)
+        if owner is None:
+            return
+        entity_uuid, block_name = owner
+        block_name = block_name or field_name
+        if block_name is not None:
+            cls.mark(entity_uuid, block_name)
+
+    @classmethod
+    def add_listener(cls, listener: Callable[[UUID, int], None]) -> None:
+        """ call a function with the entity uuid and the new version on every change, it runs on the hot path and must stay cheap"""
+        if listener not in cls._listeners:
+            cls._listeners.append(listener)
+
+    @classmethod
+    def remove_listener(cls, listener: Callable[[UUID, int], None]) -> None:
+        if listener in cls._listeners:
+            cls._listeners.remove(listener)
+
+    @classmethod
+    def get_version(cls, entity_uuid: UUID) -> int:
+        return cls._entity_versions.get(entity_uuid, 0)
+
+    @classmethod
+    def get_block_versions(cls, entity_uuid: UUID) -> Dict[str, int]:
+        return dict(cls._block_versions.get(entity_uuid, {}))
+
+    @classmethod
+    def get_clock(cls) -> int:
+        return cls._clock
+
+    @classmethod
+    def clear(cls) -> None:
+        """ forget every registration, the clock keeps running so old versions are never reused"""
+        cls._entity_versions.clear()
+        cls._block_versions.clear()
+        cls._owners.clear()
@@ -0,0 +1,349 @@
+import json
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Dict, Tuple, List, Optional, Callable, Iterator, Set
+from pydantic import BaseModel, Field, ConfigDict
+
+ChunkKey = Tuple[int, int]
+
+# file layout: header | compressed chunk records ... | index (palette + chunk directory) | footer
+_MAGIC = b"DNDC"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHH")   # magic, format version, chunk size
+_FOOTER = struct.Struct("<Q4s")    # index offset, magic
+_RECORD = struct.Struct("<iiQI")   # chunk x, chunk y, offset, compressed length
+
+
+class CellType(BaseModel):
+    """ The properties shared by every cell of a given kind, stored once in the palette of the map"""
+    name: str = Field(default="Floor", description="The name of the tile")
+    sprite_name: Optional[str] = Field(default=None, description="The name of the sprite to use for the tile")
+    movement_cost: int = Field(default=1, ge=1, description="Cost to move onto this tile")
+    blocks_movement: bool = Field(default=False, description="Whether the tile blocks movement")
+    blocks_vision: bool = Field(default=False, description="Whether the tile blocks line of sight")
+
+    model_config = ConfigDict(frozen=True)
+
+
+class ChunkedTileStore:
+    """
+    Sparse tile storage split in fixed size square chunks.
+
+    A chunk is a compact array of palette indices (0 for no tile) and is only allocated where tiles exist,
+    so a map with a few far apart tiles costs a few chunks. When the store is backed by a file chunks are
+    faulted in on first access and the least recently used ones are unloaded once more than
+    `max_loaded_chunks` are in memory, which bounds the memory used regardless of the map extent.
+    Modified chunks are written back when unloaded, together with an index covering them so the file stays
+    readable; `flush` writes the chunks still in memory. A rewritten chunk reuses its record when it still
+    fits, an emptied chunk is freed, and once the records left behind take half of the file `flush`
+    compacts it.
+    """
+
+    def __init__(self, chunk_size: int = 32, path: Optional[str] = None, max_loaded_chunks: int = 1024):
+        if not 1 <= chunk_size <= 255:
+            raise ValueError("Chunk size must be between 1 and 255")
+        self.chunk_size = chunk_size
+        self.path = path
+        self.max_loaded_chunks = max_loaded_chunks
+        self.palette: List[CellType] = []
+        self._palette_index: Dict[CellType, int] = {}
+        self._chunks: OrderedDict[ChunkKey, bytearray] = OrderedDict()
+        self._on_disk: Dict[ChunkKey, Tuple[int, int]] = {}
+        self._dirty: Set[ChunkKey] = set()
+        self._slot_sizes: Dict[ChunkKey, int] = {}
+        self._garbage = 0
+        self._data_end = _HEADER.size
+        self._last_key: Optional[ChunkKey] = None
+        self._last_chunk: Optional[bytearray] = None
+        self.on_change: Optional[Callable[[Tuple[int, int]], None]] = None
+        self.loads = 0
+        self.unloads = 0
+
+    @classmethod
+    def open(cls, path: str, max_loaded_chunks: int = 1024) -> 'ChunkedTileStore':
+        """ open a store file, only the palette and the chunk directory are read"""
+        with open(path, "rb") as file:
+            magic, version, chunk_size = _HEADER.unpack(file.read(_HEADER.size))
+            if magic != _MAGIC or version != _FORMAT_VERSION:
+                raise ValueError(f"{path} is not a chunked tile store")
+            file.seek(-_FOOTER.size, os.SEEK_END)
+            index_offset, footer_magic = _FOOTER.unpack(file.read(_FOOTER.size))
+            if footer_magic != _MAGIC:
+                raise ValueError(f"{path} was not flushed, the chunk index is missing")
+            file.seek(index_offset)
+            (palette_length,) = struct.unpack("<I", file.read(4))
+            palette = json.loads(file.read(palette_length))
+            (chunk_count,) = struct.unpack("<I", file.read(4))
+            records = [_RECORD.unpack(file.read(_RECORD.size)) for _ in range(chunk_count)]
+        store = cls(chunk_size=chunk_size, path=path, max_loaded_chunks=max_loaded_chunks)
+        for cell_type in palette:
+            store.get_palette_index(CellType(**cell_type))
+        store._on_disk = {(cx, cy): (offset, length) for cx, cy, offset, length in records}
+        store._data_end = index_offset
+        store._garbage = index_offset - _HEADER.size - sum(length for _, _, _, length in records)
+        return store
+
+    def get_palette_index(self, cell_type: CellType) -> int:
+        """ index of the cell type in the palette (1 based, 0 is reserved for empty cells)"""
+        index = self._palette_index.get(cell_type)
+        if index is None:
+            if len(self.palette) >= 255:
+                raise ValueError("A chunked tile store supports at most 255 cell types")
+            self.palette.append(cell_type)
+            index = len(self.palette)
+            self._palette_index[cell_type] = index
+        return index
+
+    def chunk_key(self, position: Tuple[int, int]) -> ChunkKey:
+        return (position[0] // self.chunk_size, position[1] // self.chunk_size)
+
+    def _get_chunk(self, key: ChunkKey, allocate: bool = False) -> Optional[bytearray]:
+        if key == self._last_key:
+            return self._last_chunk
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+        elif key in self._on_disk:
+            chunk = self._load_chunk(key)
+        elif allocate:
+            chunk = bytearray(self.chunk_size * self.chunk_size)
+            self._chunks[key] = chunk
+            self._evict()
+        else:
+            return None
+        self._last_key, self._last_chunk = key, chunk
+        return chunk
+
+    def _load_chunk(self, key: ChunkKey) -> bytearray:
+        offset, length = self._on_disk[key]
+        assert self.path is not None
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            chunk = bytearray(zlib.decompress(file.read(length)))
+        self._chunks[key] = chunk
+        self.loads += 1
+        self._evict()
+        return chunk
+
+    def _evict(self) -> None:
+        if self.path is None:
+            return
+        evicted = []
+        while len(self._chunks) > self.max_loaded_chunks:
+            key, chunk = self._chunks.popitem(last=False)
+            if key in self._dirty:
+                evicted.append((key, chunk))
+            if key == self._last_key:
+                self._last_key, self._last_chunk = None, None
+            self.unloads += 1
+        if evicted:
+            self._write_chunks(evicted)
+
+    def _write_chunks(self, chunks: List[Tuple[ChunkKey, bytearray]]) -> None:
+        """ write chunks back to the file, then the index once so the file stays readable"""
+        assert self.path is not None
+        mode = "r+b" if os.path.exists(self.path) else "wb"
+        with open(self.path, mode) as file:
+            if self._data_end == _HEADER.size:
+                file.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, self.chunk_size))
+            for key, chunk in chunks:
+                self._dirty.discard(key)
+                slot = self._on_disk.get(key)
+                capacity = self._slot_sizes.get(key, slot[1]) if slot is not None else 0
+                if not any(chunk):
+                    # an emptied chunk is freed, its record becomes garbage
+                    self._chunks.pop(key, None)
+                    if key == self._last_key:
+                        self._last_key, self._last_chunk = None, None
+                    if slot is not None:
+                        del self._on_disk[key]
+                        self._slot_sizes.pop(key, None)
+                        self._garbage += capacity
+                    continue
+                data = zlib.compress(bytes(chunk))
+                if slot is not None and len(data) <= capacity:
+                    file.seek(slot[0])
+                    file.write(data)
+                    self._on_disk[key] = (slot[0], len(data))
+                    self._slot_sizes[key] = capacity
+                    continue
+                if slot is not None:
+                    self._slot_sizes.pop(key, None)
+                    self._garbage += capacity
+                # new records are appended over the previous index, a new one is written after them
+                file.seek(self._data_end)
+                file.write(data)
+                self._on_disk[key] = (self._data_end, len(data))
+                self._data_end += len(data)
+            self._write_index(file)
+
+    def _write_index(self, file) -> None:
+        """ write the palette and the chunk directory at the end of the records, then the footer"""
+        palette = json.dumps([cell_type.model_dump() for cell_type in self.palette]).encode()
+        file.seek(self._data_end)
+        file.write(struct.pack("<I", len(palette)))
+        file.write(palette)
+        file.write(struct.pack("<I", len(self._on_disk)))
+        for (cx, cy), (offset, length) in self._on_disk.items():
+            file.write(_RECORD.pack(cx, cy, offset, length))
+        file.write(_FOOTER.pack(self._data_end, _MAGIC))
+        file.truncate()
+
+    def _cell_index(self, position: Tuple[int, int]) -> int:
+        return (position[1] % self.chunk_size) * self.chunk_size + (position[0] % self.chunk_size)
+
+    def get_cell(self, position: Tuple[int, int]) -> Optional[CellType]:
+        chunk = self._get_chunk(self.chunk_key(position))
+        if chunk is None:
+            return None
+        index = chunk[self._cell_index(position)]
+        return self.palette[index - 1] if index else None
+
+    def set_cell(self, position: Tuple[int, int], cell_type: Optional[CellType], notify: bool = True) -> None:
+        """ set or clear (with None) the cell at a position, `on_change` is called unless `notify` is False"""
+        key = self.chunk_key(position)
+        chunk = self._get_chunk(key, allocate=cell_type is not None)
+        if chunk is None:
+            return
+        index = self.get_palette_index(cell_type) if cell_type is not None else 0
+        chunk[self._cell_index(position)] = index
+        self._dirty.add(key)
+        if notify and self.on_change is not None:
+            self.on_change(position)
+
+    def set_chunk(self, key: ChunkKey, cells: bytes, notify: bool = True) -> None:
+        """
+        Replace a whole chunk with already packed palette indices, used by bulk loaders. When `notify`
+        is True and `on_change` is set it is called for every cell whose index differs from the
+        replaced chunk, a store nobody listens to is filled without comparing the cells.
+        """
+        if len(cells) != self.chunk_size * self.chunk_size:
+            raise ValueError(f"A chunk has {self.chunk_size * self.chunk_size} cells, got {len(cells)}")
+        changed: List[int] = []
+        if notify and self.on_change is not None:
+            previous = self._get_chunk(key) or bytes(len(cells))
+            changed = [i for i, (old, new) in enumerate(zip(previous, cells)) if old != new]
+        self._chunks[key] = bytearray(cells)
+        self._chunks.move_to_end(key)
+        self._dirty.add(key)
+        if key == self._last_key:
+            self._last_key, self._last_chunk = None, None
+        self._evict()
+        size = self.chunk_size
+        for i in changed:
+            self.on_change((key[0] * size + i % size, key[1] * size + i // size))
+
+    def is_walkable(self, position: Tuple[int, int]) -> bool:
+        cell = self.get_cell(position)
+        return cell is not None and not cell.blocks_movement
+
+    def is_visible(self, position: Tuple[int, int]) -> bool:
+        cell = self.get_cell(position)
+        return cell is not None and not cell.blocks_vision
+
+    def get_movement_cost(self, position: Tuple[int, int]) -> int:
+        cell = self.get_cell(position)
+        return cell.movement_cost if cell is not None else 1
+
+    def chunk_keys(self) -> List[ChunkKey]:
+        """ keys of every allocated chunk, loaded or not"""
+        return sorted(set(self._chunks) | set(self._on_disk))
+
+    def iter_cells(self, region: Optional[Tuple[int, int, int, int]] = None) -> Iterator[Tuple[Tuple[int, int], CellType]]:
+        """
+        Iterate the non empty cells, optionally restricted to an inclusive (x0, y0, x1, y1) region.
+        Only the allocated chunks overlapping the region are visited.
+        """
+        size = self.chunk_size
+        for key in self.chunk_keys():
+            x0, y0 = key[0] * size, key[1] * size
+            if region is not None and (x0 + size <= region[0] or x0 > region[2] or y0 + size <= region[1] or y0 > region[3]):
+                continue
+            chunk = self._get_chunk(key)
+            if chunk is None:
+                continue
+            for i, index in enumerate(chunk):
+                if not index:
+                    continue
+                position = (x0 + i % size, y0 + i // size)
+                if region is None or (region[0] <= position[0] <= region[2] and region[1] <= position[1] <= region[3]):
+                    yield position, self.palette[index - 1]
+
+    def extent(self) -> Tuple[int, int]:
+        """ (max x + 1, max y + 1) over the non empty cells, scanning only the outermost chunks"""
+        keys = self.chunk_keys()
+        size = self.chunk_size
+        width = height = 0
+        for axis in (0, 1):
+            for key in sorted(keys, key=lambda k: -k[axis]):
+                if axis == 0 and (key[0] + 1) * size <= width or axis == 1 and (key[1] + 1) * size <= height:
+                    break
+                chunk = self._get_chunk(key)
+                if chunk is None:
+                    continue
+                for i, index in enumerate(chunk):
+                    if index:
+                        if axis == 0:
+                            width = max(width, key[0] * size + i % size + 1)
+                        else:
+                            height = max(height, key[1] * size + i // size + 1)
+        return width, height
+
+    def flush(self) -> None:
+        """ write the modified chunks and the index to the backing file"""
+        if self.path is None:
+            raise ValueError("The store is not backed by a file")
+        self._write_chunks([(key, self._chunks[key]) for key in list(self._dirty)])
+        if self._garbage * 2 > self._data_end - _HEADER.size:
+            self.compact()
+
+    def compact(self) -> None:
+        """ rewrite the backing file without the records left behind by rewritten and freed chunks"""
+        if self.path is None:
+            raise ValueError("The store is not backed by a file")
+        if self._dirty:
+            self._write_chunks([(key, self._chunks[key]) for key in list(self._dirty)])
+        compacted = self.path + ".compact"
+        records: Dict[ChunkKey, Tuple[int, int]] = {}
+        offset = _HEADER.size
+        with open(self.path, "rb") as source, open(compacted, "wb") as target:
+            target.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, self.chunk_size))
+            # the records are copied compressed, no chunk is faulted in
+            for key, (record_offset, length) in sorted(self._on_disk.items(), key=lambda item: item[1][0]):
+                source.seek(record_offset)
+                target.write(source.read(length))
+                records[key] = (offset, length)
+                offset += length
+            self._on_disk = records
+            self._data_end = offset
+            self._write_index(target)
+        os.replace(compacted, self.path)
+        self._slot_sizes = {}
+        self._garbage = 0
+
+    def save(self, path: str) -> None:
+        """ write every chunk to a new file and bind the store to it"""
+        if path == self.path:
+            self.flush()
+            return
+        records: Dict[ChunkKey, Tuple[int, int]] = {}
+        offset = _HEADER.size
+        with open(path, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, self.chunk_size))
+            for key in self.chunk_keys():
+                chunk = self._get_chunk(key)
+                if chunk is None or not any(chunk):
+                    continue
+                data = zlib.compress(bytes(chunk))
+                file.write(data)
+                records[key] = (offset, len(data))
+                offset += len(data)
+        self.path = path
+        self._on_disk = records
+        self._slot_sizes = {}
+        self._garbage = 0
+        self._data_end = offset
+        self._dirty.clear()
+        self.flush()
@@ -5,6 +5,9 @@ from dnd.core.values import ModifiableValue, AdvantageStatus, CriticalStatus, Au
 from enum import Enum
 from uuid import UUID, uuid4
 from functools import cached_property
+from dnd.core import metrics
+
+DICE_ROLLS = metrics.counter("dnd_dice_rolls_total", "Dice rolled", ["roll_type"])
 
 class AttackOutcome(str, Enum):
     HIT = "Hit"
@@ -306,6 +309,8 @@ class Dice(BaseModel):
         Returns:
             DiceRoll: The result of the dice roll.
         """
+        if metrics.enabled:
+            DICE_ROLLS.labels(self.roll_type.value).inc()
         if self.roll_type == RollType.DAMAGE:
             results = [roll[0] for roll in self._roll(crit=(self.attack_outcome == AttackOutcome.CRIT))]
             total = sum(results) + self.bonus.normalized_score
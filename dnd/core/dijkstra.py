@@ -1,6 +1,10 @@
 import heapq
 from typing import Dict, Tuple, List, Optional, Callable
 
+from dnd.core import metrics
+
+PATHFINDING_SECONDS = metrics.histogram("dnd_pathfinding_seconds", "Duration of the grid searches", ["algorithm"])
+
 def get_neighbors(position: Tuple[int, int], diagonal: bool, width: int, height: int) -> List[Tuple[int, int]]:
     x, y = position
     directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
@@ -22,8 +26,10 @@ def dijkstra(
     diagonal: bool = True,
     max_distance: Optional[int] = None,
     cost: Optional[Callable[[int, int], int]] = None,
-    epsilon: float = 0.001  # Small cost added for diagonal moves
+    epsilon: float = 0.001,  # Small cost added for diagonal moves
+    goal: Optional[Tuple[int, int]] = None  # Stop as soon as the shortest path to the goal is settled
 ) -> Tuple[Dict[Tuple[int, int], int], Dict[Tuple[int, int], List[Tuple[int, int]]]]:
+    started = metrics.clock() if metrics.enabled else None
     distances : Dict[Tuple[int, int], float] = {start: 0}
     true_distances = {start: 0}  # Distances without epsilon for final return
     paths = {start: [start]}
@@ -36,6 +42,8 @@ def dijkstra(
         if current_position in visited:
             continue
         visited.add(current_position)
+        if current_position == goal:
+            break
         
         for neighbor in get_neighbors(current_position, diagonal, width, height):
             if not is_walkable(*neighbor):
@@ -60,5 +68,60 @@ def dijkstra(
                 paths[neighbor] = paths[current_position] + [neighbor]
                 heapq.heappush(pq, (distance, neighbor))
 
+    if started is not None:
+        PATHFINDING_SECONDS.labels("dijkstra").observe(metrics.clock() - started)
     return true_distances, paths
 
+
+def shortest_path_tree(
+    start: Tuple[int, int],
+    is_walkable: Callable[[int, int], bool],
+    width: int,
+    height: int,
+    diagonal: bool = True,
+    max_distance: Optional[int] = None,
+    cost: Optional[Callable[[int, int], int]] = None,
+    epsilon: float = 0.001  # Small cost added for diagonal moves
+) -> Tuple[Dict[Tuple[int, int], int], Dict[Tuple[int, int], Tuple[int, int]]]:
+    """
+    Same search as `dijkstra` but returns the predecessor of every reached position instead of
+    materializing a path list per position. Following the predecessors from a position back to the
+    start (which is its own predecessor) gives the path `dijkstra` returns, reversed.
+
+    Returns:
+        Tuple of (distances, predecessors)
+    """
+    started = metrics.clock() if metrics.enabled else None
+    distances: Dict[Tuple[int, int], float] = {start: 0}
+    true_distances = {start: 0}
+    predecessors = {start: start}
+    pq = [(float(0), start)]
+    visited = set()
+
+    while pq:
+        current_distance, current_position = heapq.heappop(pq)
+
+        if current_position in visited:
+            continue
+        visited.add(current_position)
+
+        for neighbor in get_neighbors(current_position, diagonal, width, height):
+            if not is_walkable(*neighbor):
+                continue
+
+            move_cost = cost(*neighbor) if cost else 1
+            is_diagonal = (neighbor[0] != current_position[0]) and (neighbor[1] != current_position[1])
+            distance = current_distance + move_cost + (epsilon if is_diagonal else 0)
+
+            if max_distance is not None and distance > max_distance:
+                continue
+
+            if neighbor not in distances or distance < distances[neighbor]:
+                distances[neighbor] = distance
+                true_distances[neighbor] = int(true_distances[current_position] + move_cost)
+                predecessors[neighbor] = current_position
+                heapq.heappush(pq, (distance, neighbor))
+
+    if started is not None:
+        PATHFINDING_SECONDS.labels("shortest_path_tree").observe(metrics.clock() - started)
+    return true_distances, predecessors
@@ -0,0 +1,108 @@
+import heapq
+from typing import Dict, Tuple, List, Optional, Callable, Iterable, FrozenSet
+from dnd.core import metrics
+from dnd.core.dijkstra import PATHFINDING_SECONDS, get_neighbors
+
+
+def compute_distance_field(
+    goals: Iterable[Tuple[int, int]],
+    is_walkable: Callable[[int, int], bool],
+    width: int,
+    height: int,
+    diagonal: bool = True,
+    max_distance: Optional[int] = None,
+    cost: Optional[Callable[[int, int], int]] = None,
+    epsilon: float = 0.001  # Small cost added for diagonal moves
+) -> Tuple[Dict[Tuple[int, int], int], Dict[Tuple[int, int], Tuple[int, int]]]:
+    """
+    Run a single reverse Dijkstra seeded from every goal at once.
+
+    Moving from a cell onto a neighbor costs the movement cost of the neighbor, exactly as in
+    `dijkstra`, so the cost read from the field for a cell equals the cost `dijkstra` would find
+    from that cell to its closest goal.
+
+    Returns:
+        Tuple of (distances, next_steps) where:
+        - distances maps each walkable cell to its true cost to the closest goal
+        - next_steps maps each non goal cell to the neighbor to step on to get closer to a goal
+    """
+    started = metrics.clock() if metrics.enabled else None
+    distances: Dict[Tuple[int, int], float] = {}
+    true_distances: Dict[Tuple[int, int], int] = {}
+    next_steps: Dict[Tuple[int, int], Tuple[int, int]] = {}
+    pq: List[Tuple[float, Tuple[int, int]]] = []
+    for goal in goals:
+        if goal in distances or not is_walkable(*goal):
+            continue
+        distances[goal] = 0
+        true_distances[goal] = 0
+        pq.append((float(0), goal))
+    heapq.heapify(pq)
+    visited = set()
+
+    while pq:
+        current_distance, current_position = heapq.heappop(pq)
+
+        if current_position in visited:
+            continue
+        visited.add(current_position)
+
+        # every neighbor would pay the cost of stepping onto the current position
+        move_cost = cost(*current_position) if cost else 1
+
+        for neighbor in get_neighbors(current_position, diagonal, width, height):
+            if neighbor in visited or not is_walkable(*neighbor):
+                continue
+
+            is_diagonal = (neighbor[0] != current_position[0]) and (neighbor[1] != current_position[1])
+            additional_cost = epsilon if is_diagonal else 0
+
+            distance = current_distance + move_cost + additional_cost
+            if max_distance is not None and distance > max_distance:
+                continue
+
+            if neighbor not in distances or distance < distances[neighbor]:
+                distances[neighbor] = distance
+                true_distances[neighbor] = int(true_distances[current_position] + move_cost)
+                next_steps[neighbor] = current_position
+                heapq.heappush(pq, (distance, neighbor))
+
+    if started is not None:
+        PATHFINDING_SECONDS.labels("distance_field").observe(metrics.clock() - started)
+    return true_distances, next_steps
+
+
+class DistanceField:
+    """
+    A flow field towards a set of goal cells. Any number of movers can read their remaining cost
+    and next step from the same field in constant time instead of running their own search.
+    """
+
+    def __init__(self, goals: FrozenSet[Tuple[int, int]], distances: Dict[Tuple[int, int], int],
+                 next_steps: Dict[Tuple[int, int], Tuple[int, int]], map_version: int = 0):
+        self.goals = goals
+        self.distances = distances
+        self.next_steps = next_steps
+        self.map_version = map_version
+
+    def __contains__(self, position: Tuple[int, int]) -> bool:
+        return position in self.distances
+
+    def cost_to_goal(self, position: Tuple[int, int]) -> Optional[int]:
+        """ remaining cost from the position to the closest goal, None if no goal can be reached"""
+        return self.distances.get(position)
+
+    def next_step(self, position: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """ the neighbor to move on from the position, None for goals and unreachable cells"""
+        return self.next_steps.get(position)
+
+    def path_to_goal(self, position: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """ follow the field from the position to the closest goal, the path includes both ends
+        as the paths returned by dijkstra do"""
+        if position not in self.distances:
+            return []
+        path = [position]
+        while position in self.next_steps:
+            position = self.next_steps[position]
+            path.append(position)
+        return path
@@ -0,0 +1,333 @@
+import heapq
+import math
+from typing import Dict, Tuple, List, Optional, Callable, Set
+
+from dnd.core import metrics
+from dnd.core.dijkstra import PATHFINDING_SECONDS
+
+INFINITY = math.inf
+
+Key = Tuple[float, float]
+
+
+def get_unbounded_neighbors(position: Tuple[int, int], diagonal: bool) -> List[Tuple[int, int]]:
+    """ neighbors without grid bounds, cells outside the map are filtered by the walkability check"""
+    x, y = position
+    directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+    if diagonal:
+        directions += [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+    return [(x + dx, y + dy) for dx, dy in directions]
+
+
+class DStarLite:
+    """
+    Incremental shortest path between a start and a goal (D* Lite, Koenig & Likhachev).
+
+    The search runs backwards from the goal and keeps its state between queries. When the cost or
+    the walkability of a cell changes only the vertices whose shortest path went through it are
+    repaired, and the start can move along the path without invalidating the search.
+
+    Moving onto a cell costs its movement cost plus a small epsilon for diagonal moves, the same
+    scheme used by `dijkstra`, so both return the same paths costs.
+    """
+
+    def __init__(
+        self,
+        start: Tuple[int, int],
+        goal: Tuple[int, int],
+        is_walkable: Callable[[int, int], bool],
+        cost: Optional[Callable[[int, int], int]] = None,
+        diagonal: bool = True,
+        epsilon: float = 0.001
+    ):
+        self.start = start
+        self.goal = goal
+        self.is_walkable = is_walkable
+        self.cost = cost
+        self.diagonal = diagonal
+        self.epsilon = epsilon
+        self.km = 0.0
+        self.g: Dict[Tuple[int, int], float] = {}
+        self.rhs: Dict[Tuple[int, int], float] = {goal: 0.0}
+        self._queue: List[Tuple[Key, Tuple[int, int]]] = []
+        self._queued_keys: Dict[Tuple[int, int], Key] = {}
+        self._changed_cells: Set[Tuple[int, int]] = set()
+        self._last_start = start
+        self.expanded = 0
+        self._push(goal, self._calculate_key(goal))
+
+    def _heuristic(self, a: Tuple[int, int], b: Tuple[int, int]) -> float:
+        # every move costs at least one so the chebyshev distance never overestimates
+        return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+    def _edge_cost(self, u: Tuple[int, int], v: Tuple[int, int]) -> float:
+        """ cost of moving from u onto its neighbor v"""
+        if not self.is_walkable(*v):
+            return INFINITY
+        move_cost = self.cost(*v) if self.cost else 1
+        is_diagonal = u[0] != v[0] and u[1] != v[1]
+        return move_cost + (self.epsilon if is_diagonal else 0)
+
+    def _calculate_key(self, s: Tuple[int, int]) -> Key:
+        best = min(self.g.get(s, INFINITY), self.rhs.get(s, INFINITY))
+        return (best + self._heuristic(self.start, s) + self.km, best)
+
+    def _push(self, s: Tuple[int, int], key: Key) -> None:
+        self._queued_keys[s] = key
+        heapq.heappush(self._queue, (key, s))
+
+    def _top(self) -> Tuple[Key, Optional[Tuple[int, int]]]:
+        while self._queue:
+            key, s = self._queue[0]
+            if self._queued_keys.get(s) == key:
+                return key, s
+            heapq.heappop(self._queue)
+        return (INFINITY, INFINITY), None
+
+    def _update_vertex(self, u: Tuple[int, int]) -> None:
+        if u != self.goal and u != self.start and not self.is_walkable(*u):
+            self.rhs[u] = INFINITY
+        elif u != self.goal:
+            self.rhs[u] = min(
+                (self._edge_cost(u, s) + self.g.get(s, INFINITY) for s in get_unbounded_neighbors(u, self.diagonal)),
+                default=INFINITY
+            )
+        self._queued_keys.pop(u, None)
+        if self.g.get(u, INFINITY) != self.rhs.get(u, INFINITY):
+            self._push(u, self._calculate_key(u))
+
+    def _predecessors(self, u: Tuple[int, int]) -> List[Tuple[int, int]]:
+        # cells that can step onto u, the start is always allowed even if it is not walkable itself
+        return [s for s in get_unbounded_neighbors(u, self.diagonal) if s == self.start or self.is_walkable(*s)]
+
+    def compute_shortest_path(self) -> None:
+        """ expand vertices until the start is locally consistent"""
+        started = metrics.clock() if metrics.enabled else None
+        while True:
+            top_key, u = self._top()
+            if u is None:
+                break
+            start_key = self._calculate_key(self.start)
+            if top_key >= start_key and self.rhs.get(self.start, INFINITY) == self.g.get(self.start, INFINITY):
+                break
+            self.expanded += 1
+            new_key = self._calculate_key(u)
+            g_u = self.g.get(u, INFINITY)
+            rhs_u = self.rhs.get(u, INFINITY)
+            if top_key < new_key:
+                self._push(u, new_key)
+            elif g_u > rhs_u:
+                self.g[u] = rhs_u
+                self._queued_keys.pop(u, None)
+                for s in self._predecessors(u):
+                    self._update_vertex(s)
+            else:
+                self.g[u] = INFINITY
+                for s in self._predecessors(u) + [u]:
+                    self._update_vertex(s)
+        if started is not None:
+            PATHFINDING_SECONDS.labels("dstar_lite").observe(metrics.clock() - started)
+
+    def notify_cell_changed(self, position: Tuple[int, int]) -> None:
+        """ record a cell whose walkability or cost changed, the repair happens on the next query"""
+        self._changed_cells.add(position)
+
+    def reset(self) -> None:
+        """ drop the search state and plan from scratch on the next query, e.g. after the whole map was replaced"""
+        self.km = 0.0
+        self.g = {}
+        self.rhs = {self.goal: 0.0}
+        self._queue = []
+        self._queued_keys = {}
+        self._changed_cells = set()
+        self._last_start = self.start
+        self._push(self.goal, self._calculate_key(self.goal))
+
+    def move_start(self, new_start: Tuple[int, int]) -> None:
+        """ move the start, e.g. after the mover advanced along the path"""
+        self.start = new_start
+
+    def _apply_changes(self) -> None:
+        if self.start != self._last_start:
+            self.km += self._heuristic(self._last_start, self.start)
+            self._last_start = self.start
+        changed_cells, self._changed_cells = self._changed_cells, set()
+        for cell in changed_cells:
+            # edges entering the cell changed, so every neighbor has to be re-evaluated
+            for s in get_unbounded_neighbors(cell, self.diagonal):
+                self._update_vertex(s)
+            self._update_vertex(cell)
+
+    def get_cost(self) -> Optional[float]:
+        """ the current shortest path cost including the diagonal epsilons, None if unreachable"""
+        self._apply_changes()
+        self.compute_shortest_path()
+        cost = self.g.get(self.start, INFINITY)
+        if self.start == self.goal:
+            return 0.0
+        return None if cost == INFINITY else cost
+
+    def get_path(self) -> List[Tuple[int, int]]:
+        """
+        Repair the search after any change and return the path from the start to the goal,
+        including both ends as `dijkstra` paths do. Returns an empty list if the goal is unreachable.
+        """
+        if self.get_cost() is None:
+            return []
+        path = [self.start]
+        current = self.start
+        visited = {current}
+        while current != self.goal:
+            best_next = None
+            best_cost = INFINITY
+            for s in get_unbounded_neighbors(current, self.diagonal):
+                candidate = self._edge_cost(current, s) + self.g.get(s, INFINITY)
+                if candidate < best_cost:
+                    best_cost = candidate
+                    best_next = s
+            if best_next is None or best_next in visited:
+                return []
+            path.append(best_next)
+            visited.add(best_next)
+            current = best_next
+        return path
+
+
+class IncrementalPathTree:
+    """
+    Incremental shortest path tree from a root to every cell within a distance (Lifelong Planning A*
+    without a goal, the one to all form of the search `DStarLite` runs backwards).
+
+    It gives the tree `shortest_path_tree` computes, each reached cell mapped to its predecessor, but
+    keeps its search state: after a cell changes only the cells whose distance went through it are
+    repaired, and the distance bound can grow without starting over. Moving the root invalidates
+    every distance, `reset` starts the search again from the new root. Ties between paths of equal
+    cost are broken as `shortest_path_tree` breaks them, so both return the same tree.
+    """
+
+    def __init__(
+        self,
+        root: Tuple[int, int],
+        is_walkable: Callable[[int, int], bool],
+        cost: Optional[Callable[[int, int], int]] = None,
+        diagonal: bool = True,
+        epsilon: float = 0.001
+    ):
+        self.is_walkable = is_walkable
+        self.cost = cost
+        self.diagonal = diagonal
+        self.epsilon = epsilon
+        self.expanded = 0
+        self.reset(root)
+
+    def reset(self, root: Optional[Tuple[int, int]] = None) -> None:
+        """ drop the search state, optionally moving the root, the search runs again on the next query"""
+        if root is not None:
+            self.root = root
+        self.g: Dict[Tuple[int, int], float] = {}
+        self.rhs: Dict[Tuple[int, int], float] = {self.root: 0.0}
+        self.parent: Dict[Tuple[int, int], Tuple[int, int]] = {self.root: self.root}
+        self._queue: List[Tuple[float, Tuple[int, int]]] = []
+        self._queued_keys: Dict[Tuple[int, int], float] = {}
+        self._changed_cells: Set[Tuple[int, int]] = set()
+        self._push(self.root, 0.0)
+
+    def _push(self, s: Tuple[int, int], key: float) -> None:
+        self._queued_keys[s] = key
+        heapq.heappush(self._queue, (key, s))
+
+    def _top(self) -> Tuple[float, Optional[Tuple[int, int]]]:
+        while self._queue:
+            key, s = self._queue[0]
+            if self._queued_keys.get(s) == key:
+                return key, s
+            heapq.heappop(self._queue)
+        return INFINITY, None
+
+    def _update_vertex(self, v: Tuple[int, int]) -> None:
+        if v != self.root:
+            best, best_parent = INFINITY, None
+            if self.is_walkable(*v):
+                step = self.cost(*v) if self.cost else 1
+                for u in get_unbounded_neighbors(v, self.diagonal):
+                    g_u = self.g.get(u, INFINITY)
+                    if g_u == INFINITY:
+                        continue
+                    candidate = g_u + step + (self.epsilon if u[0] != v[0] and u[1] != v[1] else 0)
+                    # on ties keep the neighbor `shortest_path_tree` settles first, the closest then the smallest
+                    if candidate < best or candidate == best and (g_u, u) < (self.g[best_parent], best_parent):
+                        best, best_parent = candidate, u
+            self.rhs[v] = best
+            if best_parent is None:
+                self.parent.pop(v, None)
+            else:
+                self.parent[v] = best_parent
+        self._queued_keys.pop(v, None)
+        key = min(self.g.get(v, INFINITY), self.rhs.get(v, INFINITY))
+        if self.g.get(v, INFINITY) != self.rhs.get(v, INFINITY):
+            self._push(v, key)
+
+    def compute(self, max_distance: Optional[float] = None) -> None:
+        """ expand cells until every cell within max_distance of the root is consistent"""
+        started = metrics.clock() if metrics.enabled else None
+        bound = INFINITY if max_distance is None else max_distance
+        changed_cells, self._changed_cells = self._changed_cells, set()
+        for cell in changed_cells:
+            # only the edges entering the cell changed, the cells after it follow once it is expanded
+            self._update_vertex(cell)
+        while True:
+            key, u = self._top()
+            if u is None or key > bound:
+                break
+            heapq.heappop(self._queue)
+            del self._queued_keys[u]
+            self.expanded += 1
+            g_u, rhs_u = self.g.get(u, INFINITY), self.rhs.get(u, INFINITY)
+            if g_u > rhs_u:
+                self.g[u] = rhs_u
+                for v in get_unbounded_neighbors(u, self.diagonal):
+                    self._update_vertex(v)
+            else:
+                self.g[u] = INFINITY
+                self._update_vertex(u)
+                for v in get_unbounded_neighbors(u, self.diagonal):
+                    self._update_vertex(v)
+        if started is not None:
+            PATHFINDING_SECONDS.labels("incremental_path_tree").observe(metrics.clock() - started)
+
+    def notify_cell_changed(self, position: Tuple[int, int]) -> None:
+        """
+        Record a cell whose walkability or cost changed, the repair happens on the next query.
+
+        Cells the search never reached are skipped, they are read once the search gets to them. When
+        the changes outnumber a quarter of the searched cells a new search is cheaper than the repair,
+        so the tree resets instead of piling up the cells of a bulk map edit.
+        """
+        if position not in self.rhs:
+            return
+        self._changed_cells.add(position)
+        if len(self._changed_cells) > max(64, len(self.rhs) // 4):
+            self.reset()
+
+    def cell_count(self) -> int:
+        """ the number of cells held in the search state"""
+        return len(self.rhs)
+
+    def get_tree(self, max_distance: Optional[float] = None) -> Tuple[Dict[Tuple[int, int], int], Dict[Tuple[int, int], Tuple[int, int]]]:
+        """
+        Repair the search after any change and return the tree as `shortest_path_tree` does.
+
+        Returns:
+            Tuple of (distances, predecessors) over the cells within max_distance, the distances
+            without the diagonal epsilons and the root being its own predecessor
+        """
+        self.compute(max_distance)
+        bound = INFINITY if max_distance is None else max_distance
+        distances: Dict[Tuple[int, int], int] = {}
+        predecessors: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for cell, distance in self.g.items():
+            if distance <= bound and distance != INFINITY:
+                # the epsilons of fewer than 1 / epsilon diagonal steps stay below one
+                distances[cell] = int(distance)
+                predecessors[cell] = self.parent[cell]
+        return distances, predecessors
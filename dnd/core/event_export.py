@@ -0,0 +1,173 @@
+import json
+import os
+import zipfile
+from enum import Enum
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+from uuid import UUID
+
+import numpy as np
+
+from dnd.core.dice import AttackOutcome
+from dnd.core.events import Event, EventPhase, EventQueue, EventType
+from dnd.core.modifiers import DamageType
+
+# one row per stored event, the categorical columns hold the index of their value in `CATEGORIES`
+EVENT_DTYPE = np.dtype([
+    ("sequence", "<u8"),
+    ("timestamp", "<M8[us]"),
+    ("event_type", "u1"),
+    ("phase", "u1"),
+    ("canceled", "?"),
+    ("lineage_uuid", "V16"),
+    ("source_entity_uuid", "V16"),
+    ("target_entity_uuid", "V16"),   # zero bytes when the event has no target
+    ("dice_total", "<i4"),           # MISSING when the event has no roll
+    ("result", "i1"),                # success of a d20 event, -1 when unknown
+    ("attack_outcome", "i1"),        # -1 when the event has no outcome
+    ("damage_total", "<i4"),         # MISSING when the event rolled no damage
+])
+# one row per damage roll of an attack, joined to its event by sequence
+DAMAGE_DTYPE = np.dtype([
+    ("sequence", "<u8"),
+    ("damage_type", "u1"),
+    ("total", "<i4"),
+])
+MISSING = np.iinfo(np.int32).min
+NO_UUID = bytes(16)
+DEFAULT_CHUNK_SIZE = 65536
+
+CATEGORIES: Dict[str, Type[Enum]] = {
+    "event_type": EventType,
+    "phase": EventPhase,
+    "attack_outcome": AttackOutcome,
+    "damage_type": DamageType,
+}
+_CODES = {column: {value: code for code, value in enumerate(enum)} for column, enum in CATEGORIES.items()}
+
+
+def _event_row(sequence: int, event: Event, damages: List[Tuple]) -> Tuple:
+    """ the event columns of a stored event, appending its damage rows, attributes of the event subclasses are read when present"""
+    dice_roll = getattr(event, "dice_roll", None)
+    result = getattr(event, "result", None)
+    outcome = getattr(event, "attack_outcome", None)
+    damage_total = MISSING
+    damage_rolls = getattr(event, "damage_rolls", None)
+    if damage_rolls:
+        damage_total = 0
+        for damage, roll in zip(getattr(event, "damages", None) or [], damage_rolls):
+            damages.append((sequence, _CODES["damage_type"][damage.damage_type], roll.total))
+            damage_total += roll.total
+    return (
+        sequence,
+        event.timestamp,
+        _CODES["event_type"][event.event_type],
+        _CODES["phase"][event.phase],
+        event.canceled,
+        event.lineage_uuid.bytes,
+        event.source_entity_uuid.bytes,
+        event.target_entity_uuid.bytes if event.target_entity_uuid else NO_UUID,
+        dice_roll.total if dice_roll is not None else MISSING,
+        -1 if result is None else int(result),
+        _CODES["attack_outcome"][outcome] if outcome is not None else -1,
+        damage_total,
+    )
+
+
+def iter_event_chunks(after: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Convert the events stored after a sequence number into columns, `chunk_size` events at a time.
+    Only the events stored when the iteration starts are converted, so a running engine can keep storing.
+
+    Yields:
+        Tuple of (events with EVENT_DTYPE, damages with DAMAGE_DTYPE) arrays of a chunk
+    """
+    last = EventQueue.get_last_sequence()
+    rows: List[Tuple] = []
+    damages: List[Tuple] = []
+    for sequence, event in EventQueue.query(after=after):
+        if sequence > last:
+            break
+        rows.append(_event_row(sequence, event, damages))
+        if len(rows) == chunk_size:
+            yield np.array(rows, dtype=EVENT_DTYPE), np.array(damages, dtype=DAMAGE_DTYPE)
+            rows, damages = [], []
+    if rows:
+        yield np.array(rows, dtype=EVENT_DTYPE), np.array(damages, dtype=DAMAGE_DTYPE)
+
+
+def _category_arrays() -> Dict[str, np.ndarray]:
+    return {f"{column}_values": np.array([value.value for value in enum]) for column, enum in CATEGORIES.items()}
+
+
+def export_events_npz(path: str, after: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Write the stored events to a compressed `.npz` archive, one `events_NNNNN` and `damages_NNNNN`
+    member per chunk plus the `<column>_values` arrays decoding the categorical columns.
+    The chunks are written to the archive as they are converted.
+
+    Returns:
+        The number of events written
+    """
+    count = 0
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        def write(name: str, array: np.ndarray) -> None:
+            with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                np.lib.format.write_array(member, array, allow_pickle=False)
+
+        for name, values in _category_arrays().items():
+            write(name, values)
+        for index, (events, damages) in enumerate(iter_event_chunks(after, chunk_size)):
+            write(f"events_{index:05d}", events)
+            write(f"damages_{index:05d}", damages)
+            count += len(events)
+    return count
+
+
+def export_events_npy(directory: str, after: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Write the stored events to a directory of uncompressed `.npy` chunks, which `np.load(..., mmap_mode="r")`
+    maps without reading them, and a `categories.json` decoding the categorical columns.
+
+    Returns:
+        The number of events written
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "categories.json"), "w") as handle:
+        json.dump({column: [value.value for value in enum] for column, enum in CATEGORIES.items()}, handle)
+    count = 0
+    for index, (events, damages) in enumerate(iter_event_chunks(after, chunk_size)):
+        np.save(os.path.join(directory, f"events_{index:05d}.npy"), events, allow_pickle=False)
+        np.save(os.path.join(directory, f"damages_{index:05d}.npy"), damages, allow_pickle=False)
+        count += len(events)
+    return count
+
+
+def iter_exported_chunks(path: str, mmap: bool = True) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """ read back the (events, damages) chunks of an `.npz` archive or `.npy` directory, memory mapped for a directory"""
+    if os.path.isdir(path):
+        index = 0
+        while os.path.exists(os.path.join(path, f"events_{index:05d}.npy")):
+            mode = "r" if mmap else None
+            yield (np.load(os.path.join(path, f"events_{index:05d}.npy"), mmap_mode=mode),
+                   np.load(os.path.join(path, f"damages_{index:05d}.npy"), mmap_mode=mode))
+            index += 1
+        return
+    with np.load(path) as archive:
+        index = 0
+        while f"events_{index:05d}" in archive:
+            yield archive[f"events_{index:05d}"], archive[f"damages_{index:05d}"]
+            index += 1
+
+
+def load_exported_events(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """ read a whole export into single (events, damages) arrays"""
+    chunks = list(iter_exported_chunks(path, mmap=False))
+    if not chunks:
+        return np.empty(0, dtype=EVENT_DTYPE), np.empty(0, dtype=DAMAGE_DTYPE)
+    return np.concatenate([events for events, _ in chunks]), np.concatenate([damages for _, damages in chunks])
+
+
+def decode_uuid(value: np.void) -> Optional[UUID]:
+    """ the UUID of a uuid column cell, None for the zero bytes of a missing target"""
+    raw = bytes(value)
+    return None if raw == NO_UUID else UUID(bytes=raw)
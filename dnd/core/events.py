@@ -13,8 +13,12 @@ from dnd.core.dice import Dice, DiceRoll, AttackOutcome, RollType
 from datetime import datetime
 from dnd.core.modifiers import NumericalModifier, DamageType , ResistanceStatus, ContextAwareCondition, saving_throws, ResistanceModifier
 from collections import defaultdict
-from typing import Callable, Tuple
+from typing import Callable, Tuple, Iterable, Iterator, Set
+from bisect import bisect_left, bisect_right
+from itertools import count, islice
+import heapq
 from dnd.core.base_object import BaseObject
+from dnd.core import metrics
 # Type definition for event listeners
 T = TypeVar('T', bound='Event')
 E = TypeVar('E', bound='Event')
@@ -333,6 +337,7 @@ class EventHandler(BaseObject):
     name: str = Field(default="EventHandler",description="The name of the event handler")
     trigger_conditions: List[Trigger] = Field(default_factory=list,description="The conditions that trigger the event handler")
     event_processor: EventProcessor = Field(description="The event processor to handle the event")
+    routed: bool = Field(default=False,description="Only invoked for the entities selected by the router of its trigger, see EventQueue.set_router")
     
     def __call__(self, event: Event, source_entity_uuid: Optional[UUID] = None) -> Optional[Event]:
         if source_entity_uuid is None:
@@ -360,6 +365,9 @@ class EventHandler(BaseObject):
 
         return True
 
+EVENTS_REGISTERED = metrics.counter("dnd_events_registered_total", "Events registered with the event queue", ["event_type"])
+
+
 class EventQueue:
     """Static registry for events with additional querying and reaction capabilities"""
     # Static registry dictionaries
@@ -375,9 +383,29 @@ class EventQueue:
     _event_handlers_by_trigger : Dict[Trigger, List[EventHandler]] = defaultdict(list)
     _event_handlers_by_simple_trigger : Dict[Trigger, List[EventHandler]] = defaultdict(list)
     _event_handlers_by_source_entity_uuid : Dict[UUID, List[EventHandler]] = defaultdict(list)
+    # Routed handlers by simple trigger and source entity, only the entities returned by the router are dispatched to
+    _routed_handlers : Dict[Trigger, Dict[UUID, List[EventHandler]]] = defaultdict(lambda: defaultdict(list))
+    _routers : Dict[Trigger, Callable[[Event], Iterable[UUID]]] = {}
+    # Registration order of the handlers, routed handlers are dispatched in it among the others
+    _handler_order : Dict[UUID, int] = {}
+    _handler_counter : Iterator[int] = count()
+    _listeners : List[Callable[[Event], None]] = []
+    # Every store of an event in order, the sequence number of a store is its position in the log plus one
+    _event_log : List[Event] = []
+    _sequences_by_type : Dict[EventType, List[int]] = defaultdict(list)
+    _sequences_by_source : Dict[UUID, List[int]] = defaultdict(list)
+    _sequences_by_target : Dict[UUID, List[int]] = defaultdict(list)
+    # Composite indexes of the multi criteria queries
+    _sequences_by_source_type : Dict[Tuple[UUID, EventType], List[int]] = defaultdict(list)
+    _sequences_by_target_type : Dict[Tuple[UUID, EventType], List[int]] = defaultdict(list)
+    _sequences_by_lineage_phase : Dict[Tuple[UUID, EventPhase], List[int]] = defaultdict(list)
+    # Store time of each sequence, the event timestamp or the latest earlier one so the list stays sorted
+    _store_times : List[datetime] = []
     @classmethod
     def register(cls, event: Event) -> Event:
         """Register an event and notify listeners"""
+        if metrics.enabled:
+            EVENTS_REGISTERED.labels(event.event_type.value).inc()
         # Store in all appropriate indices
         cls._store_event(event)
         
@@ -411,6 +439,17 @@ class EventQueue:
             
         return current_event
     
+    @classmethod
+    def clear(cls) -> None:
+        """Forget every stored event and handler, the listeners stay registered"""
+        for index in (cls._events_by_lineage, cls._events_by_uuid, cls._events_by_type, cls._events_by_timestamp,
+                      cls._events_by_phase, cls._events_by_source, cls._events_by_target, cls._all_events,
+                      cls._event_handlers, cls._event_handlers_by_trigger, cls._event_handlers_by_simple_trigger,
+                      cls._event_handlers_by_source_entity_uuid, cls._routed_handlers, cls._handler_order, cls._event_log, cls._sequences_by_type,
+                      cls._sequences_by_source, cls._sequences_by_target, cls._sequences_by_source_type,
+                      cls._sequences_by_target_type, cls._sequences_by_lineage_phase, cls._store_times):
+            index.clear()
+
     @classmethod
     def get_event_by_uuid(cls, uuid: UUID) -> Optional[Event]:
         """Get an event by UUID"""
@@ -451,6 +490,36 @@ class EventQueue:
         # Add to chronological list and sort
         cls._all_events.append(event)
         cls._all_events.sort(key=lambda e: e.timestamp)
+
+        # By sequence number, the sequence lists stay sorted for the cursor based reads
+        cls._event_log.append(event)
+        sequence = len(cls._event_log)
+        cls._sequences_by_type[event.event_type].append(sequence)
+        cls._sequences_by_source[event.source_entity_uuid].append(sequence)
+        if event.target_entity_uuid:
+            cls._sequences_by_target[event.target_entity_uuid].append(sequence)
+            cls._sequences_by_target_type[(event.target_entity_uuid, event.event_type)].append(sequence)
+        cls._sequences_by_source_type[(event.source_entity_uuid, event.event_type)].append(sequence)
+        cls._sequences_by_lineage_phase[(event.lineage_uuid, event.phase)].append(sequence)
+        store_time = event.timestamp
+        if cls._store_times and cls._store_times[-1] > store_time:
+            store_time = cls._store_times[-1]
+        cls._store_times.append(store_time)
+
+        # Notify the observers of the queue, e.g. the clients streaming the events
+        for listener in list(cls._listeners):
+            listener(event)
+
+    @classmethod
+    def add_listener(cls, listener: Callable[[Event], None]) -> None:
+        """Call a function with every event stored in the queue, including each new phase of an event"""
+        if listener not in cls._listeners:
+            cls._listeners.append(listener)
+
+    @classmethod
+    def remove_listener(cls, listener: Callable[[Event], None]) -> None:
+        if listener in cls._listeners:
+            cls._listeners.remove(listener)
     
     @classmethod
     def _get_handlers_for_event(cls, event: Event) -> List[EventHandler]:
@@ -464,10 +533,33 @@ class EventQueue:
    
             all_handlers = simple_handlers + complex_handlers
         else:
+             simple_trigger = trigger_condition
              all_handlers = cls._event_handlers_by_trigger.get(trigger_condition, [])
         
-        
+        routed = cls._routed_handlers.get(simple_trigger)
+        router = cls._routers.get(simple_trigger)
+        if routed and router is not None:
+            # merged by registration order so the dispatch order does not depend on the routing
+            selected = sorted((handler for uuid in set(router(event)) if uuid in routed for handler in routed[uuid]),
+                              key=lambda handler: cls._handler_order[handler.uuid])
+            if selected:
+                all_handlers = list(heapq.merge(all_handlers, selected, key=lambda handler: cls._handler_order[handler.uuid]))
         return all_handlers
+
+    @classmethod
+    def set_router(cls, trigger: Trigger, router: Callable[[Event], Iterable[UUID]]) -> None:
+        """
+        Select the routed handlers of a trigger to dispatch an event to.
+
+        Handlers created with `routed=True` are not invoked for every matching event like the others,
+        only those whose source entity is returned by the router of their simple trigger are, so an
+        event that concerns a few entities does not call the handlers of all of them.
+
+        Args:
+            trigger: The trigger, only its event type and phase are used
+            router: Function returning the source entity uuids whose handlers receive the event
+        """
+        cls._routers[trigger.get_simple_trigger()] = router
     
     @classmethod
     def add_event_handler(cls, event_handler: EventHandler) -> None:
@@ -479,8 +571,19 @@ class EventQueue:
             event_phase: Phase of event to listen for (or None for all phases)
             source_entity_uuid: UUID of the entity that owns this listener
             listener: The listener function to call when an event matches
+
+        Raises:
+            ValueError: If the handler is routed and a trigger has no router set, it would never be called
         """
+        if event_handler.routed:
+            unrouted = [trigger for trigger in event_handler.trigger_conditions if trigger.get_simple_trigger() not in cls._routers]
+            if unrouted:
+                raise ValueError(f"Routed handler {event_handler.uuid} has triggers without a router: {unrouted}")
+        cls._handler_order[event_handler.uuid] = next(cls._handler_counter)
         for trigger in event_handler.trigger_conditions:
+            if event_handler.routed:
+                cls._routed_handlers[trigger.get_simple_trigger()][event_handler.source_entity_uuid].append(event_handler)
+                continue
             if trigger.is_simple():
                 cls._event_handlers_by_simple_trigger[trigger.get_simple_trigger()].append(event_handler)
             cls._event_handlers_by_trigger[trigger].append(event_handler)
@@ -491,10 +594,18 @@ class EventQueue:
     def remove_event_handler(cls, event_handler: EventHandler) -> None:
         """Remove a handler"""
         for trigger in event_handler.trigger_conditions:
+            if event_handler.routed:
+                handlers = cls._routed_handlers[trigger.get_simple_trigger()]
+                handlers[event_handler.source_entity_uuid].remove(event_handler)
+                if not handlers[event_handler.source_entity_uuid]:
+                    del handlers[event_handler.source_entity_uuid]
+                cls._event_handlers.pop(event_handler.uuid, None)
+                continue
             if trigger.is_simple():
                 cls._event_handlers_by_simple_trigger[trigger.get_simple_trigger()].remove(event_handler)
             cls._event_handlers_by_trigger[trigger].remove(event_handler)
             cls._event_handlers.pop(event_handler.uuid)
+        cls._handler_order.pop(event_handler.uuid, None)
         cls._event_handlers_by_source_entity_uuid[event_handler.source_entity_uuid].remove(event_handler)
 
     @classmethod
@@ -562,8 +673,124 @@ class EventQueue:
     def get_events_by_timestamp(cls, timestamp: datetime) -> List[Event]:
         """Get all events with a specific timestamp"""
         return cls._events_by_timestamp.get(timestamp, [])
+
+    @classmethod
+    def get_last_sequence(cls) -> int:
+        """The sequence number of the latest store, 0 for an empty queue"""
+        return len(cls._event_log)
+
+    @classmethod
+    def _plan_query(cls, after: int, last: int,
+                    event_types: Optional[Set[EventType]],
+                    phases: Optional[Set[EventPhase]],
+                    source_entity_uuid: Optional[UUID],
+                    target_entity_uuid: Optional[UUID],
+                    lineage_uuid: Optional[UUID]) -> Tuple[str, int, Iterator[int]]:
+        """
+        Pick the index scanning the fewest sequences in the range (after, last] for a query.
+
+        Every index usable by the query is measured exactly by bisecting its sorted sequence lists,
+        the keys of a multi valued criterion are merged back into sequence order.
+
+        Returns:
+            Tuple of (index name, number of sequences to scan, the sequences to scan)
+        """
+        def key_lists(index: Dict[Any, List[int]], keys: Iterable[Any]) -> List[Tuple[List[int], int, int]]:
+            bounded = []
+            for key in keys:
+                sequences = index.get(key)
+                if sequences:
+                    start, stop = bisect_right(sequences, after), bisect_right(sequences, last)
+                    if stop > start:
+                        bounded.append((sequences, start, stop))
+            return bounded
+
+        plans: List[Tuple[str, List[Tuple[List[int], int, int]]]] = []
+        if lineage_uuid is not None and phases is not None:
+            plans.append(("lineage_phase", key_lists(cls._sequences_by_lineage_phase, [(lineage_uuid, phase) for phase in phases])))
+        if source_entity_uuid is not None and event_types is not None:
+            plans.append(("source_type", key_lists(cls._sequences_by_source_type, [(source_entity_uuid, event_type) for event_type in event_types])))
+        if target_entity_uuid is not None and event_types is not None:
+            plans.append(("target_type", key_lists(cls._sequences_by_target_type, [(target_entity_uuid, event_type) for event_type in event_types])))
+        if source_entity_uuid is not None:
+            plans.append(("source", key_lists(cls._sequences_by_source, [source_entity_uuid])))
+        if target_entity_uuid is not None:
+            plans.append(("target", key_lists(cls._sequences_by_target, [target_entity_uuid])))
+        if event_types is not None:
+            plans.append(("type", key_lists(cls._sequences_by_type, event_types)))
+        if not plans:
+            return "sequence", max(0, last - after), iter(range(after + 1, last + 1))
+
+        name, bounded = min(plans, key=lambda plan: sum(stop - start for _, start, stop in plan[1]))
+        size = sum(stop - start for _, start, stop in bounded)
+        ranges = [map(sequences.__getitem__, range(start, stop)) for sequences, start, stop in bounded]
+        return name, size, ranges[0] if len(ranges) == 1 else heapq.merge(*ranges)
+
+    @classmethod
+    def query(cls, event_types: Optional[Iterable[EventType]] = None,
+              phases: Optional[Iterable[EventPhase]] = None,
+              source_entity_uuid: Optional[UUID] = None,
+              target_entity_uuid: Optional[UUID] = None,
+              lineage_uuid: Optional[UUID] = None,
+              start_time: Optional[datetime] = None,
+              end_time: Optional[datetime] = None,
+              after: int = 0) -> Iterator[Tuple[int, Event]]:
+        """
+        Iterate the stored events matching every given criterion, in store order.
+
+        The time bounds are turned into a range of sequence numbers by bisecting the store times,
+        then the most selective of the single key and composite indexes usable by the criteria is
+        scanned over that range and the remaining criteria are checked on each event. For example
+        the attacks of an entity that completed in the last round:
+
+            EventQueue.query(event_types=[EventType.ATTACK], phases=[EventPhase.COMPLETION],
+                             source_entity_uuid=entity_uuid, start_time=round_start)
+
+        Args:
+            after: Only the stores after this sequence number
+            start_time, end_time: Inclusive bounds on the store time, the event timestamp for the
+                events stored as they are created
+
+        Returns:
+            Iterator of (sequence, event) pairs
+        """
+        event_types = set(event_types) if event_types is not None else None
+        phases = set(phases) if phases is not None else None
+        if start_time is not None:
+            after = max(after, bisect_left(cls._store_times, start_time))
+        last = len(cls._event_log) if end_time is None else bisect_right(cls._store_times, end_time)
+        _, _, sequences = cls._plan_query(after, last, event_types, phases, source_entity_uuid, target_entity_uuid, lineage_uuid)
+        for sequence in sequences:
+            event = cls._event_log[sequence - 1]
+            if event_types is not None and event.event_type not in event_types:
+                continue
+            if phases is not None and event.phase not in phases:
+                continue
+            if source_entity_uuid is not None and event.source_entity_uuid != source_entity_uuid:
+                continue
+            if target_entity_uuid is not None and event.target_entity_uuid != target_entity_uuid:
+                continue
+            if lineage_uuid is not None and event.lineage_uuid != lineage_uuid:
+                continue
+            yield sequence, event
+
+    @classmethod
+    def get_events_page(cls, after: int = 0, limit: int = 100, **criteria) -> Tuple[List[Tuple[int, Event]], int, bool]:
+        """
+        Read a page of the stored events matching the `query` criteria after a sequence number.
+
+        Returns:
+            Tuple of ((sequence, event) pairs, the cursor of the next page, whether more may match)
+        """
+        page = list(islice(cls.query(after=after, **criteria), limit))
+        if len(page) == limit:
+            return page, page[-1][0], True
+        return page, max(after, len(cls._event_log)), False
     
 
+metrics.gauge("dnd_event_log_size", "Event stores in the event queue log", function=lambda: len(EventQueue._event_log))
+metrics.gauge("dnd_event_handlers", "Event handlers registered with the event queue", function=lambda: len(EventQueue._event_handlers))
+
 
 class D20Event(Event):
     """A d20 event"""
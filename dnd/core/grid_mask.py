@@ -0,0 +1,107 @@
+from typing import Tuple, Iterable, Optional
+
+import numpy as np
+
+
+class GridWindow:
+    """
+    A rectangular window of the grid, used to align compact per cell arrays.
+    Arrays over a window are indexed [x - x0, y - y0].
+    """
+    __slots__ = ("x0", "y0", "width", "height")
+
+    def __init__(self, x0: int = 0, y0: int = 0, width: int = 0, height: int = 0):
+        self.x0 = x0
+        self.y0 = y0
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def enclosing(cls, positions: Iterable[Tuple[int, int]]) -> 'GridWindow':
+        """ the smallest window containing every position"""
+        points = np.asarray(list(positions), dtype=np.int64).reshape(-1, 2)
+        if len(points) == 0:
+            return cls()
+        low = points.min(axis=0)
+        high = points.max(axis=0)
+        return cls(int(low[0]), int(low[1]), int(high[0] - low[0] + 1), int(high[1] - low[1] + 1))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.width, self.height)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.width == 0 or self.height == 0
+
+    def contains(self, position: Tuple[int, int]) -> bool:
+        return 0 <= position[0] - self.x0 < self.width and 0 <= position[1] - self.y0 < self.height
+
+    def union(self, other: 'GridWindow') -> 'GridWindow':
+        if self.is_empty:
+            return other
+        if other.is_empty:
+            return self
+        x0, y0 = min(self.x0, other.x0), min(self.y0, other.y0)
+        x1 = max(self.x0 + self.width, other.x0 + other.width)
+        y1 = max(self.y0 + self.height, other.y0 + other.height)
+        return GridWindow(x0, y0, x1 - x0, y1 - y0)
+
+    def flat_index(self, position: Tuple[int, int]) -> int:
+        """ index in the flattened arrays of the window, -1 outside of it"""
+        if not self.contains(position):
+            return -1
+        return (position[0] - self.x0) * self.height + (position[1] - self.y0)
+
+    def position(self, flat_index: int) -> Tuple[int, int]:
+        return (self.x0 + flat_index // self.height, self.y0 + flat_index % self.height)
+
+    def positions(self, mask: np.ndarray) -> np.ndarray:
+        """ the (N, 2) array of the positions set in a mask over the window"""
+        return np.argwhere(mask) + np.array([self.x0, self.y0])
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, GridWindow) and (self.x0, self.y0, self.width, self.height) == (other.x0, other.y0, other.width, other.height)
+
+    def __repr__(self) -> str:
+        return f"GridWindow(x0={self.x0}, y0={self.y0}, width={self.width}, height={self.height})"
+
+
+def reframe(array: np.ndarray, window: GridWindow, new_window: GridWindow, fill: object) -> np.ndarray:
+    """ copy an array over a window into a new array over a window enclosing it"""
+    if window == new_window:
+        return array
+    result = np.full(new_window.shape, fill, dtype=array.dtype)
+    if not window.is_empty:
+        dx, dy = window.x0 - new_window.x0, window.y0 - new_window.y0
+        result[dx:dx + window.width, dy:dy + window.height] = array
+    return result
+
+
+def crop(array: np.ndarray, window: GridWindow, target: GridWindow, fill: object) -> np.ndarray:
+    """ read an array over a window through another window, cells outside the source get the fill value"""
+    result = np.full(target.shape, fill, dtype=array.dtype)
+    x0, y0 = max(window.x0, target.x0), max(window.y0, target.y0)
+    x1 = min(window.x0 + window.width, target.x0 + target.width)
+    y1 = min(window.y0 + window.height, target.y0 + target.height)
+    if x0 < x1 and y0 < y1:
+        result[x0 - target.x0:x1 - target.x0, y0 - target.y0:y1 - target.y0] = \
+            array[x0 - window.x0:x1 - window.x0, y0 - window.y0:y1 - window.y0]
+    return result
+
+
+def chains_all_set(mask: np.ndarray, predecessors: np.ndarray) -> np.ndarray:
+    """
+    For a forest given as flat predecessor indices (roots point to themselves, -1 for cells outside
+    the forest), tell for every cell whether the mask is set on all the cells of its chain to the root.
+    Uses pointer jumping, so it runs in a logarithmic number of vectorized steps.
+    """
+    in_forest = predecessors >= 0
+    ok = mask & in_forest
+    jump = np.where(in_forest, predecessors, np.arange(len(predecessors)))
+    while True:
+        new_ok = ok & ok[jump]
+        new_jump = jump[jump]
+        if np.array_equal(new_jump, jump) and np.array_equal(new_ok, ok):
+            return ok
+        ok, jump = new_ok, new_jump
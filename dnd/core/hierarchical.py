@@ -0,0 +1,275 @@
+import heapq
+from typing import Dict, Tuple, List, Optional, Callable, Set
+from dnd.core import metrics
+from dnd.core.dijkstra import PATHFINDING_SECONDS, dijkstra
+from dnd.core.distance_field import compute_distance_field
+
+Cluster = Tuple[int, int]
+BorderKey = Tuple[Cluster, Cluster]
+
+
+class HierarchicalPathfinder:
+    """
+    Hierarchical pathfinding (HPA*, Botea et al.) over the tile grid.
+
+    The grid is split in square clusters. Entrances are the runs of walkable cells facing each other
+    across the border of two adjacent clusters, each run contributing one transition (two for long runs),
+    plus the diagonal crossings no run covers, including the corner shared by two diagonal clusters, so
+    every move the grid allows between clusters is represented. Long distance queries search the small
+    abstract graph of transitions and only the chosen route is refined into cells, using the paths cached
+    for the intra cluster edges.
+
+    Borders and intra cluster edges are computed lazily the first time a search touches them, so the
+    first query over a large map pays for every cluster it explores and can be slower than a flat search.
+    A changed cell only invalidates its own cluster and the borders it shares with its neighbors.
+
+    Routes are forced through the transitions, so paths are not optimal: on maps with many obstacles
+    and small clusters they can cost a multiple of the shortest path. When `grid_size` is given, queries
+    spanning less than two clusters and queries the abstract graph cannot answer use a flat search.
+    """
+
+    def __init__(
+        self,
+        is_walkable: Callable[[int, int], bool],
+        cost: Optional[Callable[[int, int], int]] = None,
+        cluster_size: int = 16,
+        long_entrance: int = 6,
+        grid_size: Optional[Callable[[], Tuple[int, int]]] = None
+    ):
+        if cluster_size < 2:
+            raise ValueError("Cluster size must be at least 2")
+        self.is_walkable = is_walkable
+        self.cost = cost
+        self.cluster_size = cluster_size
+        self.long_entrance = long_entrance
+        self.grid_size = grid_size
+        self._borders: Dict[BorderKey, List[Tuple[Tuple[int, int], Tuple[int, int]]]] = {}
+        self._intra_edges: Dict[Cluster, Dict[Tuple[int, int], Dict[Tuple[int, int], Tuple[int, List[Tuple[int, int]]]]]] = {}
+        self._changed_cells: Set[Tuple[int, int]] = set()
+
+    def cluster_of(self, position: Tuple[int, int]) -> Cluster:
+        return (position[0] // self.cluster_size, position[1] // self.cluster_size)
+
+    def _cluster_walkable(self, cluster: Cluster) -> Callable[[int, int], bool]:
+        x0, y0 = cluster[0] * self.cluster_size, cluster[1] * self.cluster_size
+        x1, y1 = x0 + self.cluster_size, y0 + self.cluster_size
+
+        def is_walkable(x: int, y: int) -> bool:
+            return x0 <= x < x1 and y0 <= y < y1 and self.is_walkable(x, y)
+        return is_walkable
+
+    def _cluster_bounds(self, cluster: Cluster) -> Tuple[int, int]:
+        """ exclusive upper bounds of the cluster, used as width and height for the local searches"""
+        return (cluster[0] + 1) * self.cluster_size, (cluster[1] + 1) * self.cluster_size
+
+    def _step_cost(self, position: Tuple[int, int]) -> int:
+        return self.cost(*position) if self.cost else 1
+
+    def _border_keys(self, cluster: Cluster) -> List[BorderKey]:
+        """ the borders of a cluster with its eight neighbors, the first cluster of a key has the lower x,
+        or the lower y when both share a column"""
+        cx, cy = cluster
+        return [
+            ((cx - 1, cy), cluster), (cluster, (cx + 1, cy)), ((cx, cy - 1), cluster), (cluster, (cx, cy + 1)),
+            ((cx - 1, cy - 1), cluster), (cluster, (cx + 1, cy + 1)), ((cx - 1, cy + 1), cluster), (cluster, (cx + 1, cy - 1)),
+        ]
+
+    def _get_border(self, key: BorderKey) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """ transitions (cell in the first cluster, neighboring cell in the second cluster) across a border"""
+        transitions = self._borders.get(key)
+        if transitions is not None:
+            return transitions
+        (ax, ay), (bx, by) = key
+        size = self.cluster_size
+        if bx != ax and by != ay:
+            # diagonal clusters only touch at a corner, crossed by a single diagonal move
+            if by == ay + 1:
+                corner = ((bx * size - 1, by * size - 1), (bx * size, by * size))
+            else:
+                corner = ((bx * size - 1, ay * size), (bx * size, ay * size - 1))
+            transitions = [corner] if self.is_walkable(*corner[0]) and self.is_walkable(*corner[1]) else []
+            self._borders[key] = transitions
+            return transitions
+        if bx == ax + 1:
+            pairs = [((bx * size - 1, ay * size + i), (bx * size, ay * size + i)) for i in range(size)]
+        else:
+            pairs = [((ax * size + i, by * size - 1), (ax * size + i, by * size)) for i in range(size)]
+        open_first = [self.is_walkable(*pair[0]) for pair in pairs]
+        open_second = [self.is_walkable(*pair[1]) for pair in pairs]
+        transitions = []
+        run: List[Tuple[Tuple[int, int], Tuple[int, int]]] = []
+        for i in range(size + 1):
+            if i < size and open_first[i] and open_second[i]:
+                run.append(pairs[i])
+                continue
+            if run:
+                if len(run) >= self.long_entrance:
+                    transitions += [run[0], run[-1]]
+                else:
+                    transitions.append(run[len(run) // 2])
+                run = []
+        # a diagonal crossing touching a run is reachable through the run, the others need their own transition
+        for i in range(size - 1):
+            for first, second in ((i, i + 1), (i + 1, i)):
+                if open_first[first] and open_second[second] and not open_second[first] and not open_first[second]:
+                    transitions.append((pairs[first][0], pairs[second][1]))
+        self._borders[key] = transitions
+        return transitions
+
+    def _transitions_in(self, cluster: Cluster) -> List[Tuple[int, int]]:
+        nodes = []
+        for key in self._border_keys(cluster):
+            side = 0 if key[0] == cluster else 1
+            for pair in self._get_border(key):
+                if pair[side] not in nodes:
+                    nodes.append(pair[side])
+        return nodes
+
+    def _inter_edges(self, node: Tuple[int, int]) -> List[Tuple[Tuple[int, int], int]]:
+        edges = []
+        for key in self._border_keys(self.cluster_of(node)):
+            for first, second in self._get_border(key):
+                if first == node:
+                    edges.append((second, self._step_cost(second)))
+                elif second == node:
+                    edges.append((first, self._step_cost(first)))
+        return edges
+
+    def _get_intra_edges(self, cluster: Cluster) -> Dict[Tuple[int, int], Dict[Tuple[int, int], Tuple[int, List[Tuple[int, int]]]]]:
+        edges = self._intra_edges.get(cluster)
+        if edges is not None:
+            return edges
+        edges = {}
+        nodes = self._transitions_in(cluster)
+        is_walkable = self._cluster_walkable(cluster)
+        width, height = self._cluster_bounds(cluster)
+        for node in nodes:
+            distances, paths = dijkstra(node, is_walkable, width, height, diagonal=True, cost=self.cost)
+            edges[node] = {other: (distances[other], paths[other]) for other in nodes if other != node and other in distances}
+        self._intra_edges[cluster] = edges
+        return edges
+
+    def notify_cell_changed(self, position: Tuple[int, int]) -> None:
+        """ record a changed cell, the abstraction around it is invalidated on the next query"""
+        self._changed_cells.add(position)
+
+    def _apply_changes(self) -> None:
+        changed_cells, self._changed_cells = self._changed_cells, set()
+        for position in changed_cells:
+            cluster = self.cluster_of(position)
+            self._intra_edges.pop(cluster, None)
+            for key in self._border_keys(cluster):
+                self._borders.pop(key, None)
+                neighbor = key[1] if key[0] == cluster else key[0]
+                self._intra_edges.pop(neighbor, None)
+
+    def find_path(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Tuple[Optional[int], List[Tuple[int, int]]]:
+        """
+        Find a path from start to goal through the abstract graph.
+
+        Returns:
+            Tuple of (cost, path) where the path includes both ends as `dijkstra` paths do,
+            or (None, []) if the goal cannot be reached
+        """
+        started = metrics.clock() if metrics.enabled else None
+        result = self._search(start, goal)
+        if started is not None:
+            PATHFINDING_SECONDS.labels("hierarchical").observe(metrics.clock() - started)
+        return result
+
+    def _search(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Tuple[Optional[int], List[Tuple[int, int]]]:
+        self._apply_changes()
+        if start == goal:
+            return 0, [start]
+        if not self.is_walkable(*goal):
+            return None, []
+        if max(abs(start[0] - goal[0]), abs(start[1] - goal[1])) < 2 * self.cluster_size:
+            # too close for the abstraction to save anything, and where its detours cost the most
+            flat = self._flat_search(start, goal)
+            if flat is not None:
+                return flat
+
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(goal)
+
+        # connect the start to the transitions of its cluster
+        width, height = self._cluster_bounds(start_cluster)
+        start_distances, start_paths = dijkstra(start, self._cluster_walkable(start_cluster), width, height, diagonal=True, cost=self.cost)
+        # and the transitions of the goal cluster to the goal
+        width, height = self._cluster_bounds(goal_cluster)
+        goal_distances, goal_next_steps = compute_distance_field([goal], self._cluster_walkable(goal_cluster), width, height, diagonal=True, cost=self.cost)
+
+        def heuristic(position: Tuple[int, int]) -> int:
+            return max(abs(position[0] - goal[0]), abs(position[1] - goal[1]))
+
+        def edges_from(node: Tuple[int, int]) -> List[Tuple[Tuple[int, int], int, str]]:
+            if node == start:
+                out = [(t, start_distances[t], "start") for t in self._transitions_in(start_cluster) if t in start_distances and t != start]
+                if goal in start_distances:
+                    out.append((goal, start_distances[goal], "start"))
+                # the start may itself sit on an entrance
+                out += [(other, edge_cost, "inter") for other, edge_cost in self._inter_edges(node)]
+                return out
+            cluster = self.cluster_of(node)
+            out = [(other, edge[0], "intra") for other, edge in self._get_intra_edges(cluster).get(node, {}).items()]
+            out += [(other, edge_cost, "inter") for other, edge_cost in self._inter_edges(node)]
+            if cluster == goal_cluster and node in goal_distances:
+                out.append((goal, goal_distances[node], "goal"))
+            return out
+
+        best: Dict[Tuple[int, int], int] = {start: 0}
+        parents: Dict[Tuple[int, int], Tuple[Tuple[int, int], str]] = {}
+        pq: List[Tuple[int, int, Tuple[int, int]]] = [(heuristic(start), 0, start)]
+        closed = set()
+        while pq:
+            _, distance, node = heapq.heappop(pq)
+            if node in closed:
+                continue
+            closed.add(node)
+            if node == goal:
+                break
+            for other, edge_cost, kind in edges_from(node):
+                candidate = distance + edge_cost
+                if other not in best or candidate < best[other]:
+                    best[other] = candidate
+                    parents[other] = (node, kind)
+                    heapq.heappush(pq, (candidate + heuristic(other), candidate, other))
+
+        if goal not in closed:
+            return self._flat_search(start, goal) or (None, [])
+        return best[goal], self._refine(goal, parents, start_paths, goal_next_steps)
+
+    def _flat_search(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Optional[Tuple[Optional[int], List[Tuple[int, int]]]]:
+        """ the exact search over the whole grid, None when the grid size is unknown"""
+        if self.grid_size is None:
+            return None
+        width, height = self.grid_size()
+        distances, paths = dijkstra(start, self.is_walkable, width, height, diagonal=True, cost=self.cost, goal=goal)
+        if goal not in distances:
+            return None, []
+        return distances[goal], paths[goal]
+
+    def _refine(self, goal: Tuple[int, int], parents: Dict[Tuple[int, int], Tuple[Tuple[int, int], str]],
+                start_paths: Dict[Tuple[int, int], List[Tuple[int, int]]],
+                goal_next_steps: Dict[Tuple[int, int], Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """ expand the abstract route into grid cells"""
+        segments = []
+        node = goal
+        while node in parents:
+            previous, kind = parents[node]
+            if kind == "start":
+                segment = start_paths[node]
+            elif kind == "intra":
+                segment = self._get_intra_edges(self.cluster_of(previous))[previous][node][1]
+            elif kind == "inter":
+                segment = [previous, node]
+            else:
+                segment = [previous]
+                while segment[-1] in goal_next_steps:
+                    segment.append(goal_next_steps[segment[-1]])
+            segments.append(segment)
+            node = previous
+        path: List[Tuple[int, int]] = []
+        for segment in reversed(segments):
+            path += segment[1:] if path else segment
+        return path
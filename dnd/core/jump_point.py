@@ -0,0 +1,184 @@
+import heapq
+from typing import Dict, Tuple, List, Optional, Callable
+
+from dnd.core import metrics
+from dnd.core.dijkstra import PATHFINDING_SECONDS
+
+DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def _sign(value: int) -> int:
+    return (value > 0) - (value < 0)
+
+
+class JumpPointSearch:
+    """
+    Jump point search (Harabor & Grastien) between two cells, with diagonal moves allowed as in `dijkstra`.
+
+    On uniform cost floor the search jumps along straight and diagonal lines and only stops at cells
+    where a shortest path may turn, so long open distances cost a few heap operations instead of one
+    per cell. A cell that has difficult terrain around it is not plain: jumps stop on it and it is
+    expanded like a regular weighted search, so mixed maps keep exact costs.
+
+    Moving onto a cell costs its movement cost plus a small epsilon for diagonal moves, the same
+    scheme as `dijkstra`, and the returned cost is the same optimal cost.
+    """
+
+    def __init__(
+        self,
+        is_walkable: Callable[[int, int], bool],
+        cost: Optional[Callable[[int, int], int]] = None,
+        epsilon: float = 0.001
+    ):
+        self.is_walkable = is_walkable
+        self.cost = cost
+        self.epsilon = epsilon
+        self._plain: Dict[Tuple[int, int], bool] = {}
+        self.expanded = 0
+
+    def _step_cost(self, x: int, y: int) -> int:
+        return self.cost(x, y) if self.cost else 1
+
+    def _is_plain(self, x: int, y: int) -> bool:
+        """ a walkable unit cost cell whose walkable neighbors all have unit cost"""
+        plain = self._plain.get((x, y))
+        if plain is None:
+            plain = self._step_cost(x, y) == 1 and all(
+                not self.is_walkable(x + dx, y + dy) or self._step_cost(x + dx, y + dy) == 1
+                for dx, dy in DIRECTIONS
+            )
+            self._plain[(x, y)] = plain
+        return plain
+
+    def _successor_directions(self, x: int, y: int, dx: int, dy: int) -> List[Tuple[int, int]]:
+        """ natural and forced neighbor directions of a plain cell reached moving along (dx, dy)"""
+        walkable = self.is_walkable
+        directions = []
+        if dx != 0 and dy != 0:
+            directions += [(dx, dy), (dx, 0), (0, dy)]
+            if not walkable(x - dx, y) and walkable(x - dx, y + dy):
+                directions.append((-dx, dy))
+            if not walkable(x, y - dy) and walkable(x + dx, y - dy):
+                directions.append((dx, -dy))
+        elif dx != 0:
+            directions.append((dx, 0))
+            for side in (1, -1):
+                if not walkable(x, y + side) and walkable(x + dx, y + side):
+                    directions.append((dx, side))
+        else:
+            directions.append((0, dy))
+            for side in (1, -1):
+                if not walkable(x + side, y) and walkable(x + side, y + dy):
+                    directions.append((side, dy))
+        return directions
+
+    def _has_forced(self, x: int, y: int, dx: int, dy: int) -> bool:
+        walkable = self.is_walkable
+        if dx != 0 and dy != 0:
+            return (not walkable(x - dx, y) and walkable(x - dx, y + dy)) or \
+                   (not walkable(x, y - dy) and walkable(x + dx, y - dy))
+        if dx != 0:
+            return any(not walkable(x, y + side) and walkable(x + dx, y + side) for side in (1, -1))
+        return any(not walkable(x + side, y) and walkable(x + side, y + dy) for side in (1, -1))
+
+    def _jump(self, x: int, y: int, dx: int, dy: int, goal: Tuple[int, int]) -> Optional[Tuple[Tuple[int, int], float, int]]:
+        """
+        Move from (x, y) along (dx, dy) until a jump point.
+
+        Returns:
+            (jump point, cost with epsilons, true cost) or None if the line runs into a blocked cell
+        """
+        step = 1 + (self.epsilon if dx != 0 and dy != 0 else 0)
+        distance = 0.0
+        true_distance = 0
+        while True:
+            x, y = x + dx, y + dy
+            if not self.is_walkable(x, y):
+                return None
+            move_cost = self._step_cost(x, y)
+            distance += step + move_cost - 1
+            true_distance += move_cost
+            if (x, y) == goal or not self._is_plain(x, y) or self._has_forced(x, y, dx, dy):
+                return (x, y), distance, true_distance
+            if dx != 0 and dy != 0:
+                if self._jump(x, y, dx, 0, goal) is not None or self._jump(x, y, 0, dy, goal) is not None:
+                    return (x, y), distance, true_distance
+
+    def find_path(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Tuple[Optional[int], List[Tuple[int, int]]]:
+        """
+        Returns:
+            Tuple of (cost, path) where the path includes both ends as `dijkstra` paths do,
+            or (None, []) if the goal cannot be reached
+        """
+        started = metrics.clock() if metrics.enabled else None
+        result = self._search(start, goal)
+        if started is not None:
+            PATHFINDING_SECONDS.labels("jump_point").observe(metrics.clock() - started)
+        return result
+
+    def _search(self, start: Tuple[int, int], goal: Tuple[int, int]) -> Tuple[Optional[int], List[Tuple[int, int]]]:
+        if start == goal:
+            return 0, [start]
+        if not self.is_walkable(*goal):
+            return None, []
+
+        def heuristic(position: Tuple[int, int]) -> int:
+            return max(abs(position[0] - goal[0]), abs(position[1] - goal[1]))
+
+        best: Dict[Tuple[int, int], float] = {start: 0.0}
+        true_costs: Dict[Tuple[int, int], int] = {start: 0}
+        parents: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        pq: List[Tuple[float, float, Tuple[int, int]]] = [(heuristic(start), 0.0, start)]
+        closed = set()
+        while pq:
+            _, distance, node = heapq.heappop(pq)
+            if node in closed:
+                continue
+            closed.add(node)
+            if node == goal:
+                return true_costs[goal], self._expand(goal, parents)
+            self.expanded += 1
+
+            x, y = node
+            parent = parents.get(node)
+            if parent is None or not self._is_plain(x, y):
+                directions = DIRECTIONS
+            else:
+                directions = self._successor_directions(x, y, _sign(x - parent[0]), _sign(y - parent[1]))
+            for dx, dy in directions:
+                jump = self._jump(x, y, dx, dy, goal)
+                if jump is None:
+                    continue
+                point, jump_distance, jump_true_distance = jump
+                candidate = distance + jump_distance
+                if point not in closed and (point not in best or candidate < best[point]):
+                    best[point] = candidate
+                    true_costs[point] = true_costs[node] + jump_true_distance
+                    parents[point] = node
+                    heapq.heappush(pq, (candidate + heuristic(point), candidate, point))
+        return None, []
+
+    def _expand(self, goal: Tuple[int, int], parents: Dict[Tuple[int, int], Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """ turn the chain of jump points into the list of every cell crossed"""
+        path = [goal]
+        node = goal
+        while node in parents:
+            parent = parents[node]
+            dx, dy = _sign(parent[0] - node[0]), _sign(parent[1] - node[1])
+            x, y = node
+            while (x, y) != parent:
+                x, y = x + dx, y + dy
+                path.append((x, y))
+            node = parent
+        path.reverse()
+        return path
+
+
+def jump_point_search(
+    start: Tuple[int, int],
+    goal: Tuple[int, int],
+    is_walkable: Callable[[int, int], bool],
+    cost: Optional[Callable[[int, int], int]] = None,
+    epsilon: float = 0.001
+) -> Tuple[Optional[int], List[Tuple[int, int]]]:
+    return JumpPointSearch(is_walkable, cost=cost, epsilon=epsilon).find_path(start, goal)
@@ -0,0 +1,53 @@
+from typing import Tuple, List, Callable
+
+Step = Tuple[Tuple[int, int], ...]
+
+
+def supercover_line(start: Tuple[int, int], end: Tuple[int, int]) -> List[Step]:
+    """
+    Cells crossed by the segment joining the centers of two cells (supercover Bresenham).
+
+    Every step holds the cell entered by the segment; when the segment passes exactly through a
+    corner the step holds the two cells touching that corner, followed by the diagonal cell.
+    Ties are resolved geometrically, so the line from end to start crosses the same cells.
+
+    Returns:
+        List of steps from the cell after start up to and including end
+    """
+    x, y = start
+    dx, dy = abs(end[0] - x), abs(end[1] - y)
+    sx = 1 if end[0] > x else -1
+    sy = 1 if end[1] > y else -1
+    ix = iy = 0
+    steps: List[Step] = []
+    while ix < dx or iy < dy:
+        # compares where the segment leaves the current cell, horizontally versus vertically
+        decision = (1 + 2 * ix) * dy - (1 + 2 * iy) * dx
+        if decision == 0:
+            steps.append(((x + sx, y), (x, y + sy)))
+            x += sx
+            y += sy
+            ix += 1
+            iy += 1
+        elif decision < 0:
+            x += sx
+            ix += 1
+        else:
+            y += sy
+            iy += 1
+        steps.append(((x, y),))
+    return steps
+
+
+def has_line_of_sight(start: Tuple[int, int], end: Tuple[int, int], is_blocking: Callable[[int, int], bool]) -> bool:
+    """
+    Whether no opaque cell lies strictly between two cells.
+
+    The end cell itself may be opaque so a wall can be targeted. A corner is only blocking when
+    both cells touching it are opaque, the same permissiveness as the shadowcasting FOV.
+    """
+    steps = supercover_line(start, end)
+    for step in steps[:-1]:
+        if all(is_blocking(*cell) for cell in step):
+            return False
+    return True
@@ -0,0 +1,256 @@
+import json
+import struct
+import zlib
+from typing import Dict, Tuple, List, Optional, Iterable
+
+import numpy as np
+
+from dnd.core.chunked_map import ChunkedTileStore, CellType
+
+# file layout: header | palette (json) | zlib compressed cells, one palette index per cell in row major order
+_MAGIC = b"DNDM"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHiiIII")  # magic, format version, x0, y0, width, height, palette length
+_RUN = np.dtype([("count", "<u2"), ("index", "u1")])
+_MAX_RUN = 65535
+
+DEFAULT_LEGEND: Dict[str, Optional[CellType]] = {
+    ".": CellType(name="Floor", sprite_name="floor.png"),
+    "#": CellType(name="Wall", sprite_name="wall.png", blocks_movement=True, blocks_vision=True),
+    "~": CellType(name="Water", sprite_name="water.png", blocks_movement=True),
+    " ": None,
+}
+
+
+class MapGrid:
+    """
+    A rectangular block of the map as a (height, width) array of palette indices, 0 for no tile,
+    with the palette of cell types (sprites included) the indices refer to.
+    Cell (x, y) is stored at cells[y - y0, x - x0].
+    """
+    __slots__ = ("cells", "palette", "x0", "y0")
+
+    def __init__(self, cells: np.ndarray, palette: List[CellType], x0: int = 0, y0: int = 0):
+        if len(palette) > 255:
+            raise ValueError("A map supports at most 255 cell types")
+        self.cells = np.ascontiguousarray(cells, dtype=np.uint8)
+        self.palette = palette
+        self.x0 = x0
+        self.y0 = y0
+
+    @property
+    def width(self) -> int:
+        return self.cells.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.cells.shape[0]
+
+    def get_cell(self, position: Tuple[int, int]) -> Optional[CellType]:
+        x, y = position[0] - self.x0, position[1] - self.y0
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        index = self.cells[y, x]
+        return self.palette[index - 1] if index else None
+
+    def to_store(self, chunk_size: int = 32, store: Optional[ChunkedTileStore] = None) -> ChunkedTileStore:
+        """
+        Write the grid into a chunked store one chunk at a time, without going through `set_cell`.
+        The palette indices are remapped to the palette of the store so an existing store can be filled,
+        and the store calls its `on_change` for every cell the grid changes, so the caches of a map the
+        store is attached to are invalidated as with single cell writes.
+        """
+        if store is None:
+            store = ChunkedTileStore(chunk_size=chunk_size)
+        if self.cells.size == 0:
+            return store
+        size = store.chunk_size
+        remap = np.zeros(256, dtype=np.uint8)
+        for index, cell_type in enumerate(self.palette, start=1):
+            remap[index] = store.get_palette_index(cell_type)
+        cells = remap[self.cells]
+
+        # pad the grid to whole chunks, chunk keys are aligned on multiples of the chunk size
+        cx0, cy0 = self.x0 // size, self.y0 // size
+        cx1, cy1 = (self.x0 + self.width - 1) // size, (self.y0 + self.height - 1) // size
+        padded = np.zeros(((cy1 - cy0 + 1) * size, (cx1 - cx0 + 1) * size), dtype=np.uint8)
+        covered = np.zeros(padded.shape, dtype=bool)
+        dx, dy = self.x0 - cx0 * size, self.y0 - cy0 * size
+        padded[dy:dy + self.height, dx:dx + self.width] = cells
+        covered[dy:dy + self.height, dx:dx + self.width] = True
+        existing_keys = set(store.chunk_keys())
+        for cy in range(cy1 - cy0 + 1):
+            for cx in range(cx1 - cx0 + 1):
+                rows, columns = slice(cy * size, (cy + 1) * size), slice(cx * size, (cx + 1) * size)
+                block = padded[rows, columns]
+                key = (cx0 + cx, cy0 + cy)
+                if key not in existing_keys:
+                    if block.any():
+                        store.set_chunk(key, block.tobytes())
+                    continue
+                if not covered[rows, columns].all():
+                    # cells of a partially covered chunk outside of the grid are kept
+                    existing = np.frombuffer(store._get_chunk(key), dtype=np.uint8).reshape(size, size)
+                    block = np.where(covered[rows, columns], block, existing)
+                store.set_chunk(key, block.tobytes())
+        return store
+
+    @classmethod
+    def from_cells(cls, cells: Iterable[Tuple[Tuple[int, int], CellType]]) -> 'MapGrid':
+        """ pack (position, cell type) pairs in the smallest grid containing them"""
+        cells = list(cells)
+        if not cells:
+            return cls(np.zeros((0, 0), dtype=np.uint8), [])
+        palette: List[CellType] = []
+        palette_index: Dict[CellType, int] = {}
+        points = np.empty((len(cells), 2), dtype=np.int64)
+        indices = np.empty(len(cells), dtype=np.uint8)
+        for i, (position, cell_type) in enumerate(cells):
+            index = palette_index.get(cell_type)
+            if index is None:
+                palette.append(cell_type)
+                index = palette_index[cell_type] = len(palette)
+            points[i] = position
+            indices[i] = index
+        low = points.min(axis=0)
+        high = points.max(axis=0)
+        grid = np.zeros((int(high[1] - low[1] + 1), int(high[0] - low[0] + 1)), dtype=np.uint8)
+        grid[points[:, 1] - low[1], points[:, 0] - low[0]] = indices
+        return cls(grid, palette, int(low[0]), int(low[1]))
+
+    @classmethod
+    def from_store(cls, store: ChunkedTileStore, region: Optional[Tuple[int, int, int, int]] = None) -> 'MapGrid':
+        """
+        Copy a chunked store chunk by chunk, keeping its palette. With an inclusive (x0, y0, x1, y1)
+        region only the chunks overlapping it are read and the grid covers exactly the region.
+        """
+        size = store.chunk_size
+        keys = store.chunk_keys()
+        if region is not None:
+            keys = [key for key in keys if region[0] // size <= key[0] <= region[2] // size and region[1] // size <= key[1] <= region[3] // size]
+        if not keys:
+            grid = cls(np.zeros((0, 0), dtype=np.uint8), list(store.palette))
+            return grid if region is None else grid.reframe(*region)
+        cx0, cy0 = min(key[0] for key in keys), min(key[1] for key in keys)
+        cx1, cy1 = max(key[0] for key in keys), max(key[1] for key in keys)
+        cells = np.zeros(((cy1 - cy0 + 1) * size, (cx1 - cx0 + 1) * size), dtype=np.uint8)
+        for key in keys:
+            chunk = store._get_chunk(key)
+            if chunk is None:
+                continue
+            y, x = (key[1] - cy0) * size, (key[0] - cx0) * size
+            cells[y:y + size, x:x + size] = np.frombuffer(chunk, dtype=np.uint8).reshape(size, size)
+        grid = cls(cells, list(store.palette), cx0 * size, cy0 * size)
+        if region is not None:
+            return grid.reframe(*region)
+        # trim the empty border left by the chunk alignment
+        rows = np.flatnonzero(cells.any(axis=1))
+        columns = np.flatnonzero(cells.any(axis=0))
+        if len(rows) == 0:
+            return cls(np.zeros((0, 0), dtype=np.uint8), list(store.palette))
+        return grid.reframe(grid.x0 + int(columns[0]), grid.y0 + int(rows[0]), grid.x0 + int(columns[-1]), grid.y0 + int(rows[-1]))
+
+    def reframe(self, x0: int, y0: int, x1: int, y1: int) -> 'MapGrid':
+        """ the grid over the inclusive (x0, y0, x1, y1) rectangle, cells outside of this grid are empty"""
+        cells = np.zeros((max(y1 - y0 + 1, 0), max(x1 - x0 + 1, 0)), dtype=np.uint8)
+        left, top = max(x0, self.x0), max(y0, self.y0)
+        right, bottom = min(x1 + 1, self.x0 + self.width), min(y1 + 1, self.y0 + self.height)
+        if left < right and top < bottom:
+            cells[top - y0:bottom - y0, left - x0:right - x0] = \
+                self.cells[top - self.y0:bottom - self.y0, left - self.x0:right - self.x0]
+        return MapGrid(cells, self.palette, x0, y0)
+
+    def compacted(self) -> 'MapGrid':
+        """ the same grid with the palette reduced to the cell types it uses, in palette order"""
+        used = np.unique(self.cells)
+        used = used[used > 0]
+        remap = np.zeros(256, dtype=np.uint8)
+        remap[used] = np.arange(1, len(used) + 1)
+        return MapGrid(remap[self.cells], [self.palette[index - 1] for index in used], self.x0, self.y0)
+
+    def run_lengths(self) -> bytes:
+        """
+        Encode the cells as row major runs, each run a little endian (count: uint16, index: uint8)
+        record of 3 bytes. Runs longer than 65535 cells are split.
+        """
+        flat = self.cells.ravel()
+        if flat.size == 0:
+            return b""
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(flat)) + 1))
+        lengths = np.diff(np.append(starts, flat.size))
+        pieces = (lengths + _MAX_RUN - 1) // _MAX_RUN
+        runs = np.zeros(int(pieces.sum()), dtype=_RUN)
+        runs["index"] = np.repeat(flat[starts], pieces)
+        runs["count"] = _MAX_RUN
+        runs["count"][np.cumsum(pieces) - 1] = lengths - _MAX_RUN * (pieces - 1)
+        return runs.tobytes()
+
+    @classmethod
+    def from_run_lengths(cls, data: bytes, palette: List[CellType], x0: int, y0: int, width: int, height: int) -> 'MapGrid':
+        """ decode the output of `run_lengths`"""
+        runs = np.frombuffer(data, dtype=_RUN)
+        cells = np.repeat(runs["index"], runs["count"].astype(np.int64))
+        if len(cells) != width * height:
+            raise ValueError(f"The runs hold {len(cells)} cells, expected {width}x{height}")
+        return cls(cells.reshape(height, width), palette, x0, y0)
+
+    def to_bytes(self) -> bytes:
+        palette = json.dumps([cell_type.model_dump() for cell_type in self.palette]).encode()
+        header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, self.x0, self.y0, self.width, self.height, len(palette))
+        return header + palette + zlib.compress(self.cells.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'MapGrid':
+        if len(data) < _HEADER.size:
+            raise ValueError("Not a map file, the header is truncated")
+        magic, version, x0, y0, width, height, palette_length = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError("Not a map file or an unsupported format version")
+        offset = _HEADER.size
+        palette = [CellType(**cell_type) for cell_type in json.loads(data[offset:offset + palette_length])]
+        cells = np.frombuffer(zlib.decompress(data[offset + palette_length:]), dtype=np.uint8)
+        if len(cells) != width * height:
+            raise ValueError(f"The map declares {width}x{height} cells but holds {len(cells)}")
+        if len(cells) and cells.max() > len(palette):
+            raise ValueError("The map refers to a cell type missing from its palette")
+        return cls(cells.reshape(height, width), palette, x0, y0)
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'MapGrid':
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+    @classmethod
+    def from_ascii(cls, text: str, legend: Optional[Dict[str, Optional[CellType]]] = None, x0: int = 0, y0: int = 0) -> 'MapGrid':
+        """
+        Parse an ASCII map, one character per cell and one line per row, the first line being y0.
+        Shorter lines are padded with empty cells.
+
+        Args:
+            text: The map
+            legend: Cell type of each character, None for no tile, defaults to `DEFAULT_LEGEND`
+        """
+        legend = DEFAULT_LEGEND if legend is None else legend
+        palette: List[CellType] = []
+        table: Dict[str, int] = {}
+        for char, cell_type in legend.items():
+            if len(char) != 1:
+                raise ValueError(f"Legend keys must be single characters, got {char!r}")
+            if cell_type is not None and cell_type not in palette:
+                palette.append(cell_type)
+            table[char] = palette.index(cell_type) + 1 if cell_type is not None else 0
+        lines = text.split("\n")
+        while lines and not lines[-1].strip():
+            lines.pop()
+        width = max((len(line) for line in lines), default=0)
+        cells = np.zeros((len(lines), width), dtype=np.uint8)
+        for y, line in enumerate(lines):
+            try:
+                cells[y, :len(line)] = [table[char] for char in line]
+            except KeyError as error:
+                raise ValueError(f"Character {error.args[0]!r} on line {y0 + y} is missing from the legend") from None
+        return cls(cells, palette, x0, y0)
@@ -0,0 +1,225 @@
+"""
+In process metrics of the engine: counters, gauges and histograms rendered in the Prometheus text format.
+
+The hot paths guard their updates with `if metrics.enabled:`, so with metrics disabled, the default,
+instrumentation costs a single attribute check. Gauges computed by a function, e.g. registry sizes,
+are only evaluated when the metrics are rendered. Set `DND_METRICS=1` or call `enable()` to collect.
+"""
+import abc
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+enabled = os.environ.get("DND_METRICS", "").lower() in ("1", "true", "yes", "on")
+
+clock = time.perf_counter
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def enable() -> None:
+    global enabled
+    enabled = True
+
+
+def disable() -> None:
+    global enabled
+    enabled = False
+
+
+class _Metric(abc.ABC):
+    """ a metric, or with label names the family of its labelled children"""
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), labelvalues: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.labelvalues = tuple(labelvalues)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> "_Metric":
+        """ the child of these label values, created on first use"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects the labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._make_child(values)
+        return child
+
+    def _make_child(self, values: Tuple[str, ...]) -> "_Metric":
+        return type(self)(self.name, self.documentation, labelvalues=values)
+
+    def samples(self) -> List[Sample]:
+        if self.labelnames:
+            return [sample for child in list(self._children.values()) for sample in child._own_samples(dict(zip(self.labelnames, child.labelvalues)))]
+        return self._own_samples({})
+
+    @abc.abstractmethod
+    def _own_samples(self, labels: Dict[str, str]) -> List[Sample]:
+        """ the samples of this metric alone, with the given labels"""
+
+    def reset(self) -> None:
+        for child in list(self._children.values()):
+            child.reset()
+
+
+class Counter(_Metric):
+    """ a value that only goes up, e.g. calls, rates are derived by the scraper"""
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def _own_samples(self, labels: Dict[str, str]) -> List[Sample]:
+        return [(self.name, labels, self.value)]
+
+    def reset(self) -> None:
+        super().reset()
+        with self._lock:
+            self.value = 0.0
+
+
+class Gauge(_Metric):
+    """ a value that goes up and down, set directly or computed by `function` when rendered"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), labelvalues: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames, labelvalues)
+        self.function = function
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def _own_samples(self, labels: Dict[str, str]) -> List[Sample]:
+        return [(self.name, labels, float(self.function()) if self.function is not None else self.value)]
+
+    def reset(self) -> None:
+        super().reset()
+        self.value = 0.0
+
+
+class Histogram(_Metric):
+    """ observations counted in buckets of upper bounds, e.g. durations in seconds"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), labelvalues: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, labelvalues)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def _make_child(self, values: Tuple[str, ...]) -> "Histogram":
+        return Histogram(self.name, self.documentation, labelvalues=values, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def _own_samples(self, labels: Dict[str, str]) -> List[Sample]:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        samples.append((f"{self.name}_sum", labels, total))
+        samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+    def reset(self) -> None:
+        super().reset()
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.sum = 0.0
+
+
+Metric = Union[Counter, Gauge, Histogram]
+
+REGISTRY: Dict[str, Metric] = {}
+
+
+def _register(metric: Metric) -> Metric:
+    existing = REGISTRY.get(metric.name)
+    if existing is not None:
+        if type(existing) is not type(metric):
+            raise ValueError(f"The metric {metric.name} is already registered as a {existing.type_name}")
+        return existing
+    REGISTRY[metric.name] = metric
+    return metric
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], float]] = None) -> Gauge:
+    return _register(Gauge(name, documentation, labelnames, function=function))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, documentation, labelnames, buckets=buckets))
+
+
+def reset() -> None:
+    """ zero every collected value, the registered metrics stay"""
+    for metric in REGISTRY.values():
+        metric.reset()
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus() -> str:
+    """ every registered metric in the Prometheus text exposition format, version 0.0.4"""
+    lines = []
+    for metric in REGISTRY.values():
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        for name, labels, value in metric.samples():
+            if labels:
+                rendered = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+                lines.append(f"{name}{{{rendered}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -1,6 +1,10 @@
 import math
 from fractions import Fraction
-from typing import Tuple, Callable, Optional, Iterator, Union
+from typing import Dict, List, Set, Tuple, Callable, Optional, Iterator, Union
+
+from dnd.core import metrics
+
+FOV_SECONDS = metrics.histogram("dnd_fov_seconds", "Duration of the field of view computations")
 
 def compute_fov(
     origin: Tuple[int, int],
@@ -8,6 +12,7 @@ def compute_fov(
     mark_visible: Callable[[int, int], None],
     max_distance: Optional[float] = None
 ) -> None:
+    started = metrics.clock() if metrics.enabled else None
     ox, oy = origin
     mark_visible(ox, oy)
 
@@ -32,7 +37,83 @@ def compute_fov(
             return not is_blocking(x, y)
 
         first_row = Row(1, Fraction(-1), Fraction(1))
-        scan_iterative(first_row, reveal, is_wall, is_floor)
+        scan_iterative(first_row, reveal, is_wall, is_floor, _max_depth(max_distance))
+    if started is not None:
+        FOV_SECONDS.observe(metrics.clock() - started)
+
+
+def _max_depth(max_distance: Optional[float]) -> Optional[int]:
+    # every cell of a row is at least its depth away from the origin, deeper rows reveal nothing
+    return None if max_distance is None else math.floor(max_distance)
+
+
+QuadrantScan = Tuple[List[Tuple[int, int]], Dict[Tuple[int, int], bool]]
+
+
+def scan_quadrant(cardinal: int, is_blocking: Callable[[int, int], bool], max_distance: Optional[float] = None) -> QuadrantScan:
+    """
+    Shadowcast one quadrant around the origin (0, 0).
+
+    Returns:
+        Tuple of (revealed offsets, opacity of every offset read by the scan). The scan only depends on
+        these reads, so from any origin where they give the same answers it reveals the same offsets.
+    """
+    quadrant = Quadrant(cardinal, (0, 0))
+    revealed: List[Tuple[int, int]] = []
+    reads: Dict[Tuple[int, int], bool] = {}
+
+    def blocking(tile: Tuple[int, int]) -> bool:
+        offset = quadrant.transform(tile)
+        value = reads.get(offset)
+        if value is None:
+            value = reads[offset] = is_blocking(*offset)
+        return value
+
+    def reveal(tile: Tuple[int, int]) -> None:
+        x, y = quadrant.transform(tile)
+        if max_distance is None or math.sqrt(x * x + y * y) <= max_distance:
+            revealed.append((x, y))
+
+    def is_wall(tile: Optional[Tuple[int, int]]) -> bool:
+        return tile is not None and blocking(tile)
+
+    def is_floor(tile: Optional[Tuple[int, int]]) -> bool:
+        return tile is not None and not blocking(tile)
+
+    scan_iterative(Row(1, Fraction(-1), Fraction(1)), reveal, is_wall, is_floor, _max_depth(max_distance))
+    return revealed, reads
+
+
+def compute_fov_along_path(
+    path: List[Tuple[int, int]],
+    is_blocking: Callable[[int, int], bool],
+    max_distance: Optional[float] = None
+) -> List[Set[Tuple[int, int]]]:
+    """
+    The field of view from every position of a path, the same sets as `compute_fov` gives.
+
+    Each quadrant scan of the previous position is kept with the opacity it read. When every one of
+    those reads gives the same answer relative to the next position, e.g. in open ground or along a
+    straight wall, the quadrant reveals the same offsets and is reused instead of scanned again.
+    """
+    fields: List[Set[Tuple[int, int]]] = []
+    previous: List[Optional[QuadrantScan]] = [None] * 4
+    for ox, oy in path:
+        started = metrics.clock() if metrics.enabled else None
+
+        def relative_blocking(dx: int, dy: int) -> bool:
+            return is_blocking(ox + dx, oy + dy)
+
+        visible = {(ox, oy)}
+        for cardinal in range(4):
+            scan = previous[cardinal]
+            if scan is None or any(relative_blocking(dx, dy) != value for (dx, dy), value in scan[1].items()):
+                scan = previous[cardinal] = scan_quadrant(cardinal, relative_blocking, max_distance)
+            visible.update((ox + dx, oy + dy) for dx, dy in scan[0])
+        fields.append(visible)
+        if started is not None:
+            FOV_SECONDS.observe(metrics.clock() - started)
+    return fields
 
 class Quadrant:
     north = 0
@@ -92,11 +173,14 @@ def scan_iterative(
     row: Row,
     reveal: Callable[[Tuple[int, int]], None],
     is_wall: Callable[[Optional[Tuple[int, int]]], bool],
-    is_floor: Callable[[Optional[Tuple[int, int]]], bool]
+    is_floor: Callable[[Optional[Tuple[int, int]]], bool],
+    max_depth: Optional[int] = None
 ) -> None:
     rows = [row]
     while rows:
         row = rows.pop()
+        if max_depth is not None and row.depth > max_depth:
+            continue
         prev_tile: Optional[Tuple[int, int]] = None
         for tile in row.tiles():
             if is_wall(tile) or is_symmetric(row, tile):
@@ -0,0 +1,78 @@
+from collections import defaultdict
+from typing import Dict, Tuple, List, Set, DefaultDict, ClassVar, Optional, Iterable, FrozenSet, Any
+from uuid import UUID
+
+
+class ThreatMap:
+    """
+    Static index of which entities threaten each cell of the grid.
+
+    Entities publish the cells they threaten whenever their senses are refreshed, they move or they are
+    registered, and `Entity.remove_entity` withdraws them, so the index follows their movements and the
+    changes of what they can see and reach. A movement can then find every
+    entity able to make an opportunity attack by looking up the cells of its path, instead of asking
+    each entity to rebuild its own threatened area.
+    """
+    _threats_by_position: ClassVar[DefaultDict[Tuple[int, int], Set[UUID]]] = defaultdict(set)
+    _positions_by_entity: ClassVar[Dict[UUID, FrozenSet[Tuple[int, int]]]] = {}
+    _version: ClassVar[int] = 0
+    _last_query: ClassVar[Optional[Tuple[Any, FrozenSet[UUID]]]] = None
+
+    @classmethod
+    def set_threats(cls, entity_uuid: UUID, positions: Iterable[Tuple[int, int]]) -> None:
+        """ replace the cells threatened by an entity"""
+        new_positions = frozenset(positions)
+        old_positions = cls._positions_by_entity.get(entity_uuid, frozenset())
+        if new_positions == old_positions:
+            return
+        for position in old_positions - new_positions:
+            threats = cls._threats_by_position[position]
+            threats.discard(entity_uuid)
+            if not threats:
+                del cls._threats_by_position[position]
+        for position in new_positions - old_positions:
+            cls._threats_by_position[position].add(entity_uuid)
+        cls._positions_by_entity[entity_uuid] = new_positions
+        cls._version += 1
+
+    @classmethod
+    def remove_entity(cls, entity_uuid: UUID) -> None:
+        cls.set_threats(entity_uuid, ())
+        cls._positions_by_entity.pop(entity_uuid, None)
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._threats_by_position.clear()
+        cls._positions_by_entity.clear()
+        cls._last_query = None
+        cls._version += 1
+
+    @classmethod
+    def get_threatening_entities(cls, position: Tuple[int, int]) -> Set[UUID]:
+        """ the entities threatening a cell"""
+        return set(cls._threats_by_position.get(position, ()))
+
+    @classmethod
+    def get_threatened_positions(cls, entity_uuid: UUID) -> FrozenSet[Tuple[int, int]]:
+        return cls._positions_by_entity.get(entity_uuid, frozenset())
+
+    @classmethod
+    def get_opportunity_attackers(cls, mover_uuid: UUID, start_position: Tuple[int, int], path: List[Tuple[int, int]]) -> FrozenSet[UUID]:
+        """
+        The entities that threaten the start of a movement and that the path leaves the reach of.
+
+        The result of the last query is kept, so the opportunity attack handlers of every entity
+        reacting to the same movement share a single lookup.
+        """
+        key = (mover_uuid, start_position, tuple(path), cls._version)
+        if cls._last_query is not None and cls._last_query[0] == key:
+            return cls._last_query[1]
+        attackers = set()
+        for attacker_uuid in cls._threats_by_position.get(start_position, ()):
+            if attacker_uuid == mover_uuid:
+                continue
+            if any(attacker_uuid not in cls._threats_by_position.get(position, ()) for position in path):
+                attackers.add(attacker_uuid)
+        result = frozenset(attackers)
+        cls._last_query = (key, result)
+        return result
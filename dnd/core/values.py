@@ -4,6 +4,8 @@ import uuid
 from uuid import UUID, uuid4
 from enum import Enum
 from dnd.core.base_object import BaseObject
+from dnd.core.change_tracker import ChangeTracker
+from dnd.core import metrics
 from dnd.core.modifiers import (
     
     naming_callable,
@@ -190,6 +192,11 @@ class BaseValue(BaseObject):
         dfs(self)
         return chain
 
+    def _mark_changed(self) -> None:
+        """ stamp the owning entity and block in the change tracker after a modifier change"""
+        if self.__class__._registry.get(self.uuid) is self:
+            ChangeTracker.mark_owned(self.uuid)
+
     
 
 class StaticValue(BaseValue):
@@ -334,6 +341,7 @@ class StaticValue(BaseValue):
             UUID: The UUID of the added modifier.
         """
         self.value_modifiers[modifier.uuid] = modifier
+        self._mark_changed()
         return modifier.uuid
     
     def remove_value_modifier(self, uuid: UUID) -> None:
@@ -344,6 +352,7 @@ class StaticValue(BaseValue):
             uuid (UUID): The UUID of the modifier to remove.
         """
         self.value_modifiers.pop(uuid, None)
+        self._mark_changed()
 
     def add_min_constraint(self, constraint: NumericalModifier) -> UUID:
         """
@@ -356,6 +365,7 @@ class StaticValue(BaseValue):
             UUID: The UUID of the added constraint.
         """
         self.min_constraints[constraint.uuid] = constraint
+        self._mark_changed()
         return constraint.uuid
     
     def remove_min_constraint(self, uuid: UUID) -> None:
@@ -366,6 +376,7 @@ class StaticValue(BaseValue):
             uuid (UUID): The UUID of the constraint to remove.
         """
         self.min_constraints.pop(uuid, None)
+        self._mark_changed()
 
     def add_max_constraint(self, constraint: NumericalModifier) -> UUID:
         """
@@ -378,6 +389,7 @@ class StaticValue(BaseValue):
             UUID: The UUID of the added constraint.
         """
         self.max_constraints[constraint.uuid] = constraint
+        self._mark_changed()
         return constraint.uuid
     
     def remove_max_constraint(self, uuid: UUID) -> None:
@@ -388,6 +400,7 @@ class StaticValue(BaseValue):
             uuid (UUID): The UUID of the constraint to remove.
         """
         self.max_constraints.pop(uuid, None)
+        self._mark_changed()
     
     def add_advantage_modifier(self, modifier: AdvantageModifier) -> UUID:
         """
@@ -400,6 +413,7 @@ class StaticValue(BaseValue):
             UUID: The UUID of the added modifier.
         """
         self.advantage_modifiers[modifier.uuid] = modifier
+        self._mark_changed()
         return modifier.uuid
     
     def remove_advantage_modifier(self, uuid: UUID) -> None:
@@ -410,6 +424,7 @@ class StaticValue(BaseValue):
             uuid (UUID): The UUID of the modifier to remove.
         """
         self.advantage_modifiers.pop(uuid, None)
+        self._mark_changed()
     
     def add_critical_modifier(self, modifier: CriticalModifier) -> UUID:
         """
@@ -422,6 +437,7 @@ class StaticValue(BaseValue):
             UUID: The UUID of the added modifier.
         """
         self.critical_modifiers[modifier.uuid] = modifier
+        self._mark_changed()
         return modifier.uuid
     
     def remove_critical_modifier(self, uuid: UUID) -> None:
@@ -432,6 +448,7 @@ class StaticValue(BaseValue):
             uuid (UUID): The UUID of the modifier to remove.
         """
         self.critical_modifiers.pop(uuid, None)
+        self._mark_changed()
     
     def add_auto_hit_modifier(self, modifier: AutoHitModifier) -> UUID:
         """
@@ -444,6 +461,7 @@ class StaticValue(BaseValue):
             UUID: The UUID of the added modifier.
         """
         self.auto_hit_modifiers[modifier.uuid] = modifier
+        self._mark_changed()
         return modifier.uuid
     
     def remove_auto_hit_modifier(self, uuid: UUID) -> None:
@@ -454,6 +472,7 @@ class StaticValue(BaseValue):
             uuid (UUID): The UUID of the modifier to remove.
         """
         self.auto_hit_modifiers.pop(uuid, None)
+        self._mark_changed()
 
     def add_size_modifier(self, modifier: SizeModifier) -> UUID:
         """
@@ -466,6 +485,7 @@ class StaticValue(BaseValue):
             UUID: The UUID of the added modifier.
         """
         self.size_modifiers[modifier.uuid] = modifier
+        self._mark_changed()
         return modifier.uuid
     
     def remove_size_modifier(self, uuid: UUID) -> None:
@@ -476,6 +496,7 @@ class StaticValue(BaseValue):
             uuid (UUID): The UUID of the modifier to remove.
         """
         self.size_modifiers.pop(uuid, None)
+        self._mark_changed()
 
     def add_damage_type_modifier(self, modifier: DamageTypeModifier) -> UUID:
         """
@@ -488,6 +509,7 @@ class StaticValue(BaseValue):
             UUID: The UUID of the added modifier.
         """
         self.damage_type_modifiers[modifier.uuid] = modifier
+        self._mark_changed()
         return modifier.uuid
     
     def remove_damage_type_modifier(self, uuid: UUID) -> None:
@@ -498,6 +520,7 @@ class StaticValue(BaseValue):
             uuid (UUID): The UUID of the modifier to remove.
         """
         self.damage_type_modifiers.pop(uuid, None)
+        self._mark_changed()
 
     def add_resistance_modifier(self, modifier: ResistanceModifier) -> UUID:
         """
@@ -510,6 +533,7 @@ class StaticValue(BaseValue):
             UUID: The UUID of the added modifier.
         """
         self.resistance_modifiers[modifier.uuid] = modifier
+        self._mark_changed()
         return modifier.uuid
     
     def remove_resistance_modifier(self, uuid: UUID) -> None:
@@ -520,6 +544,7 @@ class StaticValue(BaseValue):
             uuid (UUID): The UUID of the modifier to remove.
         """
         self.resistance_modifiers.pop(uuid, None)
+        self._mark_changed()
 
     def remove_modifier(self, uuid: UUID) -> None:
         """
@@ -821,6 +846,7 @@ class StaticValue(BaseValue):
         self.size_modifiers.clear()
         self.damage_type_modifiers.clear()
         self.resistance_modifiers.clear()
+        self._mark_changed()
 
     def _set_normalizer_recursive(self, normalizer: Callable[[int], int]) -> None:
         """
@@ -1281,6 +1307,7 @@ class ContextualValue(BaseValue):
         """
         uuid = modifier.uuid
         self.value_modifiers[uuid] = modifier
+        self._mark_changed()
         return uuid
     
     def remove_value_modifier(self, uuid: UUID) -> None:
@@ -1292,6 +1319,7 @@ class ContextualValue(BaseValue):
         """
         if uuid in self.value_modifiers:
             del self.value_modifiers[uuid]
+        self._mark_changed()
 
     def add_min_constraint(self, constraint: ContextualNumericalModifier) -> UUID:
         """
@@ -1305,6 +1333,7 @@ class ContextualValue(BaseValue):
         """
         uuid = constraint.uuid
         self.min_constraints[uuid] = constraint
+        self._mark_changed()
         return uuid
     
     def remove_min_constraint(self, uuid: UUID) -> None:
@@ -1314,9 +1343,9 @@ class ContextualValue(BaseValue):
         Args:
             uuid (UUID): The UUID of the constraint to remove.
         """
-
         if uuid in self.min_constraints:
             del self.min_constraints[uuid]
+        self._mark_changed()
 
     def add_max_constraint(self, constraint: ContextualNumericalModifier) -> UUID:
         """
@@ -1330,6 +1359,7 @@ class ContextualValue(BaseValue):
         """
         uuid = constraint.uuid
         self.max_constraints[uuid] = constraint
+        self._mark_changed()
         return uuid
     
     def remove_max_constraint(self, uuid: UUID) -> None:
@@ -1341,6 +1371,7 @@ class ContextualValue(BaseValue):
         """
         if uuid in self.max_constraints:
             del self.max_constraints[uuid]
+        self._mark_changed()
     
     def add_advantage_modifier(self, modifier: ContextualAdvantageModifier) -> UUID:
         """
@@ -1354,6 +1385,7 @@ class ContextualValue(BaseValue):
         """
         uuid = modifier.uuid
         self.advantage_modifiers[uuid] = modifier
+        self._mark_changed()
         return uuid
     
     def remove_advantage_modifier(self, uuid: UUID) -> None:
@@ -1365,6 +1397,7 @@ class ContextualValue(BaseValue):
         """
         if uuid in self.advantage_modifiers:
             del self.advantage_modifiers[uuid]
+        self._mark_changed()
     
     def add_critical_modifier(self, modifier: ContextualCriticalModifier) -> UUID:
         """
@@ -1378,6 +1411,7 @@ class ContextualValue(BaseValue):
         """
         uuid = modifier.uuid
         self.critical_modifiers[uuid] = modifier
+        self._mark_changed()
         return uuid
     
     def remove_critical_modifier(self, uuid: UUID) -> None:
@@ -1389,6 +1423,7 @@ class ContextualValue(BaseValue):
         """
         if uuid in self.critical_modifiers:
             del self.critical_modifiers[uuid]
+        self._mark_changed()
     
     def add_auto_hit_modifier(self, modifier: ContextualAutoHitModifier) -> UUID:
         """
@@ -1402,6 +1437,7 @@ class ContextualValue(BaseValue):
         """
         uuid = modifier.uuid
         self.auto_hit_modifiers[uuid] = modifier
+        self._mark_changed()
         return uuid
     
     def remove_auto_hit_modifier(self, uuid: UUID) -> None:
@@ -1413,6 +1449,7 @@ class ContextualValue(BaseValue):
         """
         if uuid in self.auto_hit_modifiers:
             del self.auto_hit_modifiers[uuid]
+        self._mark_changed()
 
     def add_size_modifier(self, modifier: ContextualSizeModifier) -> UUID:
         """
@@ -1425,6 +1462,7 @@ class ContextualValue(BaseValue):
             UUID: The UUID of the added modifier.
         """
         self.size_modifiers[modifier.uuid] = modifier
+        self._mark_changed()
         return modifier.uuid
     
     def remove_size_modifier(self, uuid: UUID) -> None:
@@ -1436,6 +1474,7 @@ class ContextualValue(BaseValue):
         """
         if uuid in self.size_modifiers:
             del self.size_modifiers[uuid]
+        self._mark_changed()
 
     def add_damage_type_modifier(self, modifier: ContextualDamageTypeModifier) -> UUID:
         """
@@ -1448,6 +1487,7 @@ class ContextualValue(BaseValue):
             UUID: The UUID of the added modifier.
         """
         self.damage_type_modifiers[modifier.uuid] = modifier
+        self._mark_changed()
         return modifier.uuid
     
     def remove_damage_type_modifier(self, uuid: UUID) -> None:
@@ -1459,6 +1499,7 @@ class ContextualValue(BaseValue):
         """
         if uuid in self.damage_type_modifiers:
             del self.damage_type_modifiers[uuid]
+        self._mark_changed()
 
     def add_resistance_modifier(self, modifier: ContextualResistanceModifier) -> UUID:
         """
@@ -1471,6 +1512,7 @@ class ContextualValue(BaseValue):
             UUID: The UUID of the added modifier.
         """
         self.resistance_modifiers[modifier.uuid] = modifier
+        self._mark_changed()
         return modifier.uuid
     
     def remove_resistance_modifier(self, uuid: UUID) -> None:
@@ -1482,6 +1524,7 @@ class ContextualValue(BaseValue):
         """
         if uuid in self.resistance_modifiers:
             del self.resistance_modifiers[uuid]
+        self._mark_changed()
 
     def remove_modifier(self, uuid: UUID) -> None:
         """
@@ -1575,6 +1618,7 @@ class ContextualValue(BaseValue):
         self.size_modifiers.clear()
         self.damage_type_modifiers.clear()
         self.resistance_modifiers.clear()
+        self._mark_changed()
 
     def _set_normalizer_recursive(self, normalizer: Callable[[int], int]) -> None:
         """
@@ -1604,6 +1648,8 @@ class ContextualValue(BaseValue):
             self._set_normalizer_recursive(self.score_normalizer)
         return self
 
+VALUE_EVALUATIONS = metrics.counter("dnd_value_evaluations_total", "Scores computed by modifiable values")
+
 class ModifiableValue(BaseValue):
     """
     A comprehensive value type that combines static and contextual modifiers for both self and target entities.
@@ -1744,6 +1790,11 @@ class ModifiableValue(BaseValue):
         modifiers = [self.self_static, self.self_contextual, self.from_target_contextual, self.from_target_static]
         return [modifier for modifier in modifiers if modifier is not None]
 
+    def register_change_owner(self, entity_uuid: UUID, block_name: Optional[str]) -> None:
+        """ register this value and its components as owned by a block of an entity in the change tracker"""
+        for value in (self, self.self_static, self.to_target_static, self.self_contextual, self.to_target_contextual):
+            ChangeTracker.register(value.uuid, entity_uuid, block_name)
+
     @classmethod
     def get(cls, uuid: UUID) -> Optional['ModifiableValue']:
         """
@@ -1803,6 +1854,8 @@ class ModifiableValue(BaseValue):
         Returns:
             int: The final calculated score.
         """
+        if metrics.enabled:
+            VALUE_EVALUATIONS.inc()
         typed_modifiers = self.get_typed_modifiers()
         if self.max is not None and self.min is not None:
             return max(self.min, min(sum(modifier.score if not normalized else modifier.normalized_score for modifier in typed_modifiers), self.max))
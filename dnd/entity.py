@@ -25,10 +25,14 @@ from dnd.blocks.health import (HealthConfig,Health)
 from dnd.blocks.equipment import (EquipmentConfig,Equipment,WeaponSlot,WeaponProperty, Range, Shield, Damage)
 from dnd.blocks.action_economy import (ActionEconomyConfig,ActionEconomy)
 from dnd.blocks.skills import (SkillSetConfig,SkillSet)
-from dnd.blocks.sensory import Senses
+from dnd.blocks.sensory import Senses, SensesDelta
 from dnd.core.events import AbilityName, SkillName, EventHandler, EventType, EventPhase, Trigger
 from dnd.core.base_block import ContextualConditionImmunity
 from dnd.core.base_tiles import Tile
+from dnd.core.area_of_effect import AreaShape, positions_in_mask
+from dnd.core.threat_map import ThreatMap
+from dnd.core.change_tracker import ChangeTracker
+from dnd.core import metrics
 
 
 def determine_attack_outcome(roll: DiceRoll, ac: Union[int, ModifiableValue]) -> AttackOutcome:
@@ -106,16 +110,47 @@ class Entity(BaseBlock):
         super().__init__(**data)
         self.__class__._entity_registry[self.uuid] = self
         self.__class__._entity_by_position[self.position].append(self)
+        self._register_change_owners()
+
+    def _register_change_owners(self) -> None:
+        """ let the change tracker stamp the changes of the blocks and values with the entity field holding them"""
+        ChangeTracker.register(self.uuid, self.uuid)
+        for field_name in type(self).model_fields:
+            attribute = getattr(self, field_name)
+            if isinstance(attribute, BaseBlock):
+                attribute.register_change_owners(self.uuid, field_name)
+            elif isinstance(attribute, ModifiableValue):
+                attribute.register_change_owner(self.uuid, field_name)
+        ChangeTracker.mark(self.uuid, "entity")
 
     @classmethod
     def update_entity_position(cls, entity: 'Entity',new_position: Tuple[int,int]):
         cls._entity_by_position[entity.position].remove(entity)
         cls._entity_by_position[new_position].append(entity)
         entity._set_position(new_position)
+        entity._publish_threats()
 
     @classmethod
     def register_entity(cls, entity: 'Entity'):
         cls._entity_registry[entity.uuid] = entity
+        entity._publish_threats()
+
+    @classmethod
+    def remove_entity(cls, entity_uuid: UUID) -> Optional['Entity']:
+        """ take an entity out of the world: unregister it, drop the cells it threatens and its event handlers"""
+        entity = cls._entity_registry.pop(entity_uuid, None)
+        if entity is None:
+            return None
+        positioned = cls._entity_by_position.get(entity.position, [])
+        positioned[:] = [other for other in positioned if other is not entity]
+        ThreatMap.remove_entity(entity_uuid)
+        for event_handler in list(entity.event_handlers.values()):
+            event_handler.remove()
+        return entity
+
+    def _publish_threats(self) -> None:
+        """ keep the threat map in line with the senses and the position of the entity"""
+        ThreatMap.set_threats(self.uuid, self.senses.get_threathened_positions())
 
     @classmethod
     def get_all_entities(cls) -> List['Entity']:
@@ -125,6 +160,14 @@ class Entity(BaseBlock):
     def get_all_entities_at_position(cls, position: Tuple[int,int]) -> List['Entity']:
         return cls._entity_by_position[position]
     
+    @classmethod
+    def get_entities_in_area(cls, shape: AreaShape, size: int, origin: Tuple[int,int], orientation: int = 0) -> List['Entity']:
+        """ the entities standing on the cells covered by an area of effect, see `Tile.get_area`"""
+        cells = Tile.get_area(shape, size, origin, orientation)
+        occupied = [position for position, entities in cls._entity_by_position.items() if entities]
+        hits = positions_in_mask(occupied, cells)
+        return [entity for position, hit in zip(occupied, hits) if hit for entity in cls._entity_by_position[position]]
+
     @classmethod
     def get(cls, uuid: UUID) -> Optional['Entity']:
         return cls._entity_registry.get(uuid)
@@ -239,6 +282,7 @@ class Entity(BaseBlock):
             self.active_conditions[condition.name] = condition
             self.active_conditions_by_uuid[condition.uuid] = condition
             self.active_conditions_by_source[condition.source_entity_uuid].append(condition.name)
+            ChangeTracker.mark(self.uuid, "active_conditions")
         return condition_applied
     
     
@@ -256,6 +300,7 @@ class Entity(BaseBlock):
         if removed:
             self.active_conditions.pop(condition_name)
             self._remove_condition_from_dicts(condition)
+        ChangeTracker.mark(self.uuid, "active_conditions")
         return removed
     
 
@@ -632,17 +677,66 @@ class Entity(BaseBlock):
                     visible_entities[entity.uuid] = pos
         return visible_dict, filtered_paths, {pos: Tile.is_walkable(pos) for pos in visible_positions}, visible_entities
     
-    def create_senses_copy_at_position(self, position: Tuple[int,int], max_distance: int = 10) -> 'Senses':
-        senses = self.senses.model_copy(deep=True)
-        senses.position = position
-        visible_dict, filtered_paths, walkable, visible_entities = Entity.compute_senses_from_position(position, self.senses.seen, max_distance)
-        
-        senses.update_senses(
+    def compute_senses_along_path(self, path: List[Tuple[int,int]], max_distance: int = 10) -> List[SensesDelta]:
+        """
+        Compute what the entity would see at every position of a path, as deltas between steps.
+
+        Neighboring positions share their shadowcasts through `Tile.get_fov_along_path`, nothing is
+        copied, no paths are computed and only the per-step deltas are returned. The first
+        delta holds everything visible from the first position and the entity itself is never reported.
+
+        Args:
+            path: The positions of the path in order
+            max_distance: Maximum view distance (default 10)
+
+        Returns:
+            List[SensesDelta]: one delta per position of the path
+        """
+        occupied = {position: [entity.uuid for entity in entities if entity.uuid != self.uuid]
+                    for position, entities in Entity._entity_by_position.items() if entities}
+        occupied = {position: uuids for position, uuids in occupied.items() if uuids}
+        deltas = []
+        previous_visible: Set[Tuple[int,int]] = set()
+        previous_entities: Dict[UUID,Tuple[int,int]] = {}
+        for position, visible in zip(path, Tile.get_fov_along_path(path, max_distance)):
+            if len(occupied) < len(visible):
+                seen_positions = [pos for pos in occupied if pos in visible]
+            else:
+                seen_positions = [pos for pos in visible if pos in occupied]
+            entities = {uuid: pos for pos in seen_positions for uuid in occupied[pos]}
+            deltas.append(SensesDelta(
+                position=position,
+                visible_added=sorted(visible - previous_visible),
+                visible_removed=sorted(previous_visible - visible),
+                entities_added={uuid: pos for uuid, pos in entities.items() if previous_entities.get(uuid) != pos},
+                entities_removed=[uuid for uuid in previous_entities if uuid not in entities]
+            ))
+            previous_visible, previous_entities = visible, entities
+        return deltas
+
+    @staticmethod
+    def refresh_senses_at_position(senses: Senses, position: Tuple[int,int], max_distance: int = 10) -> None:
+        """ refresh a senses block from a position, the compact equivalent of `compute_senses_from_position`
+        followed by `update_senses` that never builds the per position path lists"""
+        visible_positions = Tile.get_fov(position, max_distance)
+        distances, predecessors = Tile.get_path_tree(position, max_distance)
+        visible_entities = {}
+        for pos in visible_positions:
+            for entity in Entity.get_all_entities_at_position(pos):
+                visible_entities[entity.uuid] = pos
+        senses.update_from_path_tree(
             entities=visible_entities,
-            visible=visible_dict,
-            walkable=walkable,
-            paths=filtered_paths
+            visible=visible_positions,
+            walkable=[Tile.is_walkable(pos) for pos in visible_positions],
+            predecessors=predecessors
         )
+
+    def create_senses_copy_at_position(self, position: Tuple[int,int], max_distance: int = 10) -> 'Senses':
+        # the refresh replaces every array but the seen mask, which it updates in place
+        senses = self.senses.model_copy()
+        senses._seen = self.senses._seen.copy()
+        senses.position = position
+        Entity.refresh_senses_at_position(senses, position, max_distance)
         return senses
     
     def update_entity_senses(self, max_distance: int = 10):
@@ -680,17 +774,37 @@ class Entity(BaseBlock):
         #         if entity.uuid != self.uuid:  # Don't include self
         #             visible_entities[entity.uuid] = pos
         
-        visible_dict, filtered_paths, walkable, visible_entities = Entity.compute_senses_from_position(self.position, self.senses.seen, max_distance)
-        # Update the senses block
-        self.senses.update_senses(
-            entities=visible_entities,
-            visible=visible_dict,
-            walkable=walkable,
-            paths=filtered_paths
-        )
+        Entity.refresh_senses_at_position(self.senses, self.position, max_distance)
+        self._publish_threats()
 
     @classmethod
     def update_all_entities_senses(cls, max_distance: int = 10):
         """ Update the senses for all entities """
         for entity in cls.get_all_entities():
             entity.update_entity_senses(max_distance)
+
+    @classmethod
+    def update_entities_senses_around(cls, position: Tuple[int,int], max_distance: int = 10) -> List['Entity']:
+        """
+        Update the senses only for the entities that can be affected by a change at a position.
+        Both the field of view and the paths are bounded by max_distance and every step costs at least one,
+        so an entity farther than max_distance (chebyshev) from the position cannot see or reach it.
+        The paths come from the live trees of `Tile.get_path_tree`, which only repair the part of
+        each entity's tree going through the changed cell.
+
+        Args:
+            position: The position of the changed tile
+            max_distance: Maximum view/movement distance (default 10)
+
+        Returns:
+            List[Entity]: the entities whose senses were updated
+        """
+        updated = []
+        for entity in cls.get_all_entities():
+            if max(abs(entity.position[0] - position[0]), abs(entity.position[1] - position[1])) <= max_distance:
+                entity.update_entity_senses(max_distance)
+                updated.append(entity)
+        return updated
+
+
+metrics.gauge("dnd_entities", "Entities in the entity registry", function=lambda: len(Entity._entity_registry))
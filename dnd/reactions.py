@@ -1,53 +1,61 @@
-from dnd.core.events import EventHandler, Trigger, EventType, EventPhase, WeaponSlot
+from dnd.core.events import EventHandler, EventQueue, Trigger, EventType, EventPhase, WeaponSlot
 from dnd.actions import AttackEvent, MovementEvent, Attack, entity_action_economy_cost_evaluator
 from dnd.core.base_actions import Cost
 from dnd.entity import Entity
+from dnd.core.threat_map import ThreatMap
 from uuid import UUID
-from typing import Optional
+from typing import FrozenSet, Optional
+
+
+def opportunity_attackers(event: MovementEvent) -> FrozenSet[UUID]:
+    """the entities that can make an opportunity attack against a movement, looked up once per
+    movement in the threat map, the router of the opportunity attack handlers"""
+    if not isinstance(event, MovementEvent) or not event.path or len(event.costs) == 0:
+        return frozenset()
+    return ThreatMap.get_opportunity_attackers(event.source_entity_uuid, event.start_position, event.path)
 
 
 def opportunity_attack_processor(event: MovementEvent, source_entity_uuid: UUID) -> Optional[MovementEvent]:
     """checks if movement event is an opportunity attack, source entity uuid is the entity that 
     added this trigger to the event q, the event.source_entity_uuid is the entity that is moving
     
-    this is a quite greed approach since any movement will trigger this check"""
+    the handlers are routed, the event queue only calls the ones of the entities returned by
+    `opportunity_attackers`, i.e. threatening the start of the movement and left behind by its path.
+    The check is repeated for direct calls, it hits the lookup cached for the movement"""
+    if source_entity_uuid not in opportunity_attackers(event):
+        return event
     #first we get the source entity
     reaction_source_entity = Entity.get(source_entity_uuid)
     event_source_entity = Entity.get(event.source_entity_uuid)
     if reaction_source_entity is None or event_source_entity is None:
         return event
-    
-    if reaction_source_entity.uuid == event_source_entity.uuid:
-        return event
-    threathened_positions = reaction_source_entity.senses.get_threathened_positions()
-
-
-    if event.path and event.start_position in threathened_positions and any(position not in threathened_positions for position in event.path) and len(event.costs)>0:
-        # the source entity starts from a threathened position and paths outside of it
-        reaction_attack = Attack(name="Opportunity Attack",
-                                 source_entity_uuid=source_entity_uuid,
-                                 target_entity_uuid=event.source_entity_uuid,
-                                 parent_event=event,
-                                 weapon_slot=WeaponSlot.MAIN_HAND,
-                                 use_register=False,
-                                 costs=[Cost(name="Opportunity Attack Cost",cost_type="reactions",cost=1,evaluator=entity_action_economy_cost_evaluator)]
-        )
-        if reaction_attack.pre_validate():
-            reaction_attack.add_to_register() 
-            reaction_attack.apply(parent_event=event)
-
-        
-        
+
+    # the source entity starts from a threathened position and paths outside of it
+    reaction_attack = Attack(name="Opportunity Attack",
+                             source_entity_uuid=source_entity_uuid,
+                             target_entity_uuid=event.source_entity_uuid,
+                             parent_event=event,
+                             weapon_slot=WeaponSlot.MAIN_HAND,
+                             use_register=False,
+                             costs=[Cost(name="Opportunity Attack Cost",cost_type="reactions",cost=1,evaluator=entity_action_economy_cost_evaluator)]
+    )
+    if reaction_attack.pre_validate():
+        reaction_attack.add_to_register() 
+        reaction_attack.apply(parent_event=event)
+
     return event
 
 
+OPPORTUNITY_ATTACK_TRIGGER = Trigger(name="Opportunity Attack Trigger", event_type=EventType.MOVEMENT, event_phase=EventPhase.EFFECT)
+EventQueue.set_router(OPPORTUNITY_ATTACK_TRIGGER, opportunity_attackers)
+
+
 def create_opputinity_attack_handler(source_entity_uuid: UUID) -> EventHandler:
     return EventHandler(name="Opportunity Attack Handler",
-                        trigger_conditions=[Trigger(name="Opportunity Attack Trigger",
-                                     event_type=EventType.MOVEMENT,
-                                     event_phase=EventPhase.EFFECT)],
+                        trigger_conditions=[OPPORTUNITY_ATTACK_TRIGGER],
                         event_processor=opportunity_attack_processor,
-                        source_entity_uuid=source_entity_uuid)
+                        source_entity_uuid=source_entity_uuid,
+                        routed=True)
 
 def add_opportunity_attack_handler(entity: Entity):
     entity.add_event_handler(create_opputinity_attack_handler(entity.uuid))
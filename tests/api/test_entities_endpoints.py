@@ -0,0 +1,193 @@
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.main import app
+from app.models.entity import EntitySnapshotCache
+from dnd.core.base_tiles import Tile
+from dnd.entity import Entity
+from dnd.core.modifiers import DamageType
+from tests.test_entity import create_basic_entity
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    yield
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+
+
+SNAPSHOT_OPTIONS = dict(
+    include_skill_calculations=False,
+    include_attack_calculations=False,
+    include_ac_calculation=False,
+    include_saving_throw_calculations=False,
+)
+
+
+@pytest.fixture
+def client():
+    # no context manager, the startup demo entities are not created
+    return TestClient(app)
+
+
+def build_corridor(length):
+    for x in range(length):
+        Tile.create((x, 0))
+
+
+def test_move_returns_senses_deltas(client):
+    build_corridor(5)
+    walker = create_basic_entity(position=(0, 0))
+    Entity.update_all_entities_senses()
+    Entity.update_all_entities_senses()
+    response = client.post(f"/api/entities/{walker.uuid}/move",
+                           json={"position": [2, 0], "include_paths_senses_deltas": True})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["entity"]["position"] == [2, 0]
+    assert body["path_senses"] == {}
+    deltas = body["path_senses_deltas"]
+    assert [delta["position"] for delta in deltas] == [[0, 0], [1, 0], [2, 0]]
+    assert {(x, 0) for x in range(5)} <= set(map(tuple, deltas[0]["visible_added"]))
+    assert deltas[0]["entities_added"] == {}
+
+
+def test_entity_snapshot_etag_and_not_modified(client):
+    entity = create_basic_entity()
+    first = client.get(f"/api/entities/{entity.uuid}")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.json()["uuid"] == str(entity.uuid)
+
+    unchanged = client.get(f"/api/entities/{entity.uuid}", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert client.get(f"/api/entities/{entity.uuid}?include_ac_calculation=true", headers={"If-None-Match": etag}).status_code == 200
+
+    entity.health.take_damage(1, DamageType.BLUDGEONING, uuid4())
+    changed = client.get(f"/api/entities/{entity.uuid}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["health"]["damage_taken"] == 1
+
+
+def apply_patch(document, operations):
+    for operation in operations:
+        keys = [key for key in operation["path"].split("/") if key]
+        if not keys:
+            document = operation["value"]
+            continue
+        parent = document
+        for key in keys[:-1]:
+            parent = parent[key]
+        if operation["op"] == "remove":
+            del parent[keys[-1]]
+        else:
+            parent[keys[-1]] = operation["value"]
+    return document
+
+
+def test_entity_changes_replace_only_the_changed_blocks(client):
+    entity = create_basic_entity()
+    response = client.get(f"/api/entities/{entity.uuid}")
+    snapshot, version = response.json(), int(response.headers["X-Change-Version"])
+    assert client.get(f"/api/entities/{entity.uuid}/changes", params={"since": version}).json()["operations"] == []
+
+    entity.health.take_damage(2, DamageType.BLUDGEONING, uuid4())
+    entity.move((1, 1), update_senses=False)
+    patch = client.get(f"/api/entities/{entity.uuid}/changes", params={"since": version}).json()
+    assert {operation["path"] for operation in patch["operations"]} == {"/health", "/position", "/senses"}
+
+    snapshot = apply_patch(snapshot, patch["operations"])
+    fresh = client.get(f"/api/entities/{entity.uuid}").json()
+    for field in ("health", "position", "senses", "active_conditions"):
+        assert snapshot[field] == fresh[field]
+    assert client.get(f"/api/entities/{entity.uuid}/changes", params={"since": patch["version"]}).json()["operations"] == []
+
+
+def test_encounter_changes_add_new_entities(client):
+    version = int(client.get("/api/entities/changes").json()["version"])
+    first = create_basic_entity()
+    patch = client.get("/api/entities/changes", params={"since": version}).json()
+    assert [(operation["op"], operation["path"]) for operation in patch["operations"]] == [("add", f"/{first.uuid}")]
+
+    second = create_basic_entity()
+    first.set_target_entity(second.uuid)
+    patch = client.get("/api/entities/changes", params={"since": patch["version"]}).json()
+    paths = {operation["path"] for operation in patch["operations"]}
+    assert f"/{second.uuid}" in paths
+    assert {f"/{first.uuid}/target_entity_uuid", f"/{first.uuid}/skill_set"} <= paths
+
+
+def test_batch_projects_the_requested_fields(client):
+    first = create_basic_entity()
+    second = create_basic_entity(position=(1, 1))
+    unknown = uuid4()
+    response = client.get("/api/entities/batch", params={
+        "uuids": [str(first.uuid), str(unknown), str(second.uuid)],
+        "fields": "health,senses.position,ac_calculation",
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["missing"] == [str(unknown)]
+    assert [snapshot["uuid"] for snapshot in body["entities"]] == [str(first.uuid), str(second.uuid)]
+    projected = body["entities"][1]
+    assert set(projected) == {"uuid", "health", "senses", "ac_calculation"}
+    assert projected["senses"] == {"position": [1, 1]}
+    assert projected["health"]["uuid"] == str(second.health.uuid)
+
+    full = client.get("/api/entities/summaries").json()[0]
+    summaries = client.get("/api/entities/summaries/batch", params={"uuids": [str(first.uuid)], "fields": "current_hp,max_hp"})
+    assert summaries.json()["entities"] == [{"uuid": full["uuid"], "current_hp": full["current_hp"], "max_hp": full["max_hp"]}]
+
+    assert client.get("/api/entities/batch", params={"uuids": [str(first.uuid)], "fields": "health.bogus"}).status_code == 400
+
+
+def test_rendered_snapshots_keep_the_model_schema(client):
+    from app.models.entity import EntitySnapshot
+    entity = create_basic_entity()
+    response = client.post(f"/api/entities/{entity.uuid}/action-economy/refresh")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    expected = EntitySnapshot.from_engine(entity).model_dump(mode="json")
+    assert body.keys() == expected.keys()
+    assert body["health"]["uuid"] == expected["health"]["uuid"]
+    assert body["ability_scores"]["strength"]["ability_score"]["score"] == expected["ability_scores"]["strength"]["ability_score"]["score"]
+
+
+def test_msgpack_is_negotiated_through_accept(client):
+    from app.api import serialization
+    entity = create_basic_entity()
+    headers = {"Accept": "application/msgpack"}
+    if serialization.msgpack is None:
+        assert client.get(f"/api/entities/{entity.uuid}", headers=headers).status_code == 406
+        fallback = client.get(f"/api/entities/{entity.uuid}", headers={"Accept": "application/msgpack, application/json;q=0.5"})
+        assert fallback.headers["content-type"] == "application/json"
+        return
+    response = client.get(f"/api/entities/{entity.uuid}", headers=headers)
+    assert response.headers["content-type"] == "application/msgpack"
+    assert serialization.msgpack.unpackb(response.content)["uuid"] == str(entity.uuid)
+    assert EntitySnapshotCache.get_cached(entity, "application/msgpack", **SNAPSHOT_OPTIONS) == response.content
+
+
+def test_snapshot_cache_keeps_encodings_until_the_stamp_moves():
+    entity = create_basic_entity()
+    body, stamp = EntitySnapshotCache.get_json(entity, **SNAPSHOT_OPTIONS)
+    assert EntitySnapshotCache.get_cached(entity, **SNAPSHOT_OPTIONS) == body
+    assert EntitySnapshotCache.get_cached(entity, "application/msgpack", **SNAPSHOT_OPTIONS) is None
+
+    EntitySnapshotCache.add_encoding(entity, stamp, "application/msgpack", b"packed", **SNAPSHOT_OPTIONS)
+    assert EntitySnapshotCache.get_cached(entity, "application/msgpack", **SNAPSHOT_OPTIONS) == b"packed"
+
+    entity.health.take_damage(1, DamageType.BLUDGEONING, uuid4())
+    assert EntitySnapshotCache.get_cached(entity, "application/msgpack", **SNAPSHOT_OPTIONS) is None
+    EntitySnapshotCache.add_encoding(entity, stamp, "application/msgpack", b"stale", **SNAPSHOT_OPTIONS)
+    assert EntitySnapshotCache.get_cached(entity, "application/msgpack", **SNAPSHOT_OPTIONS) is None
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.main import app
+from dnd.core.events import Event, EventType
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_events_page_filters_and_paginates(client):
+    source = uuid4()
+    attacks = [Event(event_type=EventType.ATTACK, source_entity_uuid=source) for _ in range(3)]
+    Event(event_type=EventType.MOVEMENT, source_entity_uuid=source)
+    Event(event_type=EventType.ATTACK, source_entity_uuid=uuid4())
+
+    response = client.get(f"/api/events/?event_type=attack&source={source}&limit=2")
+    assert response.status_code == 200
+    page = response.json()
+    assert [event["uuid"] for event in page["events"]] == [str(event.uuid) for event in attacks[:2]]
+    assert page["has_more"]
+
+    page = client.get(f"/api/events/?event_type=attack&source={source}&after={page['next_cursor']}").json()
+    assert [event["uuid"] for event in page["events"]] == [str(attacks[2].uuid)]
+    assert not page["has_more"]
+
+    assert client.get("/api/events/?limit=0").status_code == 422
@@ -0,0 +1,51 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.api.execution import WorldExecutor
+
+
+def test_reads_and_writes_of_a_world_run_one_at_a_time():
+    executor = WorldExecutor(max_workers=4)
+    inside = []
+    overlaps = []
+
+    def work(value):
+        inside.append(value)
+        if len(inside) > 1:
+            overlaps.append(tuple(inside))
+        time.sleep(0.02)
+        inside.remove(value)
+        return value
+
+    async def scenario():
+        return await asyncio.gather(executor.read(work, 1), executor.read(work, 2), executor.write(work, 3))
+
+    try:
+        assert asyncio.run(scenario()) == [1, 2, 3]
+        assert overlaps == []
+    finally:
+        executor.shutdown()
+
+
+def test_a_busy_world_does_not_block_other_worlds_or_the_loop():
+    executor = WorldExecutor(max_workers=4)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = asyncio.ensure_future(executor.write(release.wait, 2, encounter="slow"))
+        started = time.perf_counter()
+        assert await executor.read(lambda: "ok", encounter="other") == "ok"
+        await asyncio.sleep(0)
+        elapsed = time.perf_counter() - started
+        release.set()
+        await blocked
+        return elapsed
+
+    try:
+        assert asyncio.run(scenario()) < 0.5
+    finally:
+        executor.shutdown()
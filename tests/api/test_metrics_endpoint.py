@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.main import app
+from dnd.core import metrics
+from tests.test_entity import create_basic_entity
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_metrics_endpoint_serves_prometheus_text(client):
+    metrics.reset()
+    metrics.enable()
+    try:
+        entity = create_basic_entity()
+        client.get(f"/api/entities/{entity.uuid}")
+        client.get(f"/api/entities/{entity.uuid}")
+        response = client.get("/metrics")
+    finally:
+        metrics.disable()
+        metrics.reset()
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert "dnd_entities 1" in lines
+    assert "dnd_metrics_enabled 1" in lines
+    assert 'dnd_snapshot_cache_requests_total{result="hit"} 1' in lines
+    assert 'dnd_snapshot_build_seconds_count{model="EntitySnapshot"} 1' in lines
@@ -0,0 +1,122 @@
+import socket
+import sys
+import time
+from uuid import uuid4
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.main import app
+from app.run_server import start_workers
+from app.shard_router import create_router
+from dnd.core.map_io import MapGrid
+from dnd.core.base_tiles import Tile, floor_factory, wall_factory
+from dnd.entity import Entity
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    yield
+    Tile.detach_store()
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+
+
+@pytest.fixture
+def router():
+    # both workers are the in process app, told apart by their base url
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    return TestClient(create_router({"cave": "http://cave", "lair": "http://lair"}, client=client))
+
+
+def test_requests_are_forwarded_to_the_encounter_worker(router):
+    floor_factory((0, 0))
+    response = router.get("/api/tiles/", headers={"X-Encounter": "cave"})
+    assert response.status_code == 200
+    assert response.json()["width"] == 1
+    assert "X-Map-Version" in response.headers
+
+    assert router.get("/api/tiles/position/0/0", params={"encounter": "lair"}).json()["position"] == [0, 0]
+    assert router.get("/api/tiles/", headers={"X-Encounter": "elsewhere"}).status_code == 404
+    assert router.get("/router/encounters/lair").json() == {"encounter": "lair", "worker": "http://lair"}
+
+
+def test_handoff_moves_the_map_and_repoints_the_encounter(router):
+    floor_factory((0, 0))
+    wall_factory((1, 0))
+    assert router.post("/router/encounters/cave/handoff", json={"target": "http://lair"}).status_code == 409
+    response = router.post("/router/encounters/cave/handoff", json={"target": "http://spare"})
+    assert response.status_code == 200
+    assert response.json()["map"]["width"] == 2
+    assert router.get("/router/encounters").json()["cave"] == "http://spare"
+    assert Tile.get_tile_at_position((1, 0)).sprite_name == "wall.png"
+
+
+def test_handoff_is_refused_while_the_encounter_has_entities(router):
+    floor_factory((0, 0))
+    Entity.create(source_entity_uuid=uuid4(), name="Goblin")
+    response = router.post("/router/encounters/cave/handoff", json={"target": "http://spare"})
+    assert response.status_code == 409
+    assert "entities or events" in response.json()["detail"]
+    assert router.get("/router/encounters").json()["cave"] == "http://cave"
+
+
+def _free_port_block(count):
+    # the workers listen on the ports following the router port
+    for _ in range(20):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            base = probe.getsockname()[1]
+        if base + count >= 65535:
+            continue
+        try:
+            for port in range(base + 1, base + count + 1):
+                with socket.socket() as probe:
+                    probe.bind(("127.0.0.1", port))
+        except OSError:
+            continue
+        return base
+    pytest.skip("no free block of ports")
+
+
+def _wait_until_up(url, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/api/tiles/", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise AssertionError(f"Worker {url} did not start")
+
+
+def test_handoff_between_workers_started_like_run_server():
+    port = _free_port_block(2)
+    workers, processes = start_workers(["cave", "spare"], "127.0.0.1", port)
+    try:
+        for url in workers.values():
+            _wait_until_up(url)
+        # the workers of a sharded deployment start without the demo entities
+        assert httpx.get(f"{workers['cave']}/api/entities/").json() == []
+
+        client = httpx.AsyncClient(timeout=10.0)
+        with TestClient(create_router({"cave": workers["cave"]}, client=client)) as router:
+            imported = router.put("/api/tiles/import", content=MapGrid.from_ascii(".#\n..").to_bytes(),
+                                  headers={"X-Encounter": "cave", "Content-Type": "application/octet-stream"})
+            assert imported.status_code == 200
+
+            response = router.post("/router/encounters/cave/handoff", json={"target": workers["spare"]})
+            assert response.status_code == 200
+            assert router.get("/router/encounters").json() == {"cave": workers["spare"]}
+            assert router.get("/api/tiles/walkable/1/0", headers={"X-Encounter": "cave"}).json()["walkable"] is False
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
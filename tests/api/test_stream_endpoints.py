@@ -0,0 +1,82 @@
+import asyncio
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.main import app
+from app.api.event_stream import Subscription, stream_hub
+from app.api.execution import world_executor
+from app.api.routes import stream
+from dnd.core.change_tracker import ChangeTracker
+from dnd.core.events import Event, EventType, EventPhase
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_stream_pushes_filtered_events_and_entity_changes(client):
+    watched = uuid4()
+    with client.websocket_connect(f"/api/stream/ws?event_types=attack&entities={watched}") as websocket:
+        Event(event_type=EventType.MOVEMENT, source_entity_uuid=watched)
+        Event(event_type=EventType.ATTACK, source_entity_uuid=uuid4())
+        attack = Event(event_type=EventType.ATTACK, source_entity_uuid=uuid4(), target_entity_uuid=watched)
+        message = websocket.receive_json()
+        assert message["type"] == "event"
+        assert message["event"]["uuid"] == str(attack.uuid)
+
+        ChangeTracker.mark(uuid4(), "health")
+        version = ChangeTracker.mark(watched, "health")
+        message = websocket.receive_json()
+        assert message == {"type": "entities", "changes": {str(watched): version}}
+    assert stream_hub.subscription_count() == 0
+
+
+def test_stream_snapshots_events_under_the_world_lock(client, monkeypatch):
+    held = []
+    dump_events = stream.dump_events
+
+    def checked_dump(events):
+        held.append(world_executor.lock().locked())
+        return dump_events(events)
+
+    monkeypatch.setattr(stream, "dump_events", checked_dump)
+    with client.websocket_connect("/api/stream/ws?event_types=attack") as websocket:
+        attack = Event(event_type=EventType.ATTACK, source_entity_uuid=uuid4())
+        message = websocket.receive_json()
+        assert message["event"]["uuid"] == str(attack.uuid)
+    assert held and all(held)
+
+
+def test_stream_rejects_unknown_encounters(client):
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/api/stream/ws?encounter=elsewhere") as websocket:
+            websocket.receive_json()
+
+
+def test_subscription_coalesces_phases_and_bounds_the_backlog():
+    loop = asyncio.new_event_loop()
+    try:
+        subscription = Subscription(loop, max_pending=2)
+        first = Event(event_type=EventType.ATTACK, source_entity_uuid=uuid4(), use_register=False)
+        subscription.push_event(first)
+        subscription.push_event(first.model_copy(update={"phase": EventPhase.COMPLETION}))
+        for _ in range(3):
+            subscription.push_event(Event(event_type=EventType.MOVEMENT, source_entity_uuid=uuid4(), use_register=False))
+        dropped, events, _ = loop.run_until_complete(subscription.drain())
+        assert dropped == 2
+        assert [event.event_type for event in events] == [EventType.MOVEMENT, EventType.MOVEMENT]
+
+        subscription.push_event(first.model_copy(update={"phase": EventPhase.EXECUTION}))
+        subscription.push_event(first.model_copy(update={"phase": EventPhase.EFFECT}))
+        dropped, events, _ = loop.run_until_complete(subscription.drain())
+        assert dropped == 0
+        assert [event.phase for event in events] == [EventPhase.EFFECT]
+    finally:
+        loop.close()
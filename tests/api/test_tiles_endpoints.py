@@ -0,0 +1,88 @@
+import base64
+import json
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.main import app
+from dnd.core.base_tiles import Tile
+from dnd.core.map_io import MapGrid
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    yield
+    Tile.detach_store()
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+
+
+@pytest.fixture
+def client():
+    # no context manager, the startup demo entities are not created
+    return TestClient(app)
+
+
+ROOM = """\
+#####
+#...#
+#.~.#
+#####
+"""
+
+
+def test_region_rle_matches_the_map(client):
+    Tile.load_grid(MapGrid.from_ascii(ROOM))
+    response = client.get("/api/tiles/region", params={"x0": 1, "y0": 0, "x1": 5, "y1": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert response.headers["X-Map-Version"] == str(body["revision"])
+    assert (body["width"], body["height"]) == (5, 3)
+    assert [entry["name"] for entry in body["palette"]] == ["Floor", "Wall", "Water"]
+
+    grid = MapGrid.from_run_lengths(base64.b64decode(body["data"]), [], 1, 0, 5, 3)
+    symbols = {"Floor": ".", "Wall": "#", "Water": "~"}
+    rows = ["".join(symbols[body["palette"][index - 1]["name"]] if index else " " for index in row) for row in grid.cells]
+    assert rows == ["#### ", "...# ", ".~.# "]
+
+
+def test_region_packed_binary(client):
+    Tile.load_grid(MapGrid.from_ascii(ROOM))
+    response = client.get("/api/tiles/region", params={"x0": 0, "y0": 1, "x1": 2, "y1": 2, "encoding": "packed", "transport": "binary"})
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["X-Grid-Region"] == "0,1,3,2"
+    (length,) = struct.unpack_from("<I", response.content)
+    palette = json.loads(response.content[4:4 + length])
+    cells = list(response.content[4 + length:])
+    assert [palette[index - 1]["walkable"] for index in cells] == [False, True, True, False, True, False]
+
+
+def test_region_tiles_encoding_and_bounds(client):
+    Tile.create((3, 3))
+    Tile.create((9, 9))
+    body = client.get("/api/tiles/region", params={"x0": 0, "y0": 0, "x1": 4, "y1": 4, "encoding": "tiles"}).json()
+    assert [tile["position"] for tile in body["tiles"].values()] == [[3, 3]]
+    assert client.get("/api/tiles/region", params={"x0": 4, "y0": 0, "x1": 0, "y1": 4}).status_code == 400
+    assert client.get("/api/tiles/region", params={"x0": 0, "y0": 0, "x1": 4, "y1": 4, "encoding": "tiles", "transport": "binary"}).status_code == 400
+
+
+def test_unchanged_region_is_not_sent_again(client):
+    Tile.load_grid(MapGrid.from_ascii(ROOM))
+    near = {"x0": 0, "y0": 0, "x1": 15, "y1": 15}
+    far = {"x0": 32, "y0": 32, "x1": 47, "y1": 47}
+    revision = int(client.get("/api/tiles/region", params=near).headers["X-Map-Version"])
+    far_revision = int(client.get("/api/tiles/region", params=far).headers["X-Map-Version"])
+    assert client.get("/api/tiles/region", params={**near, "since": revision}).status_code == 304
+
+    Tile.get_tile_at_position((1, 1)).sprite_name = "moss.png"
+    changed = client.get("/api/tiles/region", params={**near, "since": revision})
+    assert changed.status_code == 200
+    assert int(changed.headers["X-Map-Version"]) > revision
+    assert "moss.png" in [entry["sprite_name"] for entry in changed.json()["palette"]]
+    assert client.get("/api/tiles/region", params={**far, "since": far_revision}).status_code == 304
@@ -1,5 +1,8 @@
+import random
 from uuid import uuid4
 
+from dnd.blocks.sensory import Senses
+from dnd.core.base_tiles import Tile
 from dnd.entity import Entity
 
 
@@ -35,3 +38,84 @@ def test_visibility_with_limited_vision_range():
 
     assert watcher.senses.get_feet_distance((2, 0)) == 10
     assert watcher.senses.get_feet_distance((8, 0)) == 40
+
+
+def test_senses_views_behave_like_dicts_and_sets():
+    senses = Entity.create(uuid4()).senses
+    senses.update_senses(
+        entities={},
+        visible={(0, 0): True, (5, 3): True},
+        walkable={(0, 0): True, (5, 3): False},
+        paths={(0, 0): [(0, 0)], (5, 3): [(0, 0), (1, 1), (2, 2), (3, 3), (4, 3), (5, 3)]},
+    )
+    assert dict(senses.visible) == {(0, 0): True, (5, 3): True}
+    assert senses.walkable[(5, 3)] is False
+    assert (1, 1) not in senses.walkable
+    assert senses.paths[(5, 3)] == [(0, 0), (1, 1), (2, 2), (3, 3), (4, 3), (5, 3)]
+    assert (2, 2) not in senses.paths
+    assert senses.paths[(2, 2)] == []
+    assert (2, 2) not in senses.paths
+    assert set(senses.seen) == {(0, 0), (5, 3)}
+
+    # a path that disagrees with the tree and one outside the window are still kept
+    senses.paths[(3, 3)] = [(0, 0), (1, 2), (2, 3), (3, 3)]
+    senses.paths[(-4, 9)] = [(0, 0), (-4, 9)]
+    assert senses.paths[(3, 3)] == [(0, 0), (1, 2), (2, 3), (3, 3)]
+    assert senses.paths[(-4, 9)] == [(0, 0), (-4, 9)]
+    assert senses.paths[(5, 3)][-1] == (5, 3)
+    assert len(senses.paths) == 4
+
+    copy = senses.model_copy(deep=True)
+    copy.seen.add((9, 9))
+    assert (9, 9) in copy.seen and (9, 9) not in senses.seen
+
+
+def test_compact_refresh_matches_dict_senses():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    rng = random.Random(7)
+    for x in range(14):
+        for y in range(14):
+            blocked = rng.random() < 0.2
+            Tile.create((x, y), can_walk=not blocked, can_see=not blocked)
+    Tile.create((6, 6))
+    watcher = Entity.create(uuid4())
+    other = Entity.create(uuid4())
+    Entity.update_entity_position(other, (8, 7))
+    try:
+        for position in [(6, 6), (7, 6), (8, 8), (6, 6)]:
+            expected = watcher.senses.model_copy(deep=True)
+            visible, paths, walkable, entities = Entity.compute_senses_from_position(position, expected.seen, 6)
+            expected.update_senses(entities=entities, visible=visible, walkable=walkable, paths=paths)
+            Entity.refresh_senses_at_position(watcher.senses, position, 6)
+            assert dict(watcher.senses.visible) == dict(expected.visible)
+            assert dict(watcher.senses.walkable) == dict(expected.walkable)
+            assert dict(watcher.senses.paths) == dict(expected.paths)
+            assert set(watcher.senses.seen) == set(expected.seen)
+            assert watcher.senses.entities == expected.entities
+    finally:
+        Tile._tile_registry = {}
+        Tile._tile_by_position = {}
+
+
+def test_senses_fields_are_constructed_and_serialized():
+    senses = Senses(
+        source_entity_uuid=uuid4(),
+        visible={(1, 2): True, (2, 2): False},
+        walkable={(1, 2): True},
+        paths={(1, 2): [(0, 0), (1, 1), (1, 2)], (5, 5): [(5, 5)]},
+        seen={(3, 3)},
+    )
+    assert dict(senses.visible) == {(1, 2): True, (2, 2): False}
+    assert dict(senses.walkable) == {(1, 2): True}
+    assert senses.paths[(1, 2)] == [(0, 0), (1, 1), (1, 2)]
+    assert set(senses.seen) == {(3, 3)}
+
+    dump = senses.model_dump()
+    assert dump["visible"] == {(1, 2): True, (2, 2): False}
+    assert dump["seen"] == {(3, 3)}
+    for restored in (Senses.model_validate(dump), Senses.model_validate_json(senses.model_dump_json())):
+        assert dict(restored.visible) == dict(senses.visible)
+        assert dict(restored.walkable) == dict(senses.walkable)
+        assert dict(restored.paths) == dict(senses.paths)
+        assert set(restored.seen) == {(3, 3)}
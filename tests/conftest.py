@@ -7,35 +7,22 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from dnd.core.events import EventQueue
 from dnd.entity import Entity
+from dnd.core.base_tiles import Tile
+from dnd.core.threat_map import ThreatMap
+from dnd.core.change_tracker import ChangeTracker
 
 @pytest.fixture(autouse=True)
 def clear_event_queue():
-    EventQueue._events_by_lineage.clear()
-    EventQueue._events_by_uuid.clear()
-    EventQueue._events_by_type.clear()
-    EventQueue._events_by_timestamp.clear()
-    EventQueue._events_by_phase.clear()
-    EventQueue._events_by_source.clear()
-    EventQueue._events_by_target.clear()
-    EventQueue._all_events.clear()
-    EventQueue._event_handlers.clear()
-    EventQueue._event_handlers_by_trigger.clear()
-    EventQueue._event_handlers_by_simple_trigger.clear()
-    EventQueue._event_handlers_by_source_entity_uuid.clear()
+    EventQueue.clear()
     Entity._entity_registry.clear()
     Entity._entity_by_position.clear()
+    ThreatMap.clear()
+    ChangeTracker.clear()
+    Tile._path_trees.clear()
     yield
-    EventQueue._events_by_lineage.clear()
-    EventQueue._events_by_uuid.clear()
-    EventQueue._events_by_type.clear()
-    EventQueue._events_by_timestamp.clear()
-    EventQueue._events_by_phase.clear()
-    EventQueue._events_by_source.clear()
-    EventQueue._events_by_target.clear()
-    EventQueue._all_events.clear()
-    EventQueue._event_handlers.clear()
-    EventQueue._event_handlers_by_trigger.clear()
-    EventQueue._event_handlers_by_simple_trigger.clear()
-    EventQueue._event_handlers_by_source_entity_uuid.clear()
+    EventQueue.clear()
     Entity._entity_registry.clear()
-    Entity._entity_by_position.clear()
\ No newline at end of file
+    Entity._entity_by_position.clear()
+    ThreatMap.clear()
+    ChangeTracker.clear()
+    Tile._path_trees.clear()
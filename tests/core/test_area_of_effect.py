@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core.base_tiles import Tile
+from dnd.core.area_of_effect import AreaShape, template_mask, area_cells, orientation_towards, positions_in_mask
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._line_of_sight_cache.clear()
+    yield
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._line_of_sight_cache.clear()
+
+
+def build_grid(width, height, walls=()):
+    for x in range(width):
+        for y in range(height):
+            Tile.create((x, y), can_walk=(x, y) not in walls, can_see=(x, y) not in walls)
+
+
+def cells(shape, size, origin=(0, 0), orientation=0):
+    return {tuple(int(v) for v in cell) for cell in area_cells(shape, size, origin, orientation)}
+
+
+def test_masks_are_cached_and_read_only():
+    mask, offset = template_mask(AreaShape.CONE, 15, 90)
+    again, _ = template_mask(AreaShape.CONE, 15, 90)
+    assert mask is again
+    assert not mask.flags.writeable
+
+
+def test_sphere_is_centered_on_the_origin():
+    covered = cells(AreaShape.SPHERE, 10, (5, 5))
+    assert (5, 5) in covered and (7, 5) in covered and (5, 3) in covered
+    assert (7, 7) not in covered
+    assert len(covered) == 13
+
+
+def test_line_and_cube_extend_from_the_origin():
+    assert cells(AreaShape.LINE, 20) == {(1, 0), (2, 0), (3, 0), (4, 0)}
+    assert cells(AreaShape.LINE, 15, orientation=90) == {(0, 1), (0, 2), (0, 3)}
+    assert cells(AreaShape.CUBE, 15) == {(x, y) for x in (1, 2, 3) for y in (-1, 0, 1)}
+
+
+def test_cone_widens_with_distance():
+    covered = cells(AreaShape.CONE, 15)
+    assert (0, 0) not in covered
+    assert {(1, 0), (2, 0), (3, 0), (2, 1), (3, 1), (3, -1)} <= covered
+    assert (1, 1) not in covered and (-1, 0) not in covered
+
+
+def test_orientation_towards():
+    assert orientation_towards((0, 0), (3, 0)) == 0
+    assert orientation_towards((0, 0), (0, 3)) == 90
+    assert orientation_towards((0, 0), (-2, -2)) == 225
+
+
+def test_walls_block_the_spread():
+    build_grid(9, 9, walls={(6, 3), (6, 4), (6, 5)})
+    affected = Tile.get_area(AreaShape.SPHERE, 20, (4, 4))
+    assert (4, 4) in affected
+    assert (6, 4) in affected
+    assert (7, 4) not in affected and (8, 4) not in affected
+    assert (4, 8) in affected
+    # cells outside the map are never affected
+    assert all(0 <= x < 9 and 0 <= y < 9 for x, y in affected)
+
+
+def test_positions_in_mask():
+    hits = positions_in_mask([(0, 0), (5, 5), (2, 3), (-4, 1)], [(2, 3), (5, 5)])
+    assert hits.tolist() == [False, True, True, False]
+    assert positions_in_mask([], [(1, 1)]).tolist() == []
@@ -90,3 +90,14 @@ def test_tile_factories_and_get():
     assert not Tile.is_visible(wall.position) and not Tile.is_walkable(wall.position)
     assert Tile.is_visible(water.position) and not Tile.is_walkable(water.position)
 
+
+
+def test_fov_along_path_matches_single_fov():
+    for x in range(6):
+        for y in range(6):
+            Tile.create((x, y), can_walk=True, can_see=(x, y) != (3, 2))
+    path = [(0, 0), (1, 1), (2, 2), (2, 3)]
+    fields = Tile.get_fov_along_path(path, max_distance=4)
+    assert len(fields) == 4
+    for position, field in zip(path, fields):
+        assert field == set(Tile.get_fov(position, max_distance=4))
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core.change_tracker import ChangeTracker
+from dnd.core.modifiers import DamageType, NumericalModifier
+from dnd.conditions import Dodging
+from tests.test_entity import create_basic_entity
+
+
+def test_each_change_bumps_its_entity_and_block():
+    entity = create_basic_entity()
+    other = create_basic_entity()
+    other_version = ChangeTracker.get_version(other.uuid)
+
+    checks = [
+        ("health", lambda: entity.health.take_damage(1, DamageType.BLUDGEONING, uuid4())),
+        ("action_economy", lambda: entity.action_economy.consume("actions", 1)),
+        ("active_conditions", lambda: entity.add_condition(Dodging(source_entity_uuid=entity.uuid, target_entity_uuid=entity.uuid))),
+        ("position", lambda: entity.move((3, 4), update_senses=False)),
+        ("proficiency_bonus", lambda: entity.proficiency_bonus.self_static.add_value_modifier(
+            NumericalModifier.create(source_entity_uuid=entity.uuid, name="bless", value=1))),
+    ]
+    for block_name, change in checks:
+        before = ChangeTracker.get_version(entity.uuid)
+        change()
+        assert ChangeTracker.get_version(entity.uuid) > before, block_name
+        assert ChangeTracker.get_block_versions(entity.uuid)[block_name] > before, block_name
+    assert ChangeTracker.get_version(other.uuid) == other_version
+
+
+def test_reading_values_and_copies_do_not_bump_versions():
+    attacker = create_basic_entity()
+    target = create_basic_entity()
+    attacker.set_target_entity(target.uuid)
+    versions = (ChangeTracker.get_version(attacker.uuid), ChangeTracker.get_version(target.uuid))
+
+    attacker.attack_bonus()
+    attacker.ac_bonus()
+    attacker.get_target_entity(copy=True).set_target_entity(attacker.uuid)
+    assert (ChangeTracker.get_version(attacker.uuid), ChangeTracker.get_version(target.uuid)) == versions
+
+
+def test_listeners_see_the_modifier_change_they_are_told_about():
+    entity = create_basic_entity()
+    value = entity.proficiency_bonus.self_static
+    seen = []
+    listener = lambda entity_uuid, version: seen.append(value.normalized_score)
+    bless = NumericalModifier.create(source_entity_uuid=entity.uuid, name="bless", value=1)
+    before = value.normalized_score
+
+    ChangeTracker.add_listener(listener)
+    try:
+        value.add_value_modifier(bless)
+        value.remove_value_modifier(bless.uuid)
+    finally:
+        ChangeTracker.remove_listener(listener)
+    assert seen == [before + 1, before]
@@ -0,0 +1,229 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core.base_tiles import Tile
+from dnd.core.chunked_map import ChunkedTileStore, CellType
+from app.models.tile import GridSnapshot
+
+FLOOR = CellType(name="Floor", sprite_name="floor.png")
+WALL = CellType(name="Wall", sprite_name="wall.png", blocks_movement=True, blocks_vision=True)
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._hierarchical_pathfinder = None
+    yield
+    Tile.detach_store()
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._hierarchical_pathfinder = None
+
+
+def test_only_touched_chunks_are_allocated():
+    store = ChunkedTileStore(chunk_size=8)
+    store.set_cell((1, 1), FLOOR)
+    store.set_cell((10000, 5000), WALL)
+    assert store.chunk_keys() == [(0, 0), (1250, 625)]
+    assert store.get_cell((1, 1)) == FLOOR
+    assert store.get_cell((10000, 5000)) == WALL
+    assert store.get_cell((500, 500)) is None
+    assert store.extent() == (10001, 5001)
+    assert len(store.palette) == 2
+
+
+def test_save_and_open_round_trip(tmp_path):
+    store = ChunkedTileStore(chunk_size=4)
+    for x in range(10):
+        store.set_cell((x, 2), WALL if x == 5 else FLOOR)
+    path = str(tmp_path / "map.dndc")
+    store.save(path)
+
+    reopened = ChunkedTileStore.open(path)
+    assert reopened.chunk_size == 4
+    assert dict(reopened.iter_cells()) == dict(store.iter_cells())
+    assert reopened.loads == 3
+
+
+def test_chunks_are_unloaded_and_reloaded_with_their_changes(tmp_path):
+    path = str(tmp_path / "map.dndc")
+    store = ChunkedTileStore(chunk_size=4, path=path, max_loaded_chunks=2)
+    for x in range(0, 40, 4):
+        store.set_cell((x, 0), FLOOR)
+    assert len(store._chunks) == 2
+    assert store.unloads == 8
+    store.set_cell((0, 1), WALL)
+    store.flush()
+
+    reopened = ChunkedTileStore.open(path, max_loaded_chunks=2)
+    assert reopened.get_cell((0, 1)) == WALL
+    assert all(reopened.get_cell((x, 0)) == FLOOR for x in range(0, 40, 4))
+    assert len(reopened._chunks) == 2
+
+
+def test_tiles_are_materialized_from_the_store():
+    store = ChunkedTileStore(chunk_size=8)
+    store.set_cell((3, 4), WALL)
+    Tile.attach_store(store)
+
+    assert Tile._tile_by_position == {}
+    tile = Tile.get_tile_at_position((3, 4))
+    assert tile is not None and tile.blocks_movement and tile.sprite_name == "wall.png"
+    assert Tile.get_tile_at_position((3, 4)) is tile
+    assert Tile.get(tile.uuid) is tile
+
+    tile.blocks_movement = False
+    assert store.get_cell((3, 4)).blocks_movement is False
+    Tile.remove_tile_at_position((3, 4))
+    assert store.get_cell((3, 4)) is None
+
+
+def test_created_tiles_are_written_to_the_store():
+    store = ChunkedTileStore(chunk_size=8)
+    Tile.create((1, 1))
+    Tile.attach_store(store)
+    Tile.create((20, 2), can_walk=False)
+    assert store.get_cell((1, 1)).name == "Floor"
+    assert store.get_cell((20, 2)).blocks_movement
+
+
+def test_pathfinding_and_fov_read_the_store(tmp_path):
+    path = str(tmp_path / "map.dndc")
+    store = ChunkedTileStore(chunk_size=4, path=path, max_loaded_chunks=2)
+    for x in range(12):
+        for y in range(3):
+            store.set_cell((x, y), WALL if x == 6 and y < 2 else FLOOR)
+    store.flush()
+    Tile.attach_store(ChunkedTileStore.open(path, max_loaded_chunks=2))
+
+    cost, route = Tile.find_path((0, 0), (11, 0))
+    assert route[0] == (0, 0) and route[-1] == (11, 0)
+    assert (6, 2) in route
+    visible = Tile.get_fov((0, 2), max_distance=20)
+    assert (11, 2) in visible
+    assert Tile.grid_size() == (12, 3)
+    # nothing was materialized to answer the queries
+    assert Tile._tile_by_position == {}
+
+
+def test_grid_snapshot_only_visits_placed_tiles():
+    store = ChunkedTileStore(chunk_size=16)
+    store.set_cell((0, 0), FLOOR)
+    store.set_cell((99999, 99999), FLOOR)
+    Tile.attach_store(store)
+    snapshot = GridSnapshot.from_engine()
+    assert (snapshot.width, snapshot.height) == (100000, 100000)
+    assert list(snapshot.tiles) == [(0, 0), (99999, 99999)]
+
+
+def test_store_tiles_are_cached_within_a_bound():
+    store = ChunkedTileStore(chunk_size=8)
+    for x in range(20):
+        store.set_cell((x, 0), FLOOR)
+    Tile.attach_store(store)
+    Tile._materialized_cache_size = 4
+    try:
+        first = Tile.get_tile_at_position((0, 0))
+        for x in range(1, 20):
+            Tile.get_tile_at_position((x, 0))
+        assert len(Tile._materialized_tiles) == 4
+        assert Tile._tile_registry == {} and Tile._tile_by_position == {}
+        # an evicted tile keeps its uuid, can be found again and still writes to the store
+        assert Tile.get(first.uuid).position == (0, 0)
+        assert Tile.get_tile_at_position((0, 0)).uuid == first.uuid
+        first.blocks_movement = True
+        assert not Tile.is_walkable((0, 0))
+    finally:
+        Tile._materialized_cache_size = 1024
+
+
+def test_grid_reads_do_not_build_tiles():
+    store = ChunkedTileStore(chunk_size=8)
+    for x in range(16):
+        for y in range(16):
+            store.set_cell((x, y), FLOOR)
+    Tile.attach_store(store)
+    snapshot = GridSnapshot.from_engine()
+    assert len(snapshot.tiles) == 256
+    assert Tile.get_area("sphere", 10, (8, 8))
+    assert Tile.get_adjacent_positions((8, 8))
+    assert Tile._materialized_tiles == {}
+    assert snapshot.tiles[(3, 4)].uuid == Tile.get_tile_at_position((3, 4)).uuid
+
+
+def test_tile_changes_over_a_store_are_notified_once():
+    store = ChunkedTileStore(chunk_size=8)
+    store.set_cell((1, 1), FLOOR)
+    Tile.attach_store(store)
+    tile = Tile.get_tile_at_position((1, 1))
+    version = Tile.get_map_version()
+    tile.blocks_movement = True
+    assert Tile.get_map_version() == version + 1
+    Tile.create((2, 2))
+    assert Tile.get_map_version() == version + 2
+    # a write made directly to the store is notified and replaces the cached tile
+    store.set_cell((1, 1), WALL)
+    assert Tile.get_map_version() == version + 3
+    assert Tile.get_tile_at_position((1, 1)).name == "Wall"
+
+
+def test_evicted_chunks_leave_a_readable_file(tmp_path):
+    path = str(tmp_path / "map.dndc")
+    store = ChunkedTileStore(chunk_size=4, path=path, max_loaded_chunks=1)
+    for x in range(0, 12, 4):
+        store.set_cell((x, 0), FLOOR)
+    assert store.unloads == 2
+
+    # no flush, the chunks written back on eviction are readable
+    reopened = ChunkedTileStore.open(path)
+    assert reopened.chunk_keys() == [(0, 0), (1, 0)]
+    assert reopened.get_cell((4, 0)) == FLOOR
+    store.set_cell((0, 1), WALL)
+    assert ChunkedTileStore.open(path).get_cell((4, 0)) == FLOOR
+
+
+def test_rewritten_chunks_do_not_grow_the_file(tmp_path):
+    path = str(tmp_path / "map.dndc")
+    store = ChunkedTileStore(chunk_size=8, path=path)
+    sizes = []
+    for round_index in range(20):
+        for cx in range(8):
+            for cy in range(8):
+                store.set_cell((cx * 8 + round_index % 8, cy * 8), WALL if round_index % 2 else FLOOR)
+        store.flush()
+        sizes.append(os.path.getsize(path))
+    assert max(sizes[5:]) <= 2 * sizes[4]
+    reopened = ChunkedTileStore.open(path)
+    assert dict(reopened.iter_cells()) == dict(store.iter_cells())
+
+
+def test_emptied_chunks_are_freed(tmp_path):
+    path = str(tmp_path / "map.dndc")
+    store = ChunkedTileStore(chunk_size=4, path=path)
+    for x in range(0, 40, 4):
+        store.set_cell((x, 0), FLOOR)
+    store.flush()
+    full = os.path.getsize(path)
+    for x in range(4, 40, 4):
+        store.set_cell((x, 0), None)
+    store.flush()
+    assert store.chunk_keys() == [(0, 0)]
+    assert os.path.getsize(path) < full
+    assert ChunkedTileStore.open(path).chunk_keys() == [(0, 0)]
+
+
+def test_flush_writes_the_index_once(tmp_path, monkeypatch):
+    store = ChunkedTileStore(chunk_size=4, path=str(tmp_path / "map.dndc"))
+    for x in range(0, 400, 4):
+        store.set_cell((x, 0), FLOOR)
+    writes = []
+    original = ChunkedTileStore._write_index
+    monkeypatch.setattr(ChunkedTileStore, "_write_index", lambda self, file: writes.append(1) or original(self, file))
+    store.flush()
+    assert len(writes) == 1
+    assert len(ChunkedTileStore.open(store.path).chunk_keys()) == 100
@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core.base_tiles import Tile
+from dnd.core.dijkstra import dijkstra
+from dnd.core.distance_field import compute_distance_field
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._distance_field_cache.clear()
+    yield
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._distance_field_cache.clear()
+
+
+def build_grid(width, height, walls=(), costs=None):
+    costs = costs or {}
+    for x in range(width):
+        for y in range(height):
+            Tile.create((x, y), can_walk=(x, y) not in walls, can_see=(x, y) not in walls,
+                        movement_cost=costs.get((x, y), 1))
+
+
+def test_field_matches_forward_dijkstra():
+    walls = {(2, 0), (2, 1), (2, 2), (2, 3)}
+    costs = {(1, 4): 3, (3, 4): 2}
+    build_grid(5, 5, walls, costs)
+    goal = (4, 0)
+    field = Tile.get_distance_field(goal)
+
+    for start in [(0, 0), (0, 4), (1, 2), (3, 3)]:
+        distances, paths = Tile.get_paths(start)
+        assert field.cost_to_goal(start) == distances[goal]
+        path = field.path_to_goal(start)
+        assert path[0] == start and path[-1] == goal
+        assert sum(Tile.get_tile_at_position(step).movement_cost for step in path[1:]) == distances[goal]
+
+    assert field.cost_to_goal(goal) == 0
+    assert field.next_step(goal) is None
+    assert (2, 0) not in field
+
+
+def test_multi_source_picks_closest_goal():
+    width = height = 6
+    is_walkable = lambda x, y: True
+    goals = [(0, 0), (5, 5)]
+
+    distances, next_steps = compute_distance_field(goals, is_walkable, width, height)
+
+    for x in range(width):
+        for y in range(height):
+            expected = min(dijkstra((x, y), is_walkable, width, height)[0][goal] for goal in goals)
+            assert distances[(x, y)] == expected
+    assert next_steps[(1, 1)] == (0, 0)
+    assert next_steps[(4, 4)] == (5, 5)
+
+
+def test_max_distance_and_unwalkable_goals():
+    is_walkable = lambda x, y: (x, y) != (3, 3)
+
+    distances, _ = compute_distance_field([(0, 0)], is_walkable, 5, 5, max_distance=2)
+    assert distances[(2, 0)] == 2
+    assert (2, 2) not in distances  # diagonal epsilon pushes it just past the limit, as in dijkstra
+    assert (3, 0) not in distances
+
+    distances, next_steps = compute_distance_field([(3, 3)], is_walkable, 5, 5)
+    assert distances == {} and next_steps == {}
+
+
+def test_field_is_cached_per_goal_set_and_map_version():
+    build_grid(4, 4)
+    field = Tile.get_distance_field([(0, 0), (3, 3)])
+    assert Tile.get_distance_field([(3, 3), (0, 0)]) is field
+    assert Tile.get_distance_field((0, 0)) is not field
+
+    Tile.get_tile_at_position((1, 1)).movement_cost = 4
+    updated = Tile.get_distance_field([(0, 0), (3, 3)])
+    assert updated is not field
+    assert updated.map_version > field.map_version
+
+    Tile.remove_tile_at_position((0, 1))
+    assert Tile.get_distance_field([(0, 0), (3, 3)]) is not updated
+    assert Tile.get_tile_at_position((0, 1)) is None
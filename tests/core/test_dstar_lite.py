@@ -0,0 +1,187 @@
+import random
+import sys
+from uuid import uuid4
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core.base_tiles import Tile
+from dnd.core.dijkstra import dijkstra, shortest_path_tree
+from dnd.core.dstar_lite import DStarLite, IncrementalPathTree
+from dnd.entity import Entity
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    yield
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+
+
+def path_cost(path, cost):
+    return sum(cost(*step) for step in path[1:])
+
+
+def test_matches_dijkstra_and_repairs_after_changes():
+    rng = random.Random(7)
+    width = height = 12
+    walls = {(x, y) for x in range(width) for y in range(height) if rng.random() < 0.2}
+    costs = {(x, y): rng.choice([1, 1, 1, 2, 3]) for x in range(width) for y in range(height)}
+    start, goal = (0, 0), (11, 11)
+    walls -= {start, goal}
+
+    is_walkable = lambda x, y: 0 <= x < width and 0 <= y < height and (x, y) not in walls
+    cost = lambda x, y: costs[(x, y)]
+    query = DStarLite(start, goal, is_walkable, cost=cost)
+
+    for _ in range(6):
+        distances, _ = dijkstra(start, is_walkable, width, height, cost=cost)
+        path = query.get_path()
+        if goal in distances:
+            assert path[0] == start and path[-1] == goal
+            assert path_cost(path, cost) == distances[goal]
+        else:
+            assert path == []
+        cell = (rng.randrange(width), rng.randrange(height))
+        if cell in (start, goal):
+            continue
+        walls ^= {cell}
+        query.notify_cell_changed(cell)
+
+
+def test_moving_start_reuses_search():
+    width = height = 10
+    is_walkable = lambda x, y: 0 <= x < width and 0 <= y < height
+    query = DStarLite((0, 0), (9, 9), is_walkable)
+    path = query.get_path()
+    assert len(path) == 10
+    expanded = query.expanded
+
+    query.move_start(path[3])
+    new_path = query.get_path()
+    assert new_path == path[3:]
+    assert query.expanded - expanded < expanded
+
+
+def test_unreachable_goal():
+    is_walkable = lambda x, y: 0 <= x < 5 and 0 <= y < 5 and x != 2
+    query = DStarLite((0, 0), (4, 4), is_walkable)
+    assert query.get_path() == []
+    assert query.get_cost() is None
+
+
+def test_tile_path_query_is_repaired_on_tile_changes():
+    for x in range(5):
+        for y in range(3):
+            Tile.create((x, y))
+    query = Tile.create_path_query((0, 1), (4, 1))
+    assert query.get_path() == [(0, 1), (1, 1), (2, 1), (3, 1), (4, 1)]
+
+    # a wall collapses in the middle of the corridor
+    Tile.get_tile_at_position((2, 1)).blocks_movement = True
+    detour = query.get_path()
+    assert (2, 1) not in detour and detour[-1] == (4, 1)
+    assert len(detour) == 5
+
+    # the rest of the column too, the goal becomes unreachable
+    Tile.get_tile_at_position((2, 0)).blocks_movement = True
+    Tile.remove_tile_at_position((2, 2))
+    assert query.get_path() == []
+
+    # the door opens again
+    Tile.get_tile_at_position((2, 1)).blocks_movement = False
+    assert query.get_path() == [(0, 1), (1, 1), (2, 1), (3, 1), (4, 1)]
+
+    Tile.release_path_query(query)
+    assert query not in Tile._path_queries
+
+
+def test_path_tree_matches_shortest_path_tree_after_changes():
+    rng = random.Random(11)
+    width = height = 16
+    walls = {(x, y) for x in range(width) for y in range(height) if rng.random() < 0.2}
+    costs = {(x, y): rng.choice([1, 1, 1, 2, 3]) for x in range(width) for y in range(height)}
+
+    def is_walkable(x, y):
+        return 0 <= x < width and 0 <= y < height and (x, y) not in walls
+
+    def cost(x, y):
+        return costs[(x, y)]
+
+    tree = IncrementalPathTree((8, 8), is_walkable, cost=cost)
+    for round_index in range(20):
+        max_distance = (4, 8, None)[round_index % 3]
+        assert tree.get_tree(max_distance) == shortest_path_tree((8, 8), is_walkable, width, height,
+                                                                 max_distance=max_distance, cost=cost)
+        for _ in range(3):
+            cell = (rng.randrange(width), rng.randrange(height))
+            walls.symmetric_difference_update({cell})
+            costs[cell] = rng.choice([1, 2, 3])
+            tree.notify_cell_changed(cell)
+
+
+def test_tile_path_tree_is_repaired_instead_of_recomputed():
+    for x in range(21):
+        for y in range(21):
+            Tile.create((x, y))
+    _, predecessors = Tile.get_path_tree((10, 10), 10)
+    tree = Tile._path_trees[(10, 10)]
+    full_search = tree.expanded
+
+    # a door at the edge of the area closes, only the cells behind it are searched again
+    Tile.get_tile_at_position((19, 10)).blocks_movement = True
+    distances, repaired = Tile.get_path_tree((10, 10), 10)
+    assert tree.expanded - full_search < full_search // 10
+    assert (19, 10) not in repaired and (18, 10) in repaired
+    assert (distances, repaired) == shortest_path_tree((10, 10), lambda x, y: Tile.is_walkable((x, y)), 21, 21,
+                                                       max_distance=10)
+
+
+def test_entity_senses_follow_a_door_through_the_live_tree():
+    for x in range(7):
+        for y in range(3):
+            Tile.create((x, y), can_walk=y != 1 or x != 3, can_see=True)
+    watcher = Entity.create(uuid4())
+    # a path is kept once every cell of it was seen, i.e. from the second refresh on
+    watcher.update_entity_senses()
+    watcher.update_entity_senses()
+    assert (6, 1) in watcher.senses.paths and (3, 1) not in watcher.senses.paths
+
+    Tile.get_tile_at_position((3, 1)).blocks_movement = False
+    assert watcher in Entity.update_entities_senses_around((3, 1))
+    assert watcher.senses.paths[(3, 1)] == [(0, 0), (1, 0), (2, 0), (3, 1)]
+    assert (0, 0) in Tile._path_trees
+
+
+def test_path_tree_skips_unreached_cells_and_resets_after_bulk_changes():
+    walls = set()
+
+    def is_walkable(x, y):
+        return 0 <= x < 40 and 0 <= y < 40 and (x, y) not in walls
+
+    tree = IncrementalPathTree((0, 0), is_walkable)
+    tree.get_tree(3)
+    tree.notify_cell_changed((30, 30))
+    assert tree._changed_cells == set()
+
+    for x in range(40):
+        for y in range(1, 40, 2):
+            walls.add((x, y))
+            tree.notify_cell_changed((x, y))
+    assert len(tree._changed_cells) <= max(64, tree.cell_count() // 4)
+    assert tree.get_tree(6) == shortest_path_tree((0, 0), is_walkable, 40, 40, max_distance=6)
+
+
+def test_tile_path_trees_stay_within_the_cell_budget(monkeypatch):
+    for x in range(21):
+        for y in range(21):
+            Tile.create((x, y))
+    monkeypatch.setattr(Tile, "_path_tree_cache_cells", 1000)
+    for x in range(0, 21, 5):
+        Tile.get_path_tree((x, 10))
+    assert sum(tree.cell_count() for tree in Tile._path_trees.values()) <= 1000
+    assert list(Tile._path_trees)[-1] == (20, 10)
+    assert set(Tile._path_trees.values()) <= set(Tile._path_queries)
@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.actions import AttackEvent
+from dnd.core.dice import AttackOutcome, DiceRoll, RollType
+from dnd.core.event_export import (
+    CATEGORIES, MISSING, decode_uuid, export_events_npy, export_events_npz, iter_exported_chunks, load_exported_events,
+)
+from dnd.core.events import Damage, Event, EventPhase, EventQueue, EventType, WeaponSlot
+from dnd.core.modifiers import DamageType
+from dnd.core.values import AdvantageStatus, AutoHitStatus, CriticalStatus
+
+
+def _roll(source, target, roll_type, total):
+    return DiceRoll(dice_uuid=uuid4(), roll_type=roll_type, results=total, total=total, bonus=0,
+                    advantage_status=AdvantageStatus.NONE, critical_status=CriticalStatus.NONE,
+                    auto_hit_status=AutoHitStatus.NONE, source_entity_uuid=source, target_entity_uuid=target)
+
+
+def _store_fight():
+    source, target = uuid4(), uuid4()
+    moves = [Event(event_type=EventType.MOVEMENT, source_entity_uuid=source) for _ in range(4)]
+    damages = [
+        Damage(source_entity_uuid=source, target_entity_uuid=target, damage_dice=6, dice_numbers=1, damage_type=damage_type)
+        for damage_type in (DamageType.SLASHING, DamageType.FIRE)
+    ]
+    attack = AttackEvent(source_entity_uuid=source, target_entity_uuid=target, weapon_slot=WeaponSlot.MAIN_HAND,
+                         phase=EventPhase.COMPLETION, dice_roll=_roll(source, target, RollType.ATTACK, 17),
+                         attack_outcome=AttackOutcome.HIT, damages=damages,
+                         damage_rolls=[_roll(source, target, RollType.DAMAGE, 4), _roll(source, target, RollType.DAMAGE, 2)])
+    return moves, attack
+
+
+def _check(events, damages, moves, attack):
+    assert len(events) == len(moves) + 1
+    assert list(events["sequence"]) == list(range(1, EventQueue.get_last_sequence() + 1))
+    row = events[-1]
+    assert list(CATEGORIES["event_type"])[row["event_type"]] == EventType.ATTACK
+    assert decode_uuid(row["source_entity_uuid"]) == attack.source_entity_uuid
+    assert decode_uuid(row["target_entity_uuid"]) == attack.target_entity_uuid
+    assert (row["dice_total"], row["damage_total"]) == (17, 6)
+    assert list(CATEGORIES["attack_outcome"])[row["attack_outcome"]] == AttackOutcome.HIT
+    assert row["timestamp"] == np.datetime64(attack.timestamp, "us")
+    assert decode_uuid(events[0]["target_entity_uuid"]) is None
+    assert events[0]["dice_total"] == MISSING and events[0]["attack_outcome"] == -1
+    assert list(damages["total"]) == [4, 2]
+    assert set(damages["sequence"]) == {row["sequence"]}
+
+
+def test_npz_export_round_trips_in_chunks(tmp_path):
+    moves, attack = _store_fight()
+    path = tmp_path / "events.npz"
+    assert export_events_npz(str(path), chunk_size=2) == 5
+    assert len(list(iter_exported_chunks(str(path)))) == 3
+    with np.load(path) as archive:
+        assert list(archive["event_type_values"]) == [value.value for value in EventType]
+    _check(*load_exported_events(str(path)), moves, attack)
+
+
+def test_npy_export_is_memory_mappable_and_resumes_after_a_cursor(tmp_path):
+    moves, attack = _store_fight()
+    directory = tmp_path / "events"
+    assert export_events_npy(str(directory), chunk_size=3) == 5
+    events, _ = next(iter_exported_chunks(str(directory)))
+    assert isinstance(events, np.memmap)
+    _check(*load_exported_events(str(directory)), moves, attack)
+
+    assert export_events_npy(str(tmp_path / "tail"), after=4) == 1
+    events, damages = load_exported_events(str(tmp_path / "tail"))
+    assert list(events["sequence"]) == [5] and len(damages) == 2
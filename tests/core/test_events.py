@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta
 from uuid import uuid4, UUID
 import pytest
 
@@ -34,6 +35,7 @@ def clear_event_queue():
     EventQueue._event_handlers_by_trigger.clear()
     EventQueue._event_handlers_by_simple_trigger.clear()
     EventQueue._event_handlers_by_source_entity_uuid.clear()
+    EventQueue._routed_handlers.clear()
     yield
 
 
@@ -624,3 +626,110 @@ def test_d20_get_dc_and_range_str():
     dice = dmg.get_dice(AttackOutcome.HIT)
     assert dice.count == 2 and dice.value == 6 and dice.bonus is bonus
 
+
+
+def test_events_page_combines_filters_and_follows_the_cursor():
+    source = uuid4()
+    target = uuid4()
+    stored = [
+        Event(event_type=EventType.ATTACK if index % 2 else EventType.MOVEMENT, source_entity_uuid=source,
+              target_entity_uuid=target if index % 3 == 0 else None)
+        for index in range(10)
+    ]
+    Event(event_type=EventType.ATTACK, source_entity_uuid=uuid4(), target_entity_uuid=target)
+
+    page, cursor, has_more = EventQueue.get_events_page(limit=2, event_types=[EventType.ATTACK], source_entity_uuid=source)
+    assert [event for _, event in page] == [stored[1], stored[3]]
+    assert has_more and cursor == page[-1][0]
+
+    rest, cursor, has_more = EventQueue.get_events_page(after=cursor, event_types=[EventType.ATTACK], source_entity_uuid=source)
+    assert [event for _, event in rest] == [stored[5], stored[7], stored[9]]
+    assert not has_more and cursor == EventQueue.get_last_sequence()
+
+    targeted, _, _ = EventQueue.get_events_page(target_entity_uuid=target, source_entity_uuid=source,
+                                                event_types=[EventType.ATTACK, EventType.MOVEMENT])
+    assert [event for _, event in targeted] == [stored[0], stored[3], stored[6], stored[9]]
+
+    later = stored[0].phase_to(EventPhase.EXECUTION)
+    newer, _, _ = EventQueue.get_events_page(after=cursor, phases=[EventPhase.EXECUTION])
+    assert [event for _, event in newer] == [later]
+
+
+def test_query_plans_on_the_most_selective_index_and_bounds_time():
+    source = uuid4()
+    round_start = datetime.now() + timedelta(seconds=1)
+    noisy = [Event(event_type=EventType.MOVEMENT, source_entity_uuid=source, timestamp=round_start - timedelta(seconds=1))
+             for _ in range(20)]
+    attack = Event(event_type=EventType.ATTACK, source_entity_uuid=source, timestamp=round_start)
+    completed = attack.phase_to(EventPhase.COMPLETION)
+    Event(event_type=EventType.ATTACK, source_entity_uuid=uuid4())
+
+    name, size, _ = EventQueue._plan_query(0, EventQueue.get_last_sequence(), {EventType.ATTACK}, None, source, None, None)
+    assert (name, size) == ("source_type", 2)
+    name, size, _ = EventQueue._plan_query(0, EventQueue.get_last_sequence(), None, {EventPhase.COMPLETION}, source, None, attack.lineage_uuid)
+    assert (name, size) == ("lineage_phase", 1)
+
+    found = EventQueue.query(event_types=[EventType.ATTACK], phases=[EventPhase.COMPLETION], source_entity_uuid=source)
+    assert [event for _, event in found] == [completed]
+
+    since_round = EventQueue.query(source_entity_uuid=source, start_time=round_start)
+    assert [event for _, event in since_round] == [attack, completed]
+    before_round = [event for _, event in EventQueue.query(source_entity_uuid=source, end_time=noisy[-1].timestamp)]
+    assert before_round == noisy
+
+
+def test_routed_handlers_only_receive_the_events_routed_to_them():
+    mover, guard, bystander = uuid4(), uuid4(), uuid4()
+    trigger = Trigger(event_type=EventType.CAST_SPELL, event_phase=EventPhase.DECLARATION)
+    calls = []
+
+    def processor(event, source_entity_uuid):
+        calls.append(source_entity_uuid)
+        return event
+
+    handlers = {owner: EventHandler(source_entity_uuid=owner, target_entity_uuid=owner, trigger_conditions=[trigger],
+                                    event_processor=processor, routed=True) for owner in (guard, bystander)}
+    EventQueue.set_router(trigger, lambda event: {guard} if event.source_entity_uuid == mover else set())
+    for handler in handlers.values():
+        EventQueue.add_event_handler(handler)
+    try:
+        Event(event_type=EventType.CAST_SPELL, source_entity_uuid=mover, target_entity_uuid=mover)
+        Event(event_type=EventType.CAST_SPELL, source_entity_uuid=bystander, target_entity_uuid=mover)
+        assert calls == [guard]
+
+        handlers[guard].remove()
+        Event(event_type=EventType.CAST_SPELL, source_entity_uuid=mover, target_entity_uuid=mover)
+        assert calls == [guard]
+        assert EventQueue._routed_handlers[trigger] == {bystander: [handlers[bystander]]}
+    finally:
+        EventQueue._routers.pop(trigger, None)
+
+
+def test_routed_handlers_are_dispatched_in_registration_order():
+    mover, first, last = uuid4(), uuid4(), uuid4()
+    trigger = Trigger(event_type=EventType.CAST_SPELL, event_phase=EventPhase.DECLARATION)
+    calls = []
+
+    def processor(event, source_entity_uuid):
+        calls.append(source_entity_uuid)
+        return event
+
+    EventQueue.set_router(trigger, lambda event: {first, last})
+    try:
+        for owner, routed in ((first, True), (mover, False), (last, True)):
+            EventQueue.add_event_handler(EventHandler(source_entity_uuid=owner, target_entity_uuid=owner,
+                                                      trigger_conditions=[trigger], event_processor=processor, routed=routed))
+        Event(event_type=EventType.CAST_SPELL, source_entity_uuid=mover, target_entity_uuid=mover)
+        assert calls == [first, mover, last]
+    finally:
+        EventQueue._routers.pop(trigger, None)
+
+
+def test_routed_handlers_need_a_router():
+    owner = uuid4()
+    trigger = Trigger(event_type=EventType.CAST_SPELL, event_phase=EventPhase.DECLARATION)
+    handler = EventHandler(source_entity_uuid=owner, target_entity_uuid=owner, trigger_conditions=[trigger],
+                           event_processor=lambda event, source_entity_uuid: event, routed=True)
+    with pytest.raises(ValueError):
+        EventQueue.add_event_handler(handler)
+    assert handler.uuid not in EventQueue._event_handlers
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core.grid_mask import GridWindow, reframe, crop, chains_all_set
+
+
+def test_window_indexing_round_trip():
+    window = GridWindow.enclosing([(-2, 3), (4, 7)])
+    assert window == GridWindow(-2, 3, 7, 5)
+    for position in [(-2, 3), (4, 7), (0, 5)]:
+        assert window.position(window.flat_index(position)) == position
+    assert window.flat_index((5, 5)) == -1
+
+
+def test_reframe_and_crop_keep_values_in_place():
+    window = GridWindow(1, 1, 2, 2)
+    array = np.array([[1, 2], [3, 4]])
+    bigger = GridWindow(0, 0, 4, 4)
+    grown = reframe(array, window, bigger, 0)
+    assert grown[1, 1] == 1 and grown[2, 2] == 4 and grown.sum() == 10
+    assert crop(grown, bigger, GridWindow(2, 2, 3, 3), -1).tolist() == [[4, 0, -1], [0, 0, -1], [-1, -1, -1]]
+
+
+def test_chains_all_set():
+    # 0 is the root, 1 -> 0, 2 -> 1, 3 -> 2, 4 is outside the tree
+    predecessors = np.array([0, 0, 1, 2, -1])
+    mask = np.array([True, True, False, True, True])
+    assert chains_all_set(mask, predecessors).tolist() == [True, True, False, False, False]
@@ -0,0 +1,136 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core.base_tiles import Tile, PathStrategy
+from dnd.core.dijkstra import dijkstra
+from dnd.core.hierarchical import HierarchicalPathfinder
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._hierarchical_pathfinder = None
+    yield
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._hierarchical_pathfinder = None
+
+
+def assert_valid_path(path, start, goal, is_walkable):
+    assert path[0] == start and path[-1] == goal
+    for a, b in zip(path, path[1:]):
+        assert max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1
+        assert is_walkable(*b)
+
+
+def test_paths_are_valid_and_near_optimal():
+    rng = random.Random(3)
+    width = height = 40
+    walls = {(x, y) for x in range(width) for y in range(height) if rng.random() < 0.15}
+    is_walkable = lambda x, y: 0 <= x < width and 0 <= y < height and (x, y) not in walls
+    pathfinder = HierarchicalPathfinder(is_walkable, cluster_size=8)
+
+    checked = 0
+    while checked < 20:
+        start = (rng.randrange(width), rng.randrange(height))
+        goal = (rng.randrange(width), rng.randrange(height))
+        if not is_walkable(*start) or not is_walkable(*goal):
+            continue
+        distances, _ = dijkstra(start, is_walkable, width, height)
+        cost, path = pathfinder.find_path(start, goal)
+        if goal not in distances:
+            assert cost is None and path == []
+            continue
+        assert_valid_path(path, start, goal, is_walkable)
+        assert cost == len(path) - 1
+        assert distances[goal] <= cost <= distances[goal] * 1.5 + 2
+        checked += 1
+
+
+def test_same_cluster_and_trivial_queries():
+    is_walkable = lambda x, y: 0 <= x < 10 and 0 <= y < 10
+    pathfinder = HierarchicalPathfinder(is_walkable, cluster_size=5)
+    assert pathfinder.find_path((1, 1), (1, 1)) == (0, [(1, 1)])
+    assert pathfinder.find_path((1, 1), (3, 3)) == (2, [(1, 1), (2, 2), (3, 3)])
+    assert pathfinder.find_path((1, 1), (20, 20)) == (None, [])
+
+
+def test_tile_find_path_strategies_and_local_updates():
+    for x in range(20):
+        for y in range(6):
+            Tile.create((x, y))
+    Tile._hierarchical_cluster_size = 4
+    try:
+        cost, path = Tile.find_path((0, 0), (19, 0), strategy=PathStrategy.HIERARCHICAL)
+        assert cost == 19 and path[-1] == (19, 0)
+        assert Tile.find_path((0, 0), (19, 0)) == (19, [(x, 0) for x in range(20)])
+
+        pathfinder = Tile.get_hierarchical_pathfinder()
+        cached_clusters = set(pathfinder._intra_edges)
+        # a wall with a single gap appears across the map
+        for y in range(6):
+            if y != 5:
+                Tile.get_tile_at_position((10, y)).blocks_movement = True
+        cost, path = Tile.find_path((0, 0), (19, 0), strategy=PathStrategy.HIERARCHICAL)
+        assert (10, 5) in path and all(step[0] != 10 or step == (10, 5) for step in path)
+        exact_cost, _ = Tile.find_path((0, 0), (19, 0))
+        assert exact_cost <= cost
+        # clusters far from the change kept their cached edges
+        assert (0, 0) in cached_clusters and (0, 0) in pathfinder._intra_edges
+    finally:
+        Tile._hierarchical_cluster_size = 16
+
+
+def test_diagonal_crossings_connect_clusters():
+    for walkable in ({(1, 1), (2, 2)}, {(1, 0), (2, 1)}, {(2, 1), (1, 2)}, {(0, 1), (1, 2)}):
+        is_walkable = lambda x, y, walkable=walkable: (x, y) in walkable
+        start, goal = sorted(walkable)
+        pathfinder = HierarchicalPathfinder(is_walkable, cluster_size=2)
+        assert pathfinder.find_path(start, goal) == (1, [start, goal])
+        assert pathfinder.find_path(goal, start) == (1, [goal, start])
+
+
+@pytest.mark.parametrize("cluster_size", [2, 3, 4, 8])
+def test_reachability_matches_dijkstra(cluster_size):
+    rng = random.Random(cluster_size)
+    for _ in range(30):
+        width, height = rng.randint(4, 24), rng.randint(4, 24)
+        density = rng.choice([0.3, 0.45, 0.6])
+        walls = {(x, y) for x in range(width) for y in range(height) if rng.random() < density}
+        is_walkable = lambda x, y: 0 <= x < width and 0 <= y < height and (x, y) not in walls
+        floor = [(x, y) for x in range(width) for y in range(height) if (x, y) not in walls]
+        if len(floor) < 2:
+            continue
+        # no grid size, so no flat fallback: the abstract graph alone has to find every path
+        pathfinder = HierarchicalPathfinder(is_walkable, cluster_size=cluster_size)
+        for _ in range(10):
+            start, goal = rng.sample(floor, 2)
+            distances, _ = dijkstra(start, is_walkable, width, height)
+            cost, path = pathfinder.find_path(start, goal)
+            if goal not in distances:
+                assert (cost, path) == (None, [])
+                continue
+            assert cost is not None
+            assert_valid_path(path, start, goal, is_walkable)
+            assert cost == len(path) - 1 >= distances[goal]
+
+
+def test_grid_size_enables_exact_short_queries_and_fallback():
+    rng = random.Random(5)
+    width = height = 30
+    walls = {(x, y) for x in range(width) for y in range(height) if rng.random() < 0.35}
+    is_walkable = lambda x, y: 0 <= x < width and 0 <= y < height and (x, y) not in walls
+    floor = [(x, y) for x in range(width) for y in range(height) if (x, y) not in walls]
+    pathfinder = HierarchicalPathfinder(is_walkable, cluster_size=8, grid_size=lambda: (width, height))
+    for _ in range(50):
+        start, goal = rng.sample(floor, 2)
+        if max(abs(start[0] - goal[0]), abs(start[1] - goal[1])) >= 16:
+            continue
+        distances, _ = dijkstra(start, is_walkable, width, height)
+        cost, path = pathfinder.find_path(start, goal)
+        assert cost == distances.get(goal)
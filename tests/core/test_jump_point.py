@@ -0,0 +1,67 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core.base_tiles import Tile, PathStrategy
+from dnd.core.dijkstra import dijkstra
+from dnd.core.jump_point import JumpPointSearch, jump_point_search
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    yield
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+
+
+def epsilon_cost(path, cost):
+    return sum(cost(*b) + (0.001 if a[0] != b[0] and a[1] != b[1] else 0) for a, b in zip(path, path[1:]))
+
+
+def test_same_costs_as_dijkstra():
+    rng = random.Random(5)
+    for trial in range(60):
+        width, height = rng.randint(4, 20), rng.randint(4, 20)
+        walls = {(rng.randrange(width), rng.randrange(height)) for _ in range(width * height // 4)}
+        heavy = {(rng.randrange(width), rng.randrange(height)): rng.randint(2, 4) for _ in range(trial % 8)}
+        is_walkable = lambda x, y: 0 <= x < width and 0 <= y < height and (x, y) not in walls
+        cost = lambda x, y: heavy.get((x, y), 1)
+        start = (rng.randrange(width), rng.randrange(height))
+        goal = (rng.randrange(width), rng.randrange(height))
+        walls.discard(start)
+
+        distances, paths = dijkstra(start, is_walkable, width, height, cost=cost)
+        found_cost, path = jump_point_search(start, goal, is_walkable, cost=cost)
+        if goal not in distances:
+            assert found_cost is None and path == []
+            continue
+        assert found_cost == distances[goal]
+        assert epsilon_cost(path, cost) == pytest.approx(epsilon_cost(paths[goal], cost))
+        assert path[0] == start and path[-1] == goal
+        for a, b in zip(path, path[1:]):
+            assert max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1 and is_walkable(*b)
+
+
+def test_open_floor_expands_few_nodes():
+    is_walkable = lambda x, y: 0 <= x < 100 and 0 <= y < 100 and (x, y) != (50, 40)
+    search = JumpPointSearch(is_walkable)
+    found_cost, path = search.find_path((0, 0), (99, 60))
+    assert found_cost == 99
+    assert len(path) == 100
+    assert search.expanded < 20
+
+
+def test_tile_find_path_jump_point_strategy():
+    for x in range(10):
+        for y in range(5):
+            Tile.create((x, y), can_walk=(x != 5 or y == 4))
+    Tile.get_tile_at_position((2, 2)).movement_cost = 3
+    expected = Tile.find_path((0, 2), (9, 2))
+    found = Tile.find_path((0, 2), (9, 2), strategy=PathStrategy.JUMP_POINT)
+    assert found[0] == expected[0]
+    assert (5, 4) in found[1]
@@ -0,0 +1,91 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core.base_tiles import Tile
+from dnd.core.line_of_sight import supercover_line, has_line_of_sight
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._line_of_sight_cache.clear()
+    yield
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._line_of_sight_cache.clear()
+
+
+def build_grid(width, height, walls=()):
+    for x in range(width):
+        for y in range(height):
+            Tile.create((x, y), can_walk=(x, y) not in walls, can_see=(x, y) not in walls)
+
+
+def test_supercover_line_is_connected_and_ends_on_target():
+    steps = supercover_line((0, 0), (5, 2))
+    assert steps[-1] == ((5, 2),)
+    previous = (0, 0)
+    for step in steps:
+        cell = step[-1]
+        assert max(abs(cell[0] - previous[0]), abs(cell[1] - previous[1])) == 1
+        previous = cell
+
+
+def test_supercover_line_reports_corners():
+    assert supercover_line((0, 0), (2, 2)) == [((1, 0), (0, 1)), ((1, 1),), ((2, 1), (1, 2)), ((2, 2),)]
+
+
+def test_line_of_sight_is_symmetric():
+    rng = random.Random(3)
+    blocking = {(rng.randrange(12), rng.randrange(12)) for _ in range(30)}
+    is_blocking = lambda x, y: (x, y) in blocking
+    for _ in range(300):
+        a = (rng.randrange(12), rng.randrange(12))
+        b = (rng.randrange(12), rng.randrange(12))
+        assert has_line_of_sight(a, b, is_blocking) == has_line_of_sight(b, a, is_blocking)
+
+
+def test_corner_blocks_only_when_both_sides_are_opaque():
+    assert has_line_of_sight((0, 0), (2, 2), lambda x, y: (x, y) == (1, 0))
+    assert not has_line_of_sight((0, 0), (2, 2), lambda x, y: (x, y) in {(1, 0), (0, 1)})
+
+
+def test_tile_line_of_sight_and_target_wall():
+    build_grid(7, 3, walls={(3, 0), (3, 1)})
+    assert not Tile.has_line_of_sight((0, 0), (6, 0))
+    assert Tile.has_line_of_sight((0, 2), (6, 2))
+    # the wall itself can be seen
+    assert Tile.has_line_of_sight((0, 0), (3, 0))
+
+
+def test_line_of_sight_cache_follows_the_map_version():
+    build_grid(7, 1, walls={(3, 0)})
+    assert not Tile.has_line_of_sight((0, 0), (6, 0))
+    assert len(Tile._line_of_sight_cache) == 1
+    assert not Tile.has_line_of_sight((6, 0), (0, 0))
+    assert len(Tile._line_of_sight_cache) == 1
+    Tile.get_tile_at_position((3, 0)).blocks_vision = False
+    assert Tile.has_line_of_sight((0, 0), (6, 0))
+
+
+def test_line_of_sight_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(Tile, "_line_of_sight_cache_size", 5)
+    build_grid(10, 10)
+    for x in range(10):
+        Tile.has_line_of_sight((0, 0), (x, 9))
+    assert len(Tile._line_of_sight_cache) == 5
+
+
+def test_line_of_sight_many_matches_single_checks():
+    walls = {(4, y) for y in range(2, 8)}
+    build_grid(10, 10, walls=walls)
+    targets = [(x, y) for x in range(10) for y in range(10)]
+    batch = Tile.has_line_of_sight_many((1, 5), targets)
+    Tile._line_of_sight_cache.clear()
+    assert batch == {target: Tile.has_line_of_sight((1, 5), target) for target in targets}
+    assert batch[(8, 5)] is False and batch[(4, 0)] is True
@@ -0,0 +1,133 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core.base_tiles import Tile, floor_factory, wall_factory
+from dnd.core.chunked_map import ChunkedTileStore
+from dnd.core.map_io import MapGrid, DEFAULT_LEGEND
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._hierarchical_pathfinder = None
+    yield
+    Tile.detach_store()
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._hierarchical_pathfinder = None
+
+
+ROOM = """\
+#####
+#..~#
+#...#
+## ##
+"""
+
+
+def test_ascii_import_places_tiles():
+    grid = MapGrid.from_ascii(ROOM, x0=10, y0=20)
+    assert (grid.width, grid.height) == (5, 4)
+    Tile.load_grid(grid, chunk_size=4)
+
+    assert Tile.get_tile_at_position((11, 21)).name == "Floor"
+    assert Tile.get_tile_at_position((13, 21)).sprite_name == "water.png"
+    assert Tile.get_tile_at_position((12, 23)) is None
+    assert not Tile.is_walkable((10, 20))
+    assert Tile.is_walkable((12, 22))
+    assert Tile.grid_size() == (15, 24)
+
+
+def test_ascii_import_rejects_unknown_characters():
+    with pytest.raises(ValueError, match="'x'"):
+        MapGrid.from_ascii("..x.")
+
+
+def test_binary_round_trip(tmp_path):
+    grid = MapGrid.from_ascii(ROOM)
+    path = str(tmp_path / "room.dndm")
+    grid.save(path)
+    loaded = MapGrid.load(path)
+    assert np.array_equal(loaded.cells, grid.cells)
+    assert loaded.palette == grid.palette
+    assert loaded.get_cell((3, 1)) == DEFAULT_LEGEND["~"]
+
+    with pytest.raises(ValueError):
+        MapGrid.from_bytes(b"DNDC" + bytes(40))
+
+
+def test_load_grid_replaces_the_map_and_exports_back():
+    floor_factory((0, 0))
+    wall_factory((50, 50))
+    Tile.load_grid(MapGrid.from_ascii(".#\n.."), chunk_size=8)
+    assert Tile.get_tile_at_position((50, 50)) is None
+    assert Tile.get_tile_at_position((1, 0)).name == "Wall"
+
+    Tile.get_tile_at_position((0, 1)).blocks_movement = True
+    exported = Tile.export_grid()
+    assert (exported.x0, exported.y0, exported.width, exported.height) == (0, 0, 2, 2)
+    assert exported.get_cell((0, 1)).blocks_movement
+    assert exported.get_cell((0, 0)) == DEFAULT_LEGEND["."]
+
+
+def test_export_without_a_store_packs_the_registered_tiles():
+    floor_factory((3, 4))
+    wall_factory((5, 4))
+    exported = Tile.export_grid()
+    assert (exported.x0, exported.y0, exported.width, exported.height) == (3, 4, 3, 1)
+    assert exported.get_cell((4, 4)) is None
+    assert exported.get_cell((5, 4)).blocks_vision
+
+
+def test_to_store_keeps_cells_outside_the_grid():
+    store = ChunkedTileStore(chunk_size=4)
+    store.set_cell((0, 0), DEFAULT_LEGEND["#"])
+    MapGrid.from_ascii("..\n..", x0=2, y0=2).to_store(store=store)
+    assert store.get_cell((0, 0)) == DEFAULT_LEGEND["#"]
+    assert store.get_cell((3, 3)) == DEFAULT_LEGEND["."]
+    assert MapGrid.from_store(store).get_cell((1, 1)) is None
+
+
+def test_to_store_into_the_attached_store_invalidates_the_map():
+    Tile.load_grid(MapGrid.from_ascii("....\n....\n....\n...."), chunk_size=4)
+    assert Tile.get_tile_at_position((1, 1)).name == "Floor"
+    version = Tile.get_map_version()
+    untouched = Tile.get_revision((200, 200, 201, 201))
+    revision = Tile.get_revision((0, 0, 3, 3))
+
+    MapGrid.from_ascii("##", x0=1, y0=1).to_store(store=Tile.get_store())
+    assert Tile.get_map_version() == version + 2
+    assert Tile.get_revision((0, 0, 3, 3)) > revision
+    assert Tile.get_revision((200, 200, 201, 201)) == untouched
+    assert Tile.get_tile_at_position((1, 1)).name == "Wall"
+    assert not Tile.is_walkable((2, 1))
+
+
+def test_load_grid_replans_the_live_path_queries():
+    Tile.load_grid(MapGrid.from_ascii("...\n...\n..."))
+    query = Tile.create_path_query((0, 1), (2, 1))
+    assert query.get_path() == [(0, 1), (1, 1), (2, 1)]
+
+    Tile.load_grid(MapGrid.from_ascii(".#.\n.#.\n..."))
+    assert query in Tile._path_queries
+    assert query.get_path() == [(0, 1), (1, 2), (2, 1)]
+    Tile.release_path_query(query)
+
+
+def test_large_map_loads_quickly(tmp_path):
+    rows = ["".join("#" if (x * 7 + y * 3) % 11 == 0 else "." for x in range(256)) for y in range(256)]
+    path = str(tmp_path / "large.dndm")
+    MapGrid.from_ascii("\n".join(rows)).save(path)
+
+    started = time.perf_counter()
+    Tile.load_grid(MapGrid.load(path))
+    elapsed = time.perf_counter() - started
+    assert Tile.grid_size() == (256, 256)
+    assert Tile.is_walkable((1, 0)) and not Tile.is_walkable((0, 0))
+    assert elapsed < 0.5
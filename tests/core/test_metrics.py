@@ -0,0 +1,118 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core import metrics
+from dnd.core.base_tiles import Tile
+from dnd.core.dijkstra import dijkstra
+from dnd.core.distance_field import compute_distance_field
+from dnd.core.dstar_lite import DStarLite, IncrementalPathTree
+from dnd.core.hierarchical import HierarchicalPathfinder
+from dnd.core.jump_point import jump_point_search
+from dnd.core.shadowcast import compute_fov
+from dnd.core.events import Event, EventType
+from uuid import uuid4
+
+
+@pytest.fixture
+def collecting():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def sample(name, **labels):
+    for metric in metrics.REGISTRY.values():
+        for sample_name, sample_labels, value in metric.samples():
+            if sample_name == name and sample_labels == labels:
+                return value
+    return None
+
+
+def test_hot_paths_only_count_while_enabled(collecting):
+    metrics.disable()
+    Event(event_type=EventType.ATTACK, source_entity_uuid=uuid4())
+    assert sample("dnd_events_registered_total", event_type="attack") is None
+
+    metrics.enable()
+    Event(event_type=EventType.ATTACK, source_entity_uuid=uuid4())
+    compute_fov((0, 0), lambda x, y: abs(x) > 2 or abs(y) > 2, lambda x, y: None)
+    dijkstra((0, 0), lambda x, y: True, 4, 4)
+    assert sample("dnd_events_registered_total", event_type="attack") == 1
+    assert sample("dnd_fov_seconds_count") == 1
+    assert sample("dnd_pathfinding_seconds_count", algorithm="dijkstra") == 1
+
+
+def test_prometheus_exposition_of_counters_gauges_and_histograms():
+    registry = dict(metrics.REGISTRY)
+    metrics.REGISTRY.clear()
+    try:
+        calls = metrics.counter("test_calls_total", "Calls", ["kind"])
+        metrics.gauge("test_size", "A size", function=lambda: 3)
+        latency = metrics.histogram("test_seconds", "Latency", buckets=(0.1, 1.0))
+        calls.labels('say "hi"').inc(2)
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+        assert metrics.counter("test_calls_total", "Calls", ["kind"]) is calls
+        with pytest.raises(ValueError):
+            metrics.gauge("test_calls_total", "Calls")
+
+        lines = metrics.render_prometheus().splitlines()
+        assert "# TYPE test_calls_total counter" in lines
+        assert 'test_calls_total{kind="say \\"hi\\""} 2' in lines
+        assert "test_size 3" in lines
+        assert 'test_seconds_bucket{le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{le="1"} 2' in lines
+        assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+        assert "test_seconds_count 3" in lines
+        assert "test_seconds_sum 5.55" in lines
+    finally:
+        metrics.REGISTRY.clear()
+        metrics.REGISTRY.update(registry)
+
+
+def test_metric_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        metrics._Metric("test_metric", "A metric")
+
+
+def test_every_grid_search_is_timed(collecting):
+    def is_walkable(x, y):
+        return 0 <= x < 8 and 0 <= y < 8
+
+    jump_point_search((0, 0), (7, 7), is_walkable)
+    HierarchicalPathfinder(is_walkable, cluster_size=2).find_path((0, 0), (7, 7))
+    DStarLite((0, 0), (7, 7), is_walkable).get_path()
+    IncrementalPathTree((0, 0), is_walkable).get_tree(5)
+    compute_distance_field([(7, 7)], is_walkable, 8, 8)
+    # the hierarchical search runs the flat searches of its clusters too, each of them counts
+    for algorithm in ("jump_point", "hierarchical", "dstar_lite", "incremental_path_tree", "distance_field"):
+        assert sample("dnd_pathfinding_seconds_count", algorithm=algorithm) >= 1, algorithm
+
+
+def test_map_caches_count_their_hits_and_misses(collecting):
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    Tile._line_of_sight_cache.clear()
+    Tile._distance_field_cache.clear()
+    try:
+        for x in range(4):
+            Tile.create((x, 0))
+        for _ in range(3):
+            Tile.has_line_of_sight((0, 0), (3, 0))
+            Tile.get_distance_field((3, 0))
+            Tile.get_path_tree((0, 0), 3)
+        for name in ("dnd_line_of_sight_cache_requests_total", "dnd_distance_field_cache_requests_total",
+                     "dnd_path_tree_cache_requests_total"):
+            assert sample(name, result="miss") == 1, name
+            assert sample(name, result="hit") == 2, name
+    finally:
+        Tile._tile_registry = {}
+        Tile._tile_by_position = {}
+        Tile._line_of_sight_cache.clear()
+        Tile._distance_field_cache.clear()
@@ -1,11 +1,13 @@
 import os
+import random
 import sys
 
 import pytest
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from dnd.core.shadowcast import Quadrant, compute_fov
+import dnd.core.shadowcast as shadowcast
+from dnd.core.shadowcast import Quadrant, compute_fov, compute_fov_along_path
 
 
 def test_compute_fov_respects_walls_and_max_distance():
@@ -32,3 +34,47 @@ def test_compute_fov_respects_walls_and_max_distance():
 def test_quadrant_raises_for_invalid_cardinal():
     with pytest.raises(ValueError):
         Quadrant(4, (0, 0))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_compute_fov_along_path_matches_compute_fov(seed):
+    rng = random.Random(seed)
+    size = 24
+    density = rng.choice([0.0, 0.05, 0.2])
+    walls = {(x, y) for x in range(size) for y in range(size) if rng.random() < density}
+
+    def is_blocking(x: int, y: int) -> bool:
+        return (x, y) in walls or x < 0 or y < 0 or x >= size or y >= size
+
+    position = (size // 2, size // 2)
+    path = [position]
+    for _ in range(12):
+        dx, dy = rng.choice([(1, 0), (0, 1), (-1, 0), (0, -1), (1, 1)])
+        position = (min(size - 2, max(1, position[0] + dx)), min(size - 2, max(1, position[1] + dy)))
+        path.append(position)
+    max_distance = rng.choice([None, 4, 7.5])
+
+    fields = compute_fov_along_path(path, is_blocking, max_distance)
+
+    for position, field in zip(path, fields):
+        expected = set()
+        compute_fov(position, is_blocking, lambda x, y: expected.add((x, y)), max_distance)
+        assert field == expected
+
+
+def test_compute_fov_along_path_reuses_quadrants_in_open_ground(monkeypatch):
+    scans = []
+    scan_quadrant = shadowcast.scan_quadrant
+
+    def counting_scan(*args, **kwargs):
+        scans.append(args[0])
+        return scan_quadrant(*args, **kwargs)
+
+    monkeypatch.setattr(shadowcast, "scan_quadrant", counting_scan)
+    walls = {(x, 30) for x in range(-50, 50)}
+    path = [(x, 0) for x in range(10)]
+
+    fields = compute_fov_along_path(path, lambda x, y: (x, y) in walls, max_distance=8)
+
+    assert len(scans) == 4
+    assert fields[3] == {(x + 3, y) for x, y in fields[0]}
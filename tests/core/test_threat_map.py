@@ -0,0 +1,100 @@
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from dnd.core.base_tiles import Tile
+from dnd.core.threat_map import ThreatMap
+from dnd.entity import Entity
+from tests.test_entity import create_basic_entity
+
+
+@pytest.fixture(autouse=True)
+def clear_tiles():
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+    yield
+    Tile._tile_registry = {}
+    Tile._tile_by_position = {}
+
+
+def test_set_threats_replaces_the_previous_cells():
+    guard = uuid4()
+    ThreatMap.set_threats(guard, [(0, 0), (1, 0)])
+    assert ThreatMap.get_threatening_entities((1, 0)) == {guard}
+    ThreatMap.set_threats(guard, [(1, 0), (2, 0)])
+    assert ThreatMap.get_threatening_entities((0, 0)) == set()
+    assert ThreatMap.get_threatening_entities((2, 0)) == {guard}
+    ThreatMap.remove_entity(guard)
+    assert ThreatMap.get_threatening_entities((1, 0)) == set()
+    assert ThreatMap.get_threatened_positions(guard) == frozenset()
+
+
+def test_opportunity_attackers_are_the_threats_left_behind():
+    mover, guard, sentry = uuid4(), uuid4(), uuid4()
+    ThreatMap.set_threats(guard, [(0, 0), (1, 0)])
+    ThreatMap.set_threats(sentry, [(0, 0), (1, 0), (2, 0), (3, 0)])
+    ThreatMap.set_threats(mover, [(0, 0)])
+    assert ThreatMap.get_opportunity_attackers(mover, (0, 0), [(1, 0), (2, 0)]) == {guard}
+    assert ThreatMap.get_opportunity_attackers(mover, (0, 0), [(1, 0)]) == frozenset()
+    assert ThreatMap.get_opportunity_attackers(mover, (5, 5), [(1, 0), (9, 9)]) == frozenset()
+
+
+def test_last_query_is_shared_until_the_map_changes():
+    mover, guard = uuid4(), uuid4()
+    ThreatMap.set_threats(guard, [(0, 0)])
+    first = ThreatMap.get_opportunity_attackers(mover, (0, 0), [(1, 0)])
+    assert ThreatMap.get_opportunity_attackers(mover, (0, 0), [(1, 0)]) is first
+    ThreatMap.set_threats(guard, [(0, 0), (1, 0)])
+    assert ThreatMap.get_opportunity_attackers(mover, (0, 0), [(1, 0)]) == frozenset()
+
+
+def test_senses_refresh_publishes_threats():
+    for x in range(5):
+        for y in range(5):
+            Tile.create((x, y))
+    guard = create_basic_entity(position=(2, 2))
+    mover = create_basic_entity(position=(3, 3))
+    # paths only go through seen cells, the first refresh marks them as seen
+    Entity.update_all_entities_senses(max_distance=5)
+    Entity.update_all_entities_senses(max_distance=5)
+    assert set(guard.senses.get_threathened_positions()) == ThreatMap.get_threatened_positions(guard.uuid)
+    assert guard.uuid in ThreatMap.get_threatening_entities((3, 3))
+    assert ThreatMap.get_opportunity_attackers(mover.uuid, (3, 3), [(4, 4)]) == {guard.uuid}
+
+
+def test_threats_follow_moves_and_removals():
+    for x in range(5):
+        for y in range(5):
+            Tile.create((x, y))
+    guard = create_basic_entity(position=(2, 2))
+    Entity.update_all_entities_senses(max_distance=5)
+    Entity.update_all_entities_senses(max_distance=5)
+    guard.move((1, 1), update_senses=False)
+    assert ThreatMap.get_threatened_positions(guard.uuid) == set(guard.senses.get_threathened_positions())
+    assert guard.uuid in ThreatMap.get_threatening_entities((2, 2))
+
+    assert Entity.remove_entity(guard.uuid) is guard
+    assert Entity.get(guard.uuid) is None and guard not in Entity.get_all_entities_at_position((1, 1))
+    assert ThreatMap.get_threatened_positions(guard.uuid) == frozenset()
+    assert Entity.remove_entity(guard.uuid) is None
+
+
+def test_opportunity_attack_handlers_are_only_called_for_the_attackers():
+    from dnd.core.events import EventQueue
+    from dnd.reactions import OPPORTUNITY_ATTACK_TRIGGER, add_opportunity_attack_handler
+    from dnd.actions import MovementEvent
+    from dnd.core.base_actions import BaseCost
+
+    guard, bystander, mover = (create_basic_entity(position=position) for position in [(0, 0), (9, 9), (1, 0)])
+    for entity in (guard, bystander):
+        add_opportunity_attack_handler(entity)
+    ThreatMap.set_threats(guard.uuid, [(1, 0)])
+    ThreatMap.set_threats(bystander.uuid, [(8, 8)])
+    event = MovementEvent(source_entity_uuid=mover.uuid, target_entity_uuid=mover.uuid, start_position=(1, 0),
+                          end_position=(3, 0), path=[(2, 0), (3, 0)], phase=OPPORTUNITY_ATTACK_TRIGGER.event_phase,
+                          costs=[BaseCost(name="Movement", cost_type="movement", cost=2)], use_register=False)
+    handlers = EventQueue._get_handlers_for_event(event)
+    assert [handler.source_entity_uuid for handler in handlers] == [guard.uuid]
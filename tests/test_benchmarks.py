@@ -0,0 +1,93 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from benchmarks import harness, suite  # noqa: F401
+from benchmarks.scenarios import generate_encounter, reset_world
+from dnd.core.base_block import BaseBlock
+from dnd.core.base_object import BaseObject
+from dnd.core.dice import Dice, DiceRoll
+from dnd.core.values import BaseValue
+from dnd.entity import Entity
+
+
+def test_run_times_the_selected_cases():
+    document = harness.run(["values.score[0]"], min_time=0.001, repeats=2)
+    assert list(document["results"]) == ["values.score[0]"]
+    result = document["results"]["values.score[0]"]
+    assert result["seconds"] > 0 and result["loops"] >= 1
+
+
+def test_compare_flags_cases_beyond_the_tolerance():
+    baseline = {"results": {"a": {"seconds": 1.0}, "b": {"seconds": 1.0}, "c": {"seconds": 1.0}}}
+    current = {"results": {"a": {"seconds": 1.2}, "b": {"seconds": 1.5}, "c": {"seconds": 0.5}, "new": {"seconds": 1.0}}}
+    statuses = {row["case"]: row["status"] for row in harness.compare(current, baseline, tolerance=0.25)}
+    assert statuses == {"a": "ok", "b": "regressed", "c": "improved"}
+
+
+def test_generated_encounters_pair_adjacent_warriors():
+    entities = generate_encounter(4, width=16, height=16, seed=3)
+    try:
+        assert len({entity.position for entity in entities}) == 4
+        assert entities[0].target_entity_uuid == entities[1].uuid
+        assert max(abs(a - b) for a, b in zip(entities[0].position, entities[1].position)) == 1
+        assert len(Entity.get_all_entities()) == 4
+    finally:
+        reset_world()
+
+
+def test_load_run_reports_every_route_without_errors():
+    import asyncio
+    from benchmarks.load import run_load
+
+    result = asyncio.run(run_load(sessions=2, turns=1))
+    routes = result["routes"]
+    assert routes["POST /entities/{uuid}/attack/{target}"]["count"] == 2
+    assert routes["GET /events/"]["count"] == 2
+    assert routes["all"]["errors"] == 0
+    assert routes["all"]["p50_ms"] <= routes["all"]["p99_ms"]
+    assert not Entity.get_all_entities()
+
+
+def test_stateful_cases_do_not_time_their_restore_step():
+    import time
+    calls = {"func": 0, "before": 0}
+
+    def restore():
+        calls["before"] += 1
+        time.sleep(0.002)
+
+    def func():
+        calls["func"] += 1
+
+    result = harness.time_callable(func, min_time=0.0001, repeats=2, before=restore)
+    assert calls["before"] == calls["func"]
+    assert result["seconds"] < 0.002
+
+
+def test_attack_case_runs_on_a_fresh_encounter_each_call():
+    from dnd.core.events import EventQueue
+
+    case = harness.BENCHMARKS["actions.attack_apply"][0](None)
+    try:
+        log_sizes = []
+        for _ in range(3):
+            case.before()
+            before = len(EventQueue._event_log)
+            case.func()
+            log_sizes.append((before, len(Entity.get_all_entities())))
+        assert len(set(log_sizes)) == 1
+    finally:
+        reset_world()
+
+
+def test_encounters_do_not_leak_engine_objects():
+    generate_encounter(2)
+    sizes = [len(registry) for registry in (BaseBlock._registry, BaseObject._registry, BaseValue._registry, Dice._registry, DiceRoll._registry)]
+    try:
+        for _ in range(3):
+            generate_encounter(2)
+        assert [len(registry) for registry in (BaseBlock._registry, BaseObject._registry, BaseValue._registry,
+                                               Dice._registry, DiceRoll._registry)] == sizes
+    finally:
+        reset_world()
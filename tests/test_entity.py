@@ -322,3 +322,17 @@ def test_update_entity_senses(clean_entity_registry):
     assert (1, 0) in observer.senses.visible
     assert observer.senses.walkable[(1, 0)]
 
+
+
+def test_senses_copy_at_position_leaves_the_entity_senses_alone(clean_entity_registry):
+    for x in range(8):
+        Tile.create((x, 0))
+    observer = create_basic_entity(position=(0, 0))
+    observer.update_entity_senses(max_distance=3)
+    seen, visible = set(observer.senses.seen), dict(observer.senses.visible)
+
+    copy = observer.create_senses_copy_at_position((7, 0), max_distance=3)
+    assert copy.position == (7, 0) and (5, 0) in copy.visible and (0, 0) not in copy.visible
+    assert seen < set(copy.seen) and (7, 0) in copy.seen
+    assert observer.senses.position == (0, 0)
+    assert set(observer.senses.seen) == seen and dict(observer.senses.visible) == visible
@@ -16,6 +16,7 @@ from dnd.core.base_conditions import BaseCondition
 from dnd.core.events import Event, EventPhase
 from dnd.core.base_tiles import Tile
 from dnd.conditions import Dodging
+from dnd.core.area_of_effect import AreaShape
 
 from tests.test_entity import create_basic_entity, clean_entity_registry
 
@@ -256,3 +257,45 @@ def test_update_all_entities_senses(clean_entity_registry):
     Entity.update_all_entities_senses(max_distance=5)
     assert seen.uuid in observer.senses.entities
     assert observer.senses.entities[seen.uuid] == (1, 0)
+
+
+def test_update_entities_senses_around_only_refreshes_nearby(clean_entity_registry):
+    near = create_basic_entity(position=(0, 0))
+    far = create_basic_entity(position=(30, 0))
+    with patch.object(Entity, "update_entity_senses") as mock_update:
+        updated = Entity.update_entities_senses_around((5, 0), max_distance=10)
+    assert updated == [near]
+    assert far not in updated
+    mock_update.assert_called_once_with(10)
+
+
+def test_get_entities_in_area_stops_at_walls(clean_entity_registry):
+    for x in range(8):
+        Tile.create((x, 0), can_walk=x != 4, can_see=x != 4)
+    caster = create_basic_entity(position=(0, 0))
+    hit = create_basic_entity(position=(2, 0))
+    covered = create_basic_entity(position=(6, 0))
+    affected = Entity.get_entities_in_area(AreaShape.LINE, 40, (0, 0), orientation=0)
+    assert affected == [hit]
+    assert caster not in affected and covered not in affected
+
+
+def test_compute_senses_along_path_reports_deltas(clean_entity_registry):
+    for x in range(6):
+        Tile.create((x, 0), can_walk=True, can_see=x != 3)
+        Tile.create((x, 1))
+    walker = create_basic_entity(position=(0, 0))
+    hidden = create_basic_entity(position=(5, 0))
+    deltas = walker.compute_senses_along_path([(0, 0), (0, 1), (1, 1)], max_distance=10)
+    assert [delta.position for delta in deltas] == [(0, 0), (0, 1), (1, 1)]
+    assert (5, 0) not in deltas[0].visible_added
+    assert walker.uuid not in deltas[0].entities_added
+    visible = set()
+    entities = {}
+    for delta, position in zip(deltas, [(0, 0), (0, 1), (1, 1)]):
+        visible = (visible | set(delta.visible_added)) - set(delta.visible_removed)
+        entities.update(delta.entities_added)
+        for uuid in delta.entities_removed:
+            entities.pop(uuid)
+        assert visible == set(Tile.get_fov(position, 10))
+        assert (hidden.uuid in entities) == ((5, 0) in visible)